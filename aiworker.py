@@ -0,0 +1,71 @@
+"""Background thread for AI decisions in the pygame client.
+
+Policies like "montecarlo" and "endgame" can spend many milliseconds on one
+decision. AIWorker runs choose_play()/decide_call()/find_caller() on a
+single worker thread, so the frame loop keeps drawing while an AI thinks.
+Each job's result is handed to a callback, but only when the main loop
+calls poll(). Game state is therefore only ever changed on the main thread.
+The client must not change the state a job reads until that job's callback
+has run.
+
+One thread, so the policy objects (and their caches) are never used by two
+decisions at once. cancel() drops every job submitted so far: queued jobs
+never start, and the result of a job already running is thrown away. The
+client calls it when a game is reset.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Job:
+    """A submitted decision; its callback runs on the main thread once it is done."""
+    __slots__ = ('future', 'then')
+
+    def __init__(self, future, then):
+        self.future = future
+        self.then = then
+
+
+class AIWorker:
+    """Runs AI decisions on a background thread; 'wake' is called from that thread when one finishes."""
+
+    def __init__(self, wake=None):
+        self.wake = wake
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ai")
+        self._jobs = []          # submitted and not yet polled, oldest first
+
+    def submit(self, then, fn, *args):
+        """Run fn(*args) on the worker; poll() passes its result to then()."""
+        future = self._pool.submit(fn, *args)
+        if self.wake is not None:
+            future.add_done_callback(lambda _: self.wake())
+        job = Job(future, then)
+        self._jobs.append(job)
+        return job
+
+    def poll(self, wait_for=None):
+        """Hand the results of finished jobs to their callbacks, in the order they were submitted.
+
+        With 'wait_for', wait until that many jobs are done and hand over
+        exactly those (session playback uses it to collect decisions in the
+        same frames as when they were recorded). Returns the number handed over.
+        """
+        handled = 0
+        while self._jobs and (self._jobs[0].future.done() if wait_for is None else handled < wait_for):
+            job = self._jobs.pop(0)
+            job.then(job.future.result())   # re-raises an exception from the policy
+            handled += 1
+        return handled
+
+    @property
+    def busy(self):
+        return bool(self._jobs)
+
+    def cancel(self):
+        """Forget every job submitted so far (e.g. when the game is reset)."""
+        for job in self._jobs:
+            job.future.cancel()
+        self._jobs.clear()
+
+    def shutdown(self):
+        self.cancel()
+        self._pool.shutdown(wait=False, cancel_futures=True)
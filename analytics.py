@@ -0,0 +1,279 @@
+"""Columnar analytics over replay logs: per-policy bluff, call and win statistics.
+
+An analytics store is a directory of memory-mapped .npy columns plus a
+manifest. Ingesting a replay log turns its records into two tables with
+whole-array NumPy operations (no Python loop per record or per game):
+
+    plays    game, player, policy, declared, count, bluff, caller,
+             caller_policy, pile        (one row per play)
+    games    game, players, first, winner, winner_policy, turns
+                                        (one row per finished game)
+
+'policy' columns hold indices into the manifest's policy list (the names
+recorded in SEAT records; "human" for the person at the pygame client).
+
+The manifest also keeps how far each log has been read and the running
+totals per policy. Adding logs, or new games appended to a log already in
+the store, only reads the new records and adds to the totals, so the
+report never rescans what is already in the store. Columns grow by
+doubling their capacity, and the manifest is replaced last. A run that
+dies halfway leaves the store as it was before that run.
+
+Usage: python analytics.py STORE [LOG_OR_DIR ...]
+       (adds new games from the logs to STORE and prints the per-policy report)
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+from engine import RANKS
+from replay import GAME, SEAT, TURN, END, NO_SEAT, open_log
+
+STORE_VERSION = 1
+MANIFEST = "manifest.json"
+MIN_CAPACITY = 1 << 16      # rows a column starts with
+
+PLAY_COLUMNS = [('game', 'u4'), ('player', 'u1'), ('policy', 'u1'), ('declared', 'u1'),
+                ('count', 'u1'), ('bluff', '?'), ('caller', 'u1'), ('caller_policy', 'u1'),
+                ('pile', '<u2')]
+GAME_COLUMNS = [('game', 'u4'), ('players', 'u1'), ('first', 'u1'), ('winner', 'u1'),
+                ('winner_policy', 'u1'), ('turns', '<u4')]
+
+# Running totals kept per policy
+TOTALS = ('seats', 'wins', 'win_turns', 'plays', 'bluffs', 'calls', 'correct_calls', 'call_pile')
+
+
+class AnalyticsStore:
+    """The columns and running totals in directory 'path' (created if missing)."""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        manifest_path = os.path.join(path, MANIFEST)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                self.manifest = json.load(f)
+            if self.manifest.get('version') != STORE_VERSION:
+                raise ValueError(f"{path} is not a version {STORE_VERSION} analytics store")
+        else:
+            self.manifest = {'version': STORE_VERSION, 'policies': [], 'logs': {},
+                             'rows': {'plays': 0, 'games': 0}, 'games_seen': 0, 'totals': {}}
+
+    @property
+    def policies(self):
+        return self.manifest['policies']
+
+    def column(self, table, name):
+        """Read-only memmap of one column, trimmed to the rows in the store."""
+        rows = self.manifest['rows'][table]
+        if not rows:
+            return np.zeros(0, dtype=dict(PLAY_COLUMNS + GAME_COLUMNS)[name])
+        return np.load(self._column_path(table, name), mmap_mode="r")[:rows]
+
+    def ingest(self, paths):
+        """Add the games in 'paths' not yet in the store; returns how many were added.
+
+        A log's last game is left for a later run if it has no END record
+        yet (it may still be being written).
+        """
+        logs = self.manifest['logs']
+        added = 0
+        for path in paths:
+            key = os.path.realpath(path)
+            records = open_log(path)
+            done = logs.get(key, 0)
+            if len(records) < done:
+                raise ValueError(f"{path} is shorter than when it was ingested")
+            records = records[done:]
+            kinds = records['kind']
+            starts = np.flatnonzero(kinds == GAME)
+            if not len(starts):
+                continue
+            # Stop before the last game if it is not finished yet
+            end = len(records)
+            if not np.any(kinds[starts[-1]:] == END):
+                end = starts[-1]
+            if end > starts[0]:
+                added += self._add(records[starts[0]:end])
+            logs[key] = done + int(end)
+        self._save_manifest()
+        return added
+
+    def _add(self, records):
+        """Append the games in 'records' (starting at a GAME record) to the tables and totals."""
+        manifest = self.manifest
+        kinds = records['kind']
+        game_of = np.cumsum(kinds == GAME) - 1          # game (within 'records') of every record
+        first_game = manifest['games_seen']
+        n_games = int(game_of[-1]) + 1
+
+        # Policy of every seat of every game
+        games = records[kinds == GAME]
+        seat_policy = np.zeros((n_games, max(int(games['a'].max()), 1)), dtype=np.uint8)
+        seats = records[kinds == SEAT]
+        names = np.ascontiguousarray(seats['cards']).view('S10').ravel()
+        unique, inverse = np.unique(names, return_inverse=True)
+        ids = np.array([self._policy_id(name.decode("ascii", "replace")) for name in unique],
+                       dtype=np.uint8)
+        seat_ids = ids[inverse.ravel()]
+        seat_policy[game_of[kinds == SEAT], seats['a']] = seat_ids
+
+        # Plays
+        turns = records[kinds == TURN]
+        turn_game = game_of[kinds == TURN]
+        counts = turns['cards'][:, :len(RANKS)].astype(np.int32)
+        declared = turns['b']
+        count = counts.sum(axis=1)
+        honest = counts[np.arange(len(turns)), declared]
+        caller = turns['c']
+        called = caller != NO_SEAT
+        plays = {
+            'game': turn_game + first_game,
+            'player': turns['a'],
+            'policy': seat_policy[turn_game, turns['a']],
+            'declared': declared,
+            'count': count,
+            'bluff': honest != count,
+            'caller': caller,
+            'caller_policy': np.where(called, seat_policy[turn_game, np.where(called, caller, 0)], NO_SEAT),
+            'pile': turns['extra'],
+        }
+
+        # Finished games
+        ends = records[kinds == END]
+        end_game = game_of[kinds == END]
+        winner = ends['a']
+        won = winner != NO_SEAT
+        finished = {
+            'game': end_game + first_game,
+            'players': games['a'][end_game],
+            'first': games['b'][end_game],
+            'winner': winner,
+            'winner_policy': np.where(won, seat_policy[end_game, np.where(won, winner, 0)], NO_SEAT),
+            'turns': np.ascontiguousarray(ends['cards'][:, :4]).view('<u4').ravel(),
+        }
+
+        self._append('plays', PLAY_COLUMNS, plays)
+        self._append('games', GAME_COLUMNS, finished)
+        manifest['games_seen'] = first_game + n_games
+
+        # Running totals, one bincount per statistic
+        n = len(self.policies)
+        bluff, policy = plays['bluff'], plays['policy']
+        caller_policy = plays['caller_policy'][called]
+        win_policy = finished['winner_policy'][won]
+        added = {
+            'seats': np.bincount(seat_ids, minlength=n),
+            'wins': np.bincount(win_policy, minlength=n),
+            'win_turns': np.bincount(win_policy, weights=finished['turns'][won], minlength=n),
+            'plays': np.bincount(policy, minlength=n),
+            'bluffs': np.bincount(policy[bluff], minlength=n),
+            'calls': np.bincount(caller_policy, minlength=n),
+            'correct_calls': np.bincount(plays['caller_policy'][called & bluff], minlength=n),
+            'call_pile': np.bincount(caller_policy, weights=plays['pile'][called], minlength=n),
+        }
+        totals = manifest['totals']
+        for i, name in enumerate(self.policies):
+            entry = totals.setdefault(name, dict.fromkeys(TOTALS, 0))
+            for stat in TOTALS:
+                entry[stat] += int(added[stat][i])
+        return int(np.count_nonzero(won))
+
+    def _policy_id(self, name):
+        policies = self.policies
+        if name not in policies:
+            if len(policies) >= NO_SEAT:
+                raise ValueError("too many distinct policies for one store")
+            policies.append(name)
+        return policies.index(name)
+
+    def _column_path(self, table, name):
+        return os.path.join(self.path, f"{table}.{name}.npy")
+
+    def _append(self, table, columns, values):
+        rows = self.manifest['rows'][table]
+        new_rows = rows + len(values[columns[0][0]])
+        for name, dtype in columns:
+            column = self._open_column(table, name, dtype, rows, new_rows)
+            column[rows:new_rows] = values[name]
+            column.flush()
+            del column
+        self.manifest['rows'][table] = new_rows
+
+    def _open_column(self, table, name, dtype, rows, needed):
+        """Writable memmap of a column that can hold 'needed' rows, keeping the first 'rows'."""
+        path = self._column_path(table, name)
+        column = np.lib.format.open_memmap(path, mode="r+") if os.path.exists(path) else None
+        if column is not None and len(column) >= needed:
+            return column
+        capacity = MIN_CAPACITY
+        while capacity < needed:
+            capacity *= 2
+        grown = np.lib.format.open_memmap(path + ".tmp", mode="w+", dtype=dtype, shape=(capacity,))
+        if column is not None:
+            grown[:rows] = column[:rows]
+            del column
+        grown.flush()
+        del grown
+        os.replace(path + ".tmp", path)
+        return np.lib.format.open_memmap(path, mode="r+")
+
+    def _save_manifest(self):
+        path = os.path.join(self.path, MANIFEST)
+        with open(path + ".tmp", "w") as f:
+            json.dump(self.manifest, f, indent=1)
+        os.replace(path + ".tmp", path)
+
+    def report(self):
+        """Per-policy statistics from the running totals, as {policy: {stat: value}}."""
+        report = {}
+        for name, t in self.manifest['totals'].items():
+            report[name] = {
+                'seats': t['seats'],
+                'win_rate': t['wins'] / t['seats'] if t['seats'] else None,
+                'bluff_rate': t['bluffs'] / t['plays'] if t['plays'] else None,
+                'calls': t['calls'],
+                'call_accuracy': t['correct_calls'] / t['calls'] if t['calls'] else None,
+                'pile_at_call': t['call_pile'] / t['calls'] if t['calls'] else None,
+                'turns_to_win': t['win_turns'] / t['wins'] if t['wins'] else None,
+            }
+        return report
+
+
+def log_paths(paths):
+    """Expand directories (e.g. a tournament --log-dir) into the .bluff logs inside them."""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found += sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(".bluff"))
+        else:
+            found.append(path)
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-policy statistics over Bluff replay logs.")
+    parser.add_argument("store", help="analytics store directory (created if missing)")
+    parser.add_argument("logs", nargs="*", help="replay logs, or directories of them, to add")
+    args = parser.parse_args()
+    store = AnalyticsStore(args.store)
+    if args.logs:
+        added = store.ingest(log_paths(args.logs))
+        print(f"added {added} finished games; {store.manifest['rows']['games']} games, "
+              f"{store.manifest['rows']['plays']} plays in the store")
+
+    def show(value, fmt):
+        return "-" if value is None else format(value, fmt)
+
+    print(f"{'policy':<10} {'seats':>8} {'win rate':>9} {'bluffs':>7} {'calls':>8} "
+          f"{'accuracy':>9} {'pile':>6} {'turns to win':>13}")
+    for name, r in sorted(store.report().items()):
+        print(f"{name:<10} {r['seats']:>8} {show(r['win_rate'], '.2%'):>9} "
+              f"{show(r['bluff_rate'], '.1%'):>7} {r['calls']:>8} {show(r['call_accuracy'], '.1%'):>9} "
+              f"{show(r['pile_at_call'], '.1f'):>6} {show(r['turns_to_win'], '.1f'):>13}")
+
+
+if __name__ == "__main__":
+    main()
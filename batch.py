@@ -0,0 +1,192 @@
+"""Vectorized batch simulator: steps thousands of all-AI games at once with NumPy.
+
+Every game lives in a row of a few arrays (hands are games x players x ranks
+counts), and each loop iteration plays one turn of every unfinished game
+using masked array operations; finished games are dropped from the arrays. The rules and AI heuristics mirror
+engine.play_ai_turn(); this module just trades per-game Python objects for
+throughput. With --tables every seat decides by lookups in compiled policy
+tables instead (see policytable.py), a handful of gathers per turn.
+
+Usage: python batch.py [n_games] [--seed N] [--players N] [--decks N] [--tables FILE]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from engine import RANKS, CARDS_PER_RANK, PLAYERS_COUNT, AI_PARAMS, ai_params, table_rules
+from policytable import CALL_ALWAYS, load_tables
+
+
+def deal_batch(rng, n_games, n_players=PLAYERS_COUNT, decks=1):
+    """Shuffle and deal n_games decks as engine.new_game() does.
+
+    Returns (hands, pile): hand counts shaped (games, players, ranks) and
+    the counts of the cards left over, which start the pile, (games, ranks).
+    """
+    n_ranks = len(RANKS)
+    cards_per_rank, cards_per_player, _ = table_rules(n_players, decks)
+    deck = np.repeat(np.arange(n_ranks), cards_per_rank)
+    shuffled = rng.permuted(np.tile(deck, (n_games, 1)), axis=1)
+    n_dealt = n_players * cards_per_player
+    dealt = shuffled[:, :n_dealt].reshape(n_games, n_players, cards_per_player)
+    hands = np.zeros((n_games, n_players, n_ranks), dtype=np.int16)
+    games = np.arange(n_games)[:, None, None]
+    seats = np.arange(n_players)[None, :, None]
+    np.add.at(hands, (games, seats, dealt), 1)
+    pile = np.zeros((n_games, n_ranks), dtype=np.int16)
+    if n_dealt < len(deck):
+        np.add.at(pile, (np.arange(n_games)[:, None], shuffled[:, n_dealt:]), 1)
+    return hands, pile
+
+
+def call_decisions(own_counts, count_played, draws, params=None, cards_per_rank=CARDS_PER_RANK):
+    """Vectorized ai_decide_call(): own_counts and draws are (games, players), count_played is (games,).
+
+    Every seat's decision comes out of one pass, however many seats there
+    are. 'params' is a parameter vector or a (players, params) table, as for
+    simulate_batch().
+    """
+    params = np.asarray(ai_params() if params is None else params)
+    accounted_multi, accounted_single, big_play, pair = (params[..., i] for i in range(2, 6))
+    played = count_played[:, None]
+    accounted = own_counts + played
+    prob = np.where(played >= 3, big_play, np.where(played == 2, pair, 0.0))
+    prob = np.where(accounted == cards_per_rank,
+                    np.where(played >= 2, accounted_multi, accounted_single),
+                    prob)
+    # A play that is impossible given the AI's own cards is always called
+    return (accounted > cards_per_rank) | (draws < prob)
+
+
+def simulate_batch(n_games, seed=None, n_players=PLAYERS_COUNT, max_turns=1000, params=None, decks=1,
+                   tables=None):
+    """Play n_games all-AI games together, at tables of n_players seats dealt from 'decks' decks.
+
+    'params' is a parameter vector as for engine.HeuristicPolicy, or one per
+    seat as a (players, params) table; the default is the module constants.
+    'tables' (a policytable.TableSet for this table shape) replaces the
+    heuristic on every seat by the compiled policy.
+
+    Returns (winners, turns): the winning seat of each game (-1 if it hit
+    max_turns) and the number of plays it took.
+    """
+    params = np.broadcast_to(np.asarray(ai_params() if params is None else params, dtype=float),
+                             (n_players, len(AI_PARAMS)))
+    cards_per_rank, _, win_hand_size = table_rules(n_players, decks)
+    rng = np.random.default_rng(seed)
+    n_ranks = len(RANKS)
+    seats = np.arange(n_players)
+    winners = np.full(n_games, -1, dtype=np.intp)
+    turns = np.zeros(n_games, dtype=np.int32)
+    # Per-row state; rows are dropped as their games finish, 'ids' maps a
+    # row back to its game number
+    ids = np.arange(n_games)
+    hands, pile = deal_batch(rng, n_games, n_players, decks)
+    rank = np.zeros(n_games, dtype=np.intp)                   # slot of the rank to play
+    player = rng.integers(n_players, size=n_games)            # seat to play
+
+    for _ in range(max_turns):
+        rows = len(ids)
+        if not rows:
+            break
+        games = np.arange(rows)
+        # One block of uniforms per turn: bluff, double play, then a call draw
+        # and a reaction-order key for every seat
+        draws = rng.random((rows, 2 + 2 * n_players))
+        hand = hands[games, player]                           # (games, ranks)
+        required = hand[games, rank]
+
+        if tables is None:
+            # ai_play_turn(): bluff if the required rank is missing or by chance
+            bluff = (required == 0) | (draws[:, 0] < params[player, 0])
+        else:
+            next_hand = hands[games, (player + 1) % n_players]
+            honest, table_count = tables.play_actions(required, hand.sum(axis=1), pile.sum(axis=1),
+                                                      next_hand.sum(axis=1), draws[:, 0])
+            bluff = ~honest | (required == 0)
+        # A bluff discards the most-held other rank (lowest rank on ties)
+        others = hand.copy()
+        others[games, rank] = -1
+        heaviest = others.argmax(axis=1)
+        bluff &= others[games, heaviest] > 0                  # only required rank left: play it
+        slot = np.where(bluff, heaviest, rank)
+        available = hand[games, slot]
+        if tables is None:
+            count = np.where((available > 1) & (draws[:, 1] < params[player, 1]), 2, 1)
+        else:
+            count = table_count
+        count = np.minimum(count, available)
+        hands[games, player, slot] -= count
+        pile[games, slot] += count
+        turns[ids] += 1
+
+        # ai_decide_call() for every other seat; the first to react among
+        # those calling is a uniformly random one of them
+        own = hands[games[:, None], seats[None, :], rank[:, None]]      # (games, players)
+        if tables is None:
+            calls = call_decisions(own, count, draws[:, 2:2 + n_players], params, cards_per_rank)
+        else:
+            sizes = hands.sum(axis=2)
+            values = tables.call_values(own, count[:, None], pile.sum(axis=1)[:, None],
+                                        sizes[games, player][:, None], sizes)
+            calls = draws[:, 2:2 + n_players] * CALL_ALWAYS < values
+        calls &= seats[None, :] != player[:, None]
+        keys = np.where(calls, draws[:, 2 + n_players:], -1.0)
+        caller = keys.argmax(axis=1)
+        called = calls.any(axis=1)
+
+        # resolve_call(): split a called pile, lowest ranks to the accused
+        half = pile.sum(axis=1) // 2
+        before = np.cumsum(pile, axis=1) - pile
+        accused_share = np.clip(half[:, None] - before, 0, pile) * called[:, None]
+        caller_share = pile * called[:, None] - accused_share
+        hands[games, player] += accused_share
+        hands[games, caller] += caller_share
+        pile -= accused_share + caller_share
+
+        # Win checks: an uncalled play only for the player who made it, a call
+        # for every seat (the highest qualifying seat wins, as in the engine)
+        small = hands.sum(axis=2) <= win_hand_size
+        last_small = n_players - 1 - small[:, ::-1].argmax(axis=1)
+        won = np.where(called, small.any(axis=1), small[games, player])
+        winners[ids[won]] = np.where(called, last_small, player)[won]
+        # Drop finished games, then advance the rest to the next player and rank
+        live = ~won
+        ids, hands, pile = ids[live], hands[live], pile[live]
+        player = (player[live] + 1) % n_players
+        rank = (rank[live] + 1) % n_ranks
+
+    return winners, turns
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run many all-AI Bluff games with NumPy.")
+    parser.add_argument("n_games", type=int, nargs="?", default=100000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--players", type=int, default=PLAYERS_COUNT)
+    parser.add_argument("--decks", type=int, default=1)
+    parser.add_argument("--tables", metavar="FILE", default=None,
+                        help="play every seat with these compiled policy tables (see compiletables.py)")
+    args = parser.parse_args()
+    tables = None
+    try:
+        table_rules(args.players, args.decks)
+        if args.tables:
+            tables = load_tables(args.tables).get(args.players, args.decks)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    start = time.perf_counter()
+    winners, turns = simulate_batch(args.n_games, args.seed, args.players, decks=args.decks, tables=tables)
+    elapsed = time.perf_counter() - start
+    print(f"{args.n_games} games in {elapsed:.2f}s ({args.n_games / elapsed:.0f} games/s), "
+          f"mean {turns.mean():.1f} turns")
+    for seat in range(args.players):
+        print(f"  seat {seat}: {np.mean(winners == seat):.3%} wins")
+    unfinished = np.count_nonzero(winners < 0)
+    if unfinished:
+        print(f"  {unfinished} game(s) hit the turn limit")
+
+
+if __name__ == "__main__":
+    main()
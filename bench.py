@@ -0,0 +1,189 @@
+"""Benchmarks of the engine, AI and rendering hot paths.
+
+Runs headless: unless SDL_VIDEODRIVER is already set, SDL's dummy video
+driver is used, so the suite also runs on CI machines without a display.
+Every benchmark is timed with timeit: it is run long enough to take about
+0.2 s, and the best of --repeat such runs counts. Results are printed and
+optionally written as JSON.
+
+With --baseline the results are compared with an earlier JSON file. The
+run fails (exit status 1) if any benchmark is more than --threshold worse
+than the baseline. Compare runs from the same machine only.
+
+Usage: python bench.py [--out results.json] [--baseline base.json] [--threshold 0.1]
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+import timeit
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame
+
+import engine
+from engine import RANKS, CARDS_PER_RANK
+
+BENCH_VERSION = 1
+SEEDS = 100              # games cycled through by the per-game benchmarks
+
+
+def game_positions(count):
+    """GameStates from the middle of seeded games, to run AI decisions on."""
+    positions = []
+    for seed in range(count):
+        state = engine.new_game(seed=seed)
+        for _ in range(seed % 20):
+            if state.game_over:
+                break
+            engine.play_ai_turn(state)
+        if state.game_over:
+            state = engine.new_game(seed=seed)
+        positions.append(state)
+    return positions
+
+
+def engine_benchmarks():
+    """(name, function, unit) for the headless engine; unit "calls/s" is higher-is-better."""
+    seeds = itertools.cycle(range(SEEDS))
+    positions = game_positions(200)
+    plays = itertools.cycle(positions)
+    calls = itertools.cycle([(state, (state.current_player + 1) % len(state.players), rank, count)
+                             for state in positions for rank in RANKS[:3] for count in (1, 2, 3)])
+
+    def play_turn():
+        state = next(plays)
+        engine.ai_play_turn(state, state.current_player)
+
+    def decide_call():
+        state, seat, rank, count = next(calls)
+        engine.ai_decide_call(state, seat, rank, count)
+
+    return [
+        ("engine.new_game", lambda: engine.new_game(seed=next(seeds)), "calls/s"),
+        ("engine.ai_play_turn", play_turn, "calls/s"),
+        ("engine.ai_decide_call", decide_call, "calls/s"),
+        ("engine.simulate_game", lambda: engine.simulate_game(seed=next(seeds)), "calls/s"),
+    ]
+
+
+def game_benchmarks():
+    """(name, function, unit) for the pygame client; unit "ms" is lower-is-better."""
+    # The client parses its own command line when imported
+    argv, sys.argv = sys.argv, ["game.py"]
+    try:
+        import game
+    finally:
+        sys.argv = argv
+    game.prerender_labels()
+
+    full_deck = [rank for rank in RANKS for _ in range(CARDS_PER_RANK)]
+    hands = {'empty': [], 'typical': full_deck[::3][:engine.CARDS_PER_PLAYER], '40 cards': full_deck[:40]}
+
+    def draw_with_hand(cards):
+        def draw():
+            game.full_redraw = True
+            game.draw_game_state()
+        def setup():
+            game.reset_game()
+            game.state.players[0].hand = engine.Hand(cards)
+            game.selected_indices = set()
+        return setup, draw
+
+    # A card flying to the pile on a clock that advances one 60 fps frame per step
+    now = [0]
+    game.timeline.clock = lambda: now[0]
+
+    def animate_step():
+        if not game.timeline.tweens:
+            game.animate_card_move(game.player_pos(1), game.PILE_POS, game.CARD_BACK)
+        now[0] += 16
+        game.timeline.update()
+        game.draw_frame()
+
+    benchmarks = [("game.reset_game", game.reset_game, "calls/s", None)]
+    for label, cards in hands.items():
+        setup, draw = draw_with_hand(cards)
+        benchmarks.append((f"game.draw_game_state[{label}]", draw, "ms", setup))
+    benchmarks.append(("game.animate_card_move step", animate_step, "ms", game.reset_game))
+    return benchmarks
+
+
+def measure(fn, repeat):
+    """Best seconds per call of fn() over 'repeat' timeit runs of about 0.2 s each."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number
+
+
+def run(repeat, only=None):
+    benchmarks = [(name, fn, unit, None) for name, fn, unit in engine_benchmarks()] + game_benchmarks()
+    results = {}
+    for name, fn, unit, setup in benchmarks:
+        if only and not any(pattern in name for pattern in only):
+            continue
+        if setup is not None:
+            setup()
+        seconds = measure(fn, repeat)
+        value = 1.0 / seconds if unit == "calls/s" else seconds * 1000
+        results[name] = {'value': value, 'unit': unit}
+        print(f"  {name:<36} {value:>14,.3f} {unit}", flush=True)
+    return results
+
+
+def regressions(results, baseline, threshold):
+    """Benchmarks more than 'threshold' (a fraction) worse than the baseline, as (name, change)."""
+    worse = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None or base['unit'] != result['unit']:
+            continue
+        if result['unit'] == "calls/s":
+            change = base['value'] / result['value'] - 1.0    # time per call, relative
+        else:
+            change = result['value'] / base['value'] - 1.0
+        if change > threshold:
+            worse.append((name, change))
+    return worse
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the engine, AI and rendering hot paths.")
+    parser.add_argument("--out", metavar="FILE", help="write the results as JSON")
+    parser.add_argument("--baseline", metavar="FILE", help="compare with results written by an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="fail if a benchmark is this much slower than the baseline (0.10 = 10%%)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", nargs="+", metavar="TEXT", help="run benchmarks whose name contains TEXT")
+    args = parser.parse_args()
+
+    print(f"Python {platform.python_version()}, pygame {pygame.version.ver}, "
+          f"SDL video driver {os.environ['SDL_VIDEODRIVER']}")
+    results = run(args.repeat, args.only)
+    if args.out:
+        report = {'version': BENCH_VERSION, 'time': time.strftime("%Y-%m-%dT%H:%M:%S"),
+                  'python': platform.python_version(), 'pygame': pygame.version.ver,
+                  'machine': platform.machine(), 'video_driver': os.environ['SDL_VIDEODRIVER'],
+                  'results': results}
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=1)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('version') != BENCH_VERSION:
+            parser.error(f"{args.baseline} is not a version {BENCH_VERSION} benchmark file")
+        worse = regressions(results, baseline['results'], args.threshold)
+        for name, change in worse:
+            print(f"REGRESSION {name}: {change:+.1%} time per call")
+        if worse:
+            sys.exit(1)
+        print(f"no regressions above {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
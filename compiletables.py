@@ -0,0 +1,224 @@
+"""Offline compiler of AI policies into lookup tables (see policytable.py).
+
+Every cell of the call and play tables is a bucket of the decision's
+inputs. For each cell the compiler deals --samples random games that fall
+in it: hand and pile sizes drawn from the cell's buckets, the deciding
+seat holding exactly the cell's count of the rank, everything else
+shuffled. It then asks the policy for its decision in each. A call cell
+stores how often the policy called. A play cell stores how often it made
+each action (honest or bluff, and how many cards). Cells no deal can fall
+in keep a default: call only what the own hand proves impossible, play
+honestly when possible.
+
+The work is spread over a ProcessPoolExecutor, one slice of a table (one
+held count) per task. Each slice is seeded from --seed and its position,
+so the output does not depend on the number of workers. Compile time is
+samples x cells x the policy's decision time: minutes for the heuristic,
+much longer for "montecarlo", which is the point, since the tables then
+answer in constant time.
+
+Usage: python compiletables.py [--policy montecarlo] [--players 3 4] [--decks 1] [--samples 16]
+"""
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import engine
+import policytable
+from engine import RANKS, CARDS_PER_RANK, GameState, Hand, Player
+from policytable import SIZE_BUCKETS, PLAY_SCALE, CALL_ALWAYS, bucket_range, hand_range, call_shape, play_shape
+
+engine.load_policies()
+
+ATTEMPTS = 4    # deals tried per sample before a cell counts as impossible
+
+
+def pick_size(rng, size_range, low, high):
+    """A size in size_range (a bucket's (first, last)) and in [low, high], or None if there is none."""
+    first, last = size_range
+    first = max(first, low)
+    last = high if last is None else min(last, high)
+    return rng.randint(first, last) if first <= last else None
+
+
+def split(rng, total, parts):
+    """'total' cut into 'parts' random non-negative sizes."""
+    cuts = sorted(rng.randint(0, total) for _ in range(parts - 1))
+    return [b - a for a, b in zip([0] + cuts, cuts + [total])]
+
+
+def sample_state(rng, n_players, decks, buckets, pile_bucket, pile_min, seat, slot, held):
+    """A random GameState with seats' hand sizes in 'buckets' ({seat: hand bucket}) and the pile in pile_bucket.
+
+    'seat' holds exactly 'held' cards of RANKS[slot]; the other seats share
+    what is left. Returns None if this attempt cannot fit the buckets.
+    """
+    cards_per_rank, _, win_hand_size = engine.table_rules(n_players, decks)
+    total = len(RANKS) * cards_per_rank
+    other_cards = total - cards_per_rank
+    sizes = [None] * n_players
+    for s, b in buckets.items():
+        low, high = (held, held + other_cards) if s == seat else (0, total)
+        sizes[s] = pick_size(rng, hand_range(b, win_hand_size), low, high)
+        if sizes[s] is None:
+            return None
+    left = total - sum(size for size in sizes if size is not None)
+    free = [s for s in range(n_players) if sizes[s] is None]
+    if free:
+        pile_size = pick_size(rng, bucket_range(pile_bucket), pile_min, left)
+        if pile_size is None:
+            return None
+        for s, size in zip(free, split(rng, left - pile_size, len(free))):
+            sizes[s] = size
+    else:
+        pile_size = left
+        first, last = bucket_range(pile_bucket)
+        if pile_size < max(first, pile_min) or (last is not None and pile_size > last):
+            return None
+
+    # The seat's own cards first, then everything else shuffled out to the others and the pile
+    rest = [r for r in range(len(RANKS)) if r != slot for _ in range(cards_per_rank)]
+    rng.shuffle(rest)
+    extra = sizes[seat] - held
+    unseen = rest[extra:] + [slot] * (cards_per_rank - held)
+    rng.shuffle(unseen)
+    hands = []
+    for s, size in enumerate(sizes):
+        if s == seat:
+            cards = [slot] * held + rest[:extra]
+        else:
+            cards, unseen = unseen[:size], unseen[size:]
+        hands.append(Hand(RANKS[r] for r in cards))
+    state = GameState([Player(str(s), True) for s in range(n_players)], random.Random(rng.random()))
+    state.cards_per_rank = cards_per_rank
+    state.win_hand_size = win_hand_size
+    for player, hand in zip(state.players, hands):
+        player.hand = hand
+    state.pile = Hand(RANKS[r] for r in unseen)
+    return state
+
+
+def compile_call_slice(policy_name, n_players, decks, held, samples, seed, params):
+    """Worker: the call table for one held count, shaped call_shape()[1:]."""
+    engine.set_ai_params(params)
+    policy = engine.POLICIES[policy_name]()
+    cards_per_rank = CARDS_PER_RANK * decks
+    rng = random.Random(f"{seed}-call-{n_players}-{decks}-{held}")
+    table = np.zeros(call_shape(cards_per_rank)[1:], dtype=np.uint8)
+    # The caller sits in seat 1, the accused (who just played) in seat 0
+    for (played, pile_b, accused_b, own_b), _ in np.ndenumerate(table):
+        count_played = played + 1
+        calls = tried = 0
+        for _ in range(samples * ATTEMPTS):
+            if tried == samples:
+                break
+            slot = rng.randrange(len(RANKS))
+            state = sample_state(rng, n_players, decks, {0: accused_b, 1: own_b}, pile_b, count_played, 1, slot, held)
+            if state is None:
+                continue
+            for player in state.players:
+                player.policy = policy
+            state.current_rank = RANKS[slot]
+            state.last_play_info = {'player': 0, 'declared': RANKS[slot],
+                                    'cards': state.pile.sorted_cards()[-count_played:]}
+            state.turns = 1
+            calls += bool(policy.decide_call(state, 1, RANKS[slot], count_played))
+            tried += 1
+        if tried:
+            table[played, pile_b, accused_b, own_b] = round(CALL_ALWAYS * calls / tried)
+        elif held + count_played > cards_per_rank:
+            table[played, pile_b, accused_b, own_b] = CALL_ALWAYS
+    return table
+
+
+def compile_play_slice(policy_name, n_players, decks, held, samples, seed, params):
+    """Worker: the play table for one held count, shaped play_shape()[1:]."""
+    engine.set_ai_params(params)
+    policy = engine.POLICIES[policy_name]()
+    cards_per_rank = CARDS_PER_RANK * decks
+    rng = random.Random(f"{seed}-play-{n_players}-{decks}-{held}")
+    table = np.zeros(play_shape(cards_per_rank)[1:], dtype=np.uint16)
+    actions = 2 * cards_per_rank
+    # The player sits in seat 0, the next player in seat 1
+    for own_b in range(SIZE_BUCKETS):
+        for pile_b in range(SIZE_BUCKETS):
+            for next_b in range(SIZE_BUCKETS):
+                tally = np.zeros(actions)
+                for _ in range(samples * ATTEMPTS):
+                    if tally.sum() == samples:
+                        break
+                    slot = rng.randrange(len(RANKS))
+                    state = sample_state(rng, n_players, decks, {0: own_b, 1: next_b}, pile_b, 0, 0, slot, held)
+                    if state is None or not state.players[0].hand:
+                        continue
+                    for player in state.players:
+                        player.policy = policy
+                    state.current_rank = RANKS[slot]
+                    cards = policy.choose_play(state, 0)
+                    if not cards:
+                        continue
+                    count = min(len(cards), cards_per_rank)
+                    honest = all(card == RANKS[slot] for card in cards)
+                    tally[count - 1 + (0 if honest else cards_per_rank)] += 1
+                if not tally.any():
+                    tally[0 if held else cards_per_rank] = 1
+                table[own_b, pile_b, next_b] = np.round(np.cumsum(tally) / tally.sum() * PLAY_SCALE)
+    return table
+
+
+def compile_tables(policy_name, shapes, samples=16, seed=0, workers=None):
+    """Compile 'policy_name' for every (players, decks) in 'shapes'; returns {shape: (call, play)}."""
+    params = engine.ai_params()
+    jobs = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for players, decks in shapes:
+            for held in range(CARDS_PER_RANK * decks + 1):
+                for kind, fn in (("call", compile_call_slice), ("play", compile_play_slice)):
+                    future = pool.submit(fn, policy_name, players, decks, held, samples, seed, params)
+                    jobs.append(((players, decks), kind, future))
+        slices = {}
+        for shape, kind, future in jobs:
+            slices.setdefault((shape, kind), []).append(future.result())
+    return {shape: (np.stack(slices[shape, "call"]), np.stack(slices[shape, "play"])) for shape in shapes}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile an AI policy into lookup tables.")
+    parser.add_argument("--policy", default="montecarlo", help=f"one of: {', '.join(sorted(engine.POLICIES))}")
+    parser.add_argument("--players", type=int, nargs="+", default=[engine.PLAYERS_COUNT],
+                        help="table sizes to compile for")
+    parser.add_argument("--decks", type=int, nargs="+", default=[1], help="deck counts to compile for")
+    parser.add_argument("--samples", type=int, default=16, help="deals per table cell")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--params", metavar="FILE", default=None,
+                        help="AI constants to use instead of ai_params.json (see tune.py)")
+    parser.add_argument("--out", metavar="FILE", default=policytable.TABLES_FILE)
+    args = parser.parse_args()
+    if args.policy not in engine.POLICIES or args.policy == policytable.CompiledPolicy.name:
+        parser.error(f"cannot compile policy {args.policy!r}")
+    shapes = [(players, decks) for players in args.players for decks in args.decks]
+    for players, decks in shapes:
+        try:
+            engine.table_rules(players, decks)
+        except ValueError as e:
+            parser.error(str(e))
+
+    if args.params:
+        engine.load_ai_params(args.params)
+    start = time.perf_counter()
+    sets = compile_tables(args.policy, shapes, args.samples, args.seed, args.workers)
+    elapsed = time.perf_counter() - start
+    policytable.write_tables(args.out, sets, {'policy': args.policy, 'samples': args.samples, 'seed': args.seed,
+                                              'params': engine.ai_params()})
+    cells = sum(call.size + play.size // play.shape[-1] for call, play in sets.values())
+    print(f"Compiled {args.policy} for {len(shapes)} table shape(s), {cells} cells x {args.samples} samples, "
+          f"in {elapsed:.1f}s on {args.workers} worker(s); wrote {os.path.getsize(args.out)} bytes to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""Exact endgame solver: win chances against the built-in AI, by memoized expectimax.
+
+With every hand known, the only chance left in a game is the heuristic AI's
+own dice: which cards ai_play_turn() throws, and whether ai_decide_call()
+and find_caller() produce a call. EndgameSolver enumerates those outcomes
+exactly (engine.ai_play_outcomes() and engine.ai_call_probability()). The
+"hero" seat picks its best play and call at every step. The value of a
+position is the chance that the hero wins within the next 'horizon' plays.
+
+Positions are keyed by (hands, pile, player, rank slot, plays left), with
+the hands and pile as bytes of rank counts, in an LRU-bounded table. Near
+the end of a game the same positions come up again and again, so a warm
+lookup is a single dict hit.
+
+Real players cannot see the other hands, so the hint overlay in game.py
+and EndgamePolicy ("endgame") average the solver's values over deals
+sampled with montecarlo.determinize(). They only count what their seat can
+see or has deduced: a CardTracker follows the game for it.
+"""
+import random
+from collections import OrderedDict
+from functools import lru_cache
+
+import engine
+from engine import RANKS, WIN_HAND_SIZE, CARDS_PER_RANK, HeuristicPolicy, split_counts
+from montecarlo import determinize, honest_prior
+from tracker import CardTracker
+
+ENDGAME_MARGIN = 3       # endgame: some hand is within this many cards of winning
+HORIZON = 4              # plays looked ahead by EndgamePolicy and the hint
+SAMPLES = 6              # sampled deals averaged over per decision
+
+
+class EndgameSolver:
+    """Exact win chances of seat 'hero' within 'horizon' plays, every other seat being the heuristic AI.
+
+    'win_hand_size' and 'cards_per_rank' are the table's rules (engine.table_rules()).
+    """
+
+    def __init__(self, hero, n_players=engine.PLAYERS_COUNT, horizon=HORIZON, max_entries=200000,
+                 win_hand_size=WIN_HAND_SIZE, cards_per_rank=CARDS_PER_RANK):
+        self.hero = hero
+        self.n_players = n_players
+        self.win_hand_size = win_hand_size
+        self.cards_per_rank = cards_per_rank
+        self.horizon = horizon
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._table = OrderedDict()
+
+    def play_values(self, hands, pile, slot):
+        """Win chance of each play (slot, count) the hero can make, the hero being to play 'slot'."""
+        hero = self.hero
+        return {(s, k): self._after_play(hands, pile, hero, slot, s, k, self.horizon)
+                for s, k in hero_plays(hands[hero], self.horizon, self.win_hand_size)}
+
+    def call_values(self, hands, pile, accused, slot, count):
+        """Win chances (no call, call) for the hero after 'accused' played 'count' as 'slot'.
+
+        'hands' and 'pile' are as they are after the play.
+        """
+        return self._reactions(hands, pile, accused, slot, count, self.horizon)
+
+    def value(self, hands, pile, player, slot, plays_left):
+        """Chance that the hero wins within plays_left plays, 'player' being to play 'slot'."""
+        # Hand sizes only shrink by playing, so the hero can only win on its
+        # own plays: nothing to find if it does not get another one in time
+        if (self.hero - player) % self.n_players >= plays_left:
+            return 0.0
+        key = (hands, pile, player, slot, plays_left)
+        table = self._table
+        found = table.get(key)
+        if found is not None:
+            table.move_to_end(key)
+            self.hits += 1
+            return found
+        self.misses += 1
+        if player == self.hero:
+            result = max(self._after_play(hands, pile, player, slot, s, k, plays_left)
+                         for s, k in hero_plays(hands[player], plays_left, self.win_hand_size))
+        else:
+            result = sum(chance * self._after_play(hands, pile, player, slot, s, k, plays_left)
+                         for chance, s, k in engine.ai_play_outcomes(hands[player], slot))
+        table[key] = result
+        if len(table) > self.max_entries:
+            table.popitem(last=False)
+        return result
+
+    def _after_play(self, hands, pile, player, slot, played_slot, count, plays_left):
+        hand = bytearray(hands[player])
+        hand[played_slot] -= count
+        hands = hands[:player] + (bytes(hand),) + hands[player + 1:]
+        new_pile = bytearray(pile)
+        new_pile[played_slot] += count
+        no_call, call = self._reactions(hands, bytes(new_pile), player, slot, count, plays_left)
+        return max(no_call, call)
+
+    def _reactions(self, hands, pile, accused, slot, count, plays_left):
+        """(no call, call) values for the hero after a play; the two are equal if the hero made it."""
+        hero = self.hero
+        others = [i for i in range(self.n_players) if i not in (accused, hero)]
+        no_call = sum(chance * self._resolve(hands, pile, accused, caller, slot, plays_left)
+                      for chance, caller in ai_callers(hands, others, slot, count, self.cards_per_rank))
+        if accused == hero:
+            return no_call, no_call
+        return no_call, self._resolve(hands, pile, accused, hero, slot, plays_left)
+
+    def _resolve(self, hands, pile, accused, caller, slot, plays_left):
+        """Value once the play by 'accused' is settled (uncalled if caller is None); as engine.resolve_call()."""
+        hero = self.hero
+        n_players = self.n_players
+        next_player = (accused + 1) % n_players
+        next_slot = (slot + 1) % len(RANKS)
+        if caller is None:
+            if sum(hands[accused]) <= self.win_hand_size:
+                return 1.0 if accused == hero else 0.0
+            return self.value(hands, pile, next_player, next_slot, plays_left - 1)
+        # The win check only needs hand sizes, so do it before splitting the pile
+        pile_size = sum(pile)
+        gained = {accused: pile_size // 2, caller: pile_size - pile_size // 2}
+        winner = None
+        for i, hand in enumerate(hands):
+            if sum(hand) + gained.get(i, 0) <= self.win_hand_size:
+                winner = i
+        if winner is not None:
+            return 1.0 if winner == hero else 0.0
+        if plays_left <= 1:
+            return 0.0
+        accused_share, caller_share = split_counts(pile, pile_size // 2)
+        hands = list(hands)
+        hands[accused] = bytes(a + b for a, b in zip(hands[accused], accused_share))
+        hands[caller] = bytes(a + b for a, b in zip(hands[caller], caller_share))
+        return self.value(tuple(hands), bytes(len(pile)), next_player, next_slot, plays_left - 1)
+
+    def clear(self):
+        self._table.clear()
+
+    def __len__(self):
+        return len(self._table)
+
+
+def hero_plays(counts, plays_left, win_hand_size=WIN_HAND_SIZE):
+    """Plays open to a player who may throw any number of cards of one rank (like the human).
+
+    On the last play of the horizon only plays that bring the hand down to
+    a winning size are worth looking at.
+    """
+    fewest = sum(counts) - win_hand_size if plays_left <= 1 else 1
+    plays = [(slot, k) for slot, n in enumerate(counts) for k in range(max(1, fewest), n + 1)]
+    return plays or [(slot, 1) for slot, n in enumerate(counts) if n][:1]
+
+
+def ai_callers(hands, candidates, slot, count, cards_per_rank=CARDS_PER_RANK):
+    """Who calls a play among heuristic AI 'candidates', as (probability, seat or None)."""
+    return caller_odds(tuple(candidates),
+                       tuple(engine.ai_call_probability(hands[i][slot], count, None, cards_per_rank)
+                             for i in candidates))
+
+
+@lru_cache(maxsize=4096)
+def caller_odds(candidates, chances):
+    """ai_callers() for the given call chance of each candidate.
+
+    find_caller() asks the candidates in a random order and the first call
+    wins, so every order is weighed equally. A random order is the order of
+    independent uniform times t in [0, 1], so candidate i calls first with
+    chance p_i * integral over t of prod_{j != i} (1 - p_j t): a polynomial
+    in t, integrated term by term. That is O(n^2) per candidate instead of
+    O(n!) orders, which matters at a ten-seat table.
+    """
+    nobody = 1.0
+    for chance in chances:
+        nobody *= 1.0 - chance
+    outcomes = [(nobody, None)] if nobody > 0.0 else []
+    odds = []
+    for i, chance in enumerate(chances):
+        poly = [1.0]             # coefficients of prod (1 - p_j t), lowest power first
+        for j, other in enumerate(chances):
+            if j != i and other:
+                poly = [a - other * b for a, b in zip(poly + [0.0], [0.0] + poly)]
+        odds.append(chance * sum(c / (k + 1) for k, c in enumerate(poly)))
+    outcomes += [(chance, seat) for seat, chance in zip(candidates, odds) if chance > 0.0]
+    return tuple(outcomes)
+
+
+def in_endgame(state):
+    return any(len(p.hand) <= state.win_hand_size + ENDGAME_MARGIN for p in state.players)
+
+
+def solver_state(state):
+    """The hands and pile of a GameState in the solver's form."""
+    return tuple(p.hand.frozen() for p in state.players), state.pile.frozen()
+
+
+def hint(solver, state, rng, samples=SAMPLES):
+    """Average play values over 'samples' deals consistent with what the hero can see.
+
+    Returns {(rank, count): win chance}; the hero must be the player to move.
+    """
+    return deal_values(solver, sample_deals(state, solver.hero, rng, samples), engine.RANK_INDEX[state.current_rank])
+
+
+def sample_deals(state, hero, rng, samples=SAMPLES):
+    """'samples' deals consistent with what 'hero' can see, as solver states (hands, pile)."""
+    return [solver_state(determinize(state, hero, rng)) for _ in range(samples)]
+
+
+def deal_values(solver, deals, slot):
+    """hint() over deals from sample_deals(), the rank to play being RANKS[slot].
+
+    It reads no GameState, so the client can run it on its AI worker while
+    the game goes on.
+    """
+    totals = {}
+    for hands, pile in deals:
+        for play, v in solver.play_values(hands, pile, slot).items():
+            totals[play] = totals.get(play, 0.0) + v / len(deals)
+    return {(RANKS[s], k): v for (s, k), v in totals.items()}
+
+
+class EndgamePolicy(HeuristicPolicy):
+    """The heuristic AI, but in the endgame it plays and calls by EndgameSolver over sampled deals."""
+    name = "endgame"
+
+    def __init__(self, horizon=HORIZON, samples=SAMPLES):
+        self.horizon = horizon
+        self.samples = samples
+        self._solvers = {}
+
+    def _solver(self, state, seat):
+        solver = self._solvers.get(seat)
+        if (solver is None or solver.n_players != len(state.players)
+                or solver.win_hand_size != state.win_hand_size or solver.cards_per_rank != state.cards_per_rank):
+            solver = self._solvers[seat] = EndgameSolver(seat, len(state.players), self.horizon,
+                                                         win_hand_size=state.win_hand_size,
+                                                         cards_per_rank=state.cards_per_rank)
+        return solver
+
+    def start_game(self, state, player_index):
+        # The sampled deals keep the cards this seat knows about in place (see determinize())
+        state.listeners.append(CardTracker(state, player_index))
+
+    def choose_play(self, state, player_index):
+        if not in_endgame(state):
+            return super().choose_play(state, player_index)
+        rng = random.Random(state.rng.getrandbits(32))
+        values = hint(self._solver(state, player_index), state, rng, self.samples)
+        rank, count = max(values, key=values.get)
+        if values[(rank, count)] <= 0.0:
+            # No win in sight within the horizon: nothing to choose between
+            return super().choose_play(state, player_index)
+        return [rank] * count
+
+    def decide_call(self, state, ai_index, declared_rank, count_played):
+        held = state.players[ai_index].hand.count(declared_rank)
+        if held + count_played > state.cards_per_rank or not in_endgame(state):
+            return super().decide_call(state, ai_index, declared_rank, count_played)
+        solver = self._solver(state, ai_index)
+        info = state.last_play_info
+        rng = random.Random(state.rng.getrandbits(32))
+        slot = engine.RANK_INDEX[declared_rank]
+        margin = 0.0
+        for _ in range(self.samples):
+            hands, pile = solver_state(determinize(state, ai_index, rng, info, honest_prior()))
+            no_call, call = solver.call_values(hands, pile, info['player'], slot, count_played)
+            margin += call - no_call
+        if margin == 0.0:
+            return super().decide_call(state, ai_index, declared_rank, count_played)
+        return margin > 0.0
+
+
+engine.POLICIES[EndgamePolicy.name] = EndgamePolicy
@@ -0,0 +1,671 @@
+"""Headless rules engine for the Bluff card game.
+
+Nothing in here touches pygame, so it can be imported by the pygame
+front-end (game.py) as well as by simulations and AI tuning scripts.
+"""
+import importlib
+import json
+import os
+import random
+import warnings
+from array import array
+
+# Card ranks in play and total cards
+RANKS = list(range(2, 9))          # [2,3,4,5,6,7,8]
+CARDS_PER_RANK = 6
+TOTAL_CARDS = CARDS_PER_RANK * len(RANKS)  # 42 cards total
+PLAYERS_COUNT = 3
+CARDS_PER_PLAYER = TOTAL_CARDS // PLAYERS_COUNT  # 14 each
+WIN_HAND_SIZE = 5  # a player with this many cards or fewer wins
+# Table sizes new_game() accepts: 2-10 players, each rank CARDS_PER_RANK times per deck
+MIN_PLAYERS, MAX_PLAYERS = 2, 10
+MAX_DECKS = 4
+
+# AI behaviour constants (shared by ai_play_turn/ai_decide_call and batch.py)
+BLUFF_CHANCE = 0.3                 # bluff even when holding the required rank
+DOUBLE_PLAY_CHANCE = 0.5           # play two cards when holding more than one
+CALL_PROB_ACCOUNTED_MULTI = 0.5    # all cards of the rank accounted for, 2+ played
+CALL_PROB_ACCOUNTED_SINGLE = 0.2   # all cards of the rank accounted for, 1 played
+CALL_PROB_BIG_PLAY = 0.3           # 3+ cards played, some still unaccounted
+CALL_PROB_PAIR = 0.1               # 2 cards played, some still unaccounted
+
+# The constants above as a parameter vector, in this order (see
+# HeuristicPolicy(params) and tune.py). ai_params.json next to this file,
+# if there is one, replaces the defaults when the engine is imported.
+AI_PARAMS = ('BLUFF_CHANCE', 'DOUBLE_PLAY_CHANCE', 'CALL_PROB_ACCOUNTED_MULTI',
+             'CALL_PROB_ACCOUNTED_SINGLE', 'CALL_PROB_BIG_PLAY', 'CALL_PROB_PAIR')
+PARAMS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ai_params.json")
+PARAMS_VERSION = 1
+
+
+def ai_params():
+    """The AI behaviour constants in use, as a tuple in AI_PARAMS order."""
+    return tuple(globals()[name] for name in AI_PARAMS)
+
+
+def set_ai_params(params):
+    """Replace the AI behaviour constants by a parameter vector (AI_PARAMS order)."""
+    try:
+        params = tuple(float(value) for value in params)
+    except (TypeError, ValueError):
+        raise ValueError(f"expected {len(AI_PARAMS)} probabilities, got {params!r}") from None
+    if len(params) != len(AI_PARAMS) or not all(0.0 <= value <= 1.0 for value in params):
+        raise ValueError(f"expected {len(AI_PARAMS)} probabilities, got {params!r}")
+    globals().update(zip(AI_PARAMS, params))
+
+
+def load_ai_params(path=PARAMS_FILE):
+    """Use the AI behaviour constants saved in 'path' by save_ai_params(); returns the file's data.
+
+    Raises ValueError if the file is not a complete parameter file of this
+    PARAMS_VERSION; the constants in use are then left alone.
+    """
+    with open(path) as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or data.get('version') != PARAMS_VERSION:
+        raise ValueError(f"{path} is not a version {PARAMS_VERSION} AI parameter file")
+    try:
+        params = [data['params'][name] for name in AI_PARAMS]
+    except (KeyError, TypeError):
+        raise ValueError(f"{path} does not give every one of {', '.join(AI_PARAMS)}") from None
+    set_ai_params(params)
+    return data
+
+
+def save_ai_params(path, params, **info):
+    """Write a parameter vector to 'path', with any extra 'info' (e.g. how it was tuned)."""
+    data = {'version': PARAMS_VERSION, 'params': dict(zip(AI_PARAMS, params)), **info}
+    with open(path + ".tmp", "w") as f:
+        json.dump(data, f, indent=1)
+    os.replace(path + ".tmp", path)
+
+
+def load_saved_params(path=PARAMS_FILE):
+    """load_ai_params(path) if there is such a file, as done on import; returns its data or None.
+
+    A file that does not load (unreadable, not JSON, an old version) only
+    warns: the constants stay as they were, rather than every import failing.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        return load_ai_params(path)
+    except (OSError, ValueError) as e:
+        warnings.warn(f"ignoring {path} ({e}); the AI keeps its built-in constants")
+        return None
+
+
+DEFAULT_AI_PARAMS = ai_params()
+load_saved_params()
+
+# Slot of each rank in a count vector (one slot per entry of RANKS)
+RANK_INDEX = {rank: i for i, rank in enumerate(RANKS)}
+
+# Names of the AI seats, in seat order
+AI_NAMES = ["John", "Albert", "Maria", "Chen", "Amara", "Ivan", "Lucia", "Kenji", "Noor"]
+
+
+def default_seats(n_players=PLAYERS_COUNT):
+    """The human in seat 0 and n_players - 1 AI opponents."""
+    return [("You", False)] + [(name, True) for name in AI_NAMES[:n_players - 1]]
+
+
+def table_rules(n_players=PLAYERS_COUNT, decks=1):
+    """(cards per rank, cards per player, win hand size) of a table.
+
+    The deal goes round as far as the cards allow; the rest start the pile.
+    The winning hand size scales with the deal, WIN_HAND_SIZE of
+    CARDS_PER_PLAYER at the standard 3-player, one-deck table.
+    """
+    if not MIN_PLAYERS <= n_players <= MAX_PLAYERS:
+        raise ValueError(f"{n_players} players: a table seats {MIN_PLAYERS} to {MAX_PLAYERS}")
+    if not 1 <= decks <= MAX_DECKS:
+        raise ValueError(f"{decks} decks: a table uses 1 to {MAX_DECKS}")
+    cards_per_rank = CARDS_PER_RANK * decks
+    cards_per_player = cards_per_rank * len(RANKS) // n_players
+    return cards_per_rank, cards_per_player, max(1, cards_per_player * WIN_HAND_SIZE // CARDS_PER_PLAYER)
+
+
+# Default seating: the human in seat 0 and two AI opponents
+DEFAULT_SEATS = default_seats()
+
+
+class Hand:
+    """A multiset of cards stored as one count per entry of RANKS.
+
+    Count lookups, adds and removes are O(1); merging or splitting a pile is
+    O(len(RANKS)). Iterating or indexing a Hand walks a sorted list of card
+    ranks that is only rebuilt after the counts change, which is what the
+    display and the human's card selection use. frozen() likewise caches
+    the counts as bytes for state snapshots.
+    """
+    __slots__ = ('counts', 'size', '_sorted', '_frozen')
+
+    def __init__(self, cards=()):
+        self.counts = array('B', bytes(len(RANKS)))
+        self.size = 0
+        self._sorted = None
+        self._frozen = None
+        for card in cards:
+            self.counts[RANK_INDEX[card]] += 1
+            self.size += 1
+
+    def count(self, rank):
+        return self.counts[RANK_INDEX[rank]]
+
+    def add(self, rank, n=1):
+        self.counts[RANK_INDEX[rank]] += n
+        self.size += n
+        self._sorted = self._frozen = None
+
+    def remove(self, rank, n=1):
+        i = RANK_INDEX[rank]
+        if self.counts[i] < n:
+            raise ValueError(f"hand holds fewer than {n} card(s) of rank {rank}")
+        self.counts[i] -= n
+        self.size -= n
+        self._sorted = self._frozen = None
+
+    def add_counts(self, counts):
+        """Add a whole count vector (e.g. a share of the pile) to this hand."""
+        own = self.counts
+        for i, n in enumerate(counts):
+            if n:
+                own[i] += n
+                self.size += n
+        self._sorted = self._frozen = None
+
+    def clear(self):
+        self.counts = array('B', bytes(len(RANKS)))
+        self.size = 0
+        self._sorted = self._frozen = None
+
+    def frozen(self):
+        """Return the counts as bytes (cached, so unchanged hands share one object)."""
+        if self._frozen is None:
+            self._frozen = self.counts.tobytes()
+        return self._frozen
+
+    def set_frozen(self, frozen):
+        """Replace the counts with those of a frozen() value."""
+        self.counts = array('B', frozen)
+        self.size = sum(frozen)
+        self._sorted = None
+        self._frozen = frozen
+
+    def sorted_cards(self):
+        """Return the cards as a sorted list of ranks (cached until the hand changes)."""
+        if self._sorted is None:
+            cards = []
+            for rank, n in zip(RANKS, self.counts):
+                cards += [rank] * n
+            self._sorted = cards
+        return self._sorted
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, rank):
+        return self.counts[RANK_INDEX[rank]] > 0
+
+    def __iter__(self):
+        return iter(self.sorted_cards())
+
+    def __getitem__(self, index):
+        return self.sorted_cards()[index]
+
+    def __repr__(self):
+        return f"Hand({self.sorted_cards()!r})"
+
+
+# Define a Player class to hold player info
+class Player:
+    def __init__(self, name, is_ai, policy=None):
+        self.name = name
+        self.is_ai = is_ai
+        self.hand = Hand()  # counts of card ranks in player's hand
+        self.policy = policy or DEFAULT_POLICY  # decides plays and calls for AI seats
+
+
+class GameState:
+    """Everything needed to continue a game, with no display state mixed in."""
+
+    def __init__(self, players, rng):
+        self.players = players
+        self.rng = rng                  # random.Random driving the deal and every AI decision
+        self.current_player = 0         # index of current player's turn
+        self.current_rank = RANKS[0]    # current required rank to play (cycles through RANKS)
+        self.pile = Hand()              # face-down pile of played cards (rank counts)
+        self.last_play_info = None      # {'player', 'declared', 'cards'} of the latest play
+        self.game_over = False
+        self.winner = None              # name of the winning player
+        self.turns = 0                  # number of plays made so far
+        self.listeners = []             # GameListeners told of plays, calls and the end
+        self.cards_per_rank = CARDS_PER_RANK    # table rules (see table_rules())
+        self.win_hand_size = WIN_HAND_SIZE
+
+    def snapshot(self):
+        """Return an immutable Snapshot of the rules state (not the rng or listeners)."""
+        info = self.last_play_info
+        last_play = info and (info['player'], info['declared'], tuple(info['cards']))
+        return Snapshot(tuple(p.hand.frozen() for p in self.players), self.pile.frozen(),
+                        self.current_player, self.current_rank, last_play,
+                        self.game_over, self.winner, self.turns)
+
+    def restore(self, snap):
+        """Put the state back to 'snap', taken from this game (e.g. to undo or after a lookahead)."""
+        for player, frozen in zip(self.players, snap.hands):
+            if player.hand._frozen is not frozen:
+                player.hand.set_frozen(frozen)
+        if self.pile._frozen is not snap.pile:
+            self.pile.set_frozen(snap.pile)
+        self.current_player = snap.current_player
+        self.current_rank = snap.current_rank
+        last_play = snap.last_play
+        self.last_play_info = last_play and {'player': last_play[0], 'declared': last_play[1],
+                                             'cards': list(last_play[2])}
+        self.game_over = snap.game_over
+        self.winner = snap.winner
+        self.turns = snap.turns
+
+
+class Snapshot:
+    """An immutable copy of a GameState's rules state, hashed once when it is made.
+
+    Hands and the pile are bytes of rank counts shared with the Hand they
+    came from (and so with other snapshots while that hand is unchanged), so
+    taking a snapshot is O(players) and forking one is free: just keep the
+    reference. Equal snapshots hash equal, so they can key a dict of search
+    results.
+    """
+    __slots__ = ('hands', 'pile', 'current_player', 'current_rank', 'last_play',
+                 'game_over', 'winner', 'turns', '_hash')
+
+    def __init__(self, hands, pile, current_player, current_rank, last_play, game_over, winner, turns):
+        init = object.__setattr__           # bypasses the immutability guard below
+        init(self, 'hands', hands)          # tuple of bytes, one count per rank per player
+        init(self, 'pile', pile)
+        init(self, 'current_player', current_player)
+        init(self, 'current_rank', current_rank)
+        init(self, 'last_play', last_play)  # (player, declared, cards) or None
+        init(self, 'game_over', game_over)
+        init(self, 'winner', winner)
+        init(self, 'turns', turns)
+        init(self, '_hash', hash((hands, pile, current_player, current_rank, last_play,
+                                  game_over, winner, turns)))
+
+    def _fields(self):
+        return (self.hands, self.pile, self.current_player, self.current_rank, self.last_play,
+                self.game_over, self.winner, self.turns)
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        if not isinstance(other, Snapshot):
+            return NotImplemented
+        return self._hash == other._hash and self._fields() == other._fields()
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Snapshot is immutable")
+
+    def __repr__(self):
+        return (f"Snapshot(turn {self.turns}, player {self.current_player}, rank {self.current_rank}, "
+                f"hands {[sum(h) for h in self.hands]}, pile {sum(self.pile)})")
+
+
+class GameListener:
+    """Base class for objects in GameState.listeners; override the events you need."""
+
+    def on_play(self, state, player, cards):
+        """'player' has just put 'cards' on the pile (state.last_play_info is set)."""
+
+    def on_call(self, state, accused, caller):
+        """'caller' called the last play and the pile has been split between the two."""
+
+    def on_game_over(self, state, winner):
+        """Seat 'winner' has won (None: the game was abandoned, e.g. at a turn limit)."""
+
+
+def new_game(seats=DEFAULT_SEATS, seed=None, policies=None, decks=1):
+    """Shuffle, deal and return a fresh GameState for the given (name, is_ai) seats.
+
+    The game gets its own random.Random(seed), so the same seed replays the
+    same game. 'policies' optionally gives the AI policy of each seat, and
+    'decks' how many 42-card decks are shuffled together.
+    """
+    cards_per_rank, cards_per_player, win_hand_size = table_rules(len(seats), decks)
+    rng = random.Random(seed)
+    # Create and shuffle the deck (42 cards per deck)
+    deck = []
+    for rank in RANKS:
+        deck += [rank] * cards_per_rank
+    rng.shuffle(deck)
+    # Initialize players and deal cards
+    policies = policies or [None] * len(seats)
+    players = [Player(name, is_ai, policy) for (name, is_ai), policy in zip(seats, policies)]
+    for i, player in enumerate(players):
+        hand_cards = deck[i*cards_per_player : (i+1)*cards_per_player]
+        player.hand = Hand(hand_cards)
+    state = GameState(players, rng)
+    state.cards_per_rank = cards_per_rank
+    state.win_hand_size = win_hand_size
+    # Cards left over when the deck does not divide evenly start the pile
+    state.pile = Hand(deck[len(players) * cards_per_player:])
+    # Choose a random starting player and starting rank 2
+    state.current_player = rng.randrange(len(players))
+    state.current_rank = RANKS[0]
+    # Let policies that follow the game (e.g. by counting cards) attach to it
+    for i, player in enumerate(players):
+        start_game = getattr(player.policy, 'start_game', None)
+        if start_game is not None:
+            start_game(state, i)
+    return state
+
+
+def next_rank(rank):
+    """Return the rank that has to be played after 'rank'."""
+    return RANKS[(RANK_INDEX[rank] + 1) % len(RANKS)]
+
+
+def is_bluff(play_info):
+    """Return True if any card of the recorded play differs from the declared rank."""
+    if not play_info:
+        return False
+    declared = play_info['declared']
+    return any(card != declared for card in play_info['cards'])
+
+
+def apply_play(state, cards):
+    """Move 'cards' from the current player's hand onto the pile, declared as the current rank."""
+    hand = state.players[state.current_player].hand
+    pile = state.pile
+    for card in cards:
+        hand.remove(card)
+        pile.add(card)
+    # Record last play info for potential bluff checking
+    state.last_play_info = {'player': state.current_player,
+                            'declared': state.current_rank,
+                            'cards': list(cards)}
+    state.turns += 1
+    for listener in state.listeners:
+        listener.on_play(state, state.current_player, cards)
+
+
+def split_counts(counts, first):
+    """Split a count vector in two, the first part taking the 'first' lowest-ranked cards."""
+    head = array('B', bytes(len(counts)))
+    tail = array('B', counts)
+    for i, n in enumerate(counts):
+        if first <= 0:
+            break
+        take = n if n < first else first
+        head[i] = take
+        tail[i] -= take
+        first -= take
+    return head, tail
+
+
+def _advance_turn(state, from_index):
+    state.current_player = (from_index + 1) % len(state.players)
+    state.current_rank = next_rank(state.current_rank)
+
+
+def resolve_call(state, caller_index):
+    """Settle the last play, either uncalled (caller_index None) or called by caller_index.
+
+    Returns None if nobody called, otherwise True if the accused was bluffing.
+    """
+    accused_index = state.last_play_info['player']
+    players = state.players
+    if caller_index is None:
+        # No call: the play stands, check if the player who just played won
+        if len(players[accused_index].hand) <= state.win_hand_size:
+            _end_game(state, accused_index)
+        else:
+            _advance_turn(state, accused_index)
+        return None
+    liar = is_bluff(state.last_play_info)
+    # Split the pile between the accused and the caller;
+    # if odd number of cards, the caller takes the extra one
+    accused_share, caller_share = split_counts(state.pile.counts, len(state.pile) // 2)
+    players[accused_index].hand.add_counts(accused_share)
+    players[caller_index].hand.add_counts(caller_share)
+    state.pile.clear()
+    for listener in state.listeners:
+        listener.on_call(state, accused_index, caller_index)
+    # Next player is the one after the accused regardless of call outcome
+    _advance_turn(state, accused_index)
+    # After call resolution, check win condition for any player
+    winner_index = None
+    for i, player in enumerate(players):
+        if len(player.hand) <= state.win_hand_size:
+            winner_index = i
+    if winner_index is not None:
+        _end_game(state, winner_index)
+    return liar
+
+
+def _end_game(state, winner_index):
+    state.game_over = True
+    state.winner = state.players[winner_index].name
+    for listener in state.listeners:
+        listener.on_game_over(state, winner_index)
+
+
+# Helper function for AI to decide what cards to play on its turn
+def ai_play_turn(state, player_index, params=None):
+    """Select cards for AI player to play. Returns list of actual card ranks chosen.
+
+    The cards stay in the hand; pass them to apply_play() to play them.
+    'params' optionally replaces the AI behaviour constants (AI_PARAMS order).
+    """
+    bluff_chance, double_play_chance = params[:2] if params else (BLUFF_CHANCE, DOUBLE_PLAY_CHANCE)
+    hand = state.players[player_index].hand
+    required_rank = state.current_rank
+    actual_cards = []  # cards AI will actually play from its hand
+
+    # Check if AI has any card of the required rank
+    has_required = required_rank in hand
+    will_bluff = False
+    if has_required:
+        # AI has at least one required-rank card; decide randomly if to bluff
+        # (e.g., 30% chance to bluff even if it can play honestly)
+        if state.rng.random() < bluff_chance:
+            will_bluff = True
+    else:
+        # AI does not have the required rank, so it must bluff
+        will_bluff = True
+
+    if not will_bluff:
+        # Play honestly: use one (sometimes two) of the required rank
+        count_required = hand.count(required_rank)
+        # If AI has multiple of the rank, it might play 2 at once (50% chance)
+        cards_to_play = 1
+        if count_required > 1 and state.rng.random() < double_play_chance:
+            cards_to_play = 2
+        actual_cards = [required_rank] * cards_to_play
+    else:
+        # Bluffing: choose a card (or two) of some other rank to play
+        # Choose the rank the AI has the most of (lowest rank on ties), to discard heavier
+        counts = hand.counts
+        required_slot = RANK_INDEX[required_rank]
+        best_slot = None
+        for i, n in enumerate(counts):
+            if n and i != required_slot and (best_slot is None or n > counts[best_slot]):
+                best_slot = i
+        if best_slot is None:
+            # If somehow all cards are of the required rank (rare), just use one of them
+            if not counts[required_slot]:
+                return actual_cards  # empty hand, nothing to play
+            best_slot = required_slot
+        rank_to_play = RANKS[best_slot]
+        # Decide to play one or two of that rank
+        count_available = hand.count(rank_to_play)
+        cards_to_play = 1
+        if count_available > 1 and state.rng.random() < double_play_chance:
+            cards_to_play = 2
+        actual_cards = [rank_to_play] * cards_to_play
+    # Now actual_cards contains the ranks AI is throwing (maybe not the same as declared)
+    return actual_cards
+
+
+def ai_play_outcomes(counts, required_slot, params=None):
+    """Every play ai_play_turn() can make from a hand's count vector, as (probability, slot, count).
+
+    Keep in step with ai_play_turn(); exact solvers use this instead of sampling.
+    """
+    bluff_chance, double_play_chance = params[:2] if params else (BLUFF_CHANCE, DOUBLE_PLAY_CHANCE)
+    required = counts[required_slot]
+    best_slot = None
+    for i, n in enumerate(counts):
+        if n and i != required_slot and (best_slot is None or n > counts[best_slot]):
+            best_slot = i
+    bluff_slot = required_slot if best_slot is None else best_slot
+    bluff_chance = bluff_chance if required else 1.0
+    outcomes = []
+    for chance, slot in ((1.0 - bluff_chance, required_slot), (bluff_chance, bluff_slot)):
+        if chance <= 0.0 or not counts[slot]:
+            continue
+        if counts[slot] > 1:
+            outcomes.append((chance * (1.0 - double_play_chance), slot, 1))
+            outcomes.append((chance * double_play_chance, slot, 2))
+        else:
+            outcomes.append((chance, slot, 1))
+    return outcomes
+
+
+def ai_call_probability(ai_count, count_played, params=None, cards_per_rank=CARDS_PER_RANK):
+    """Chance that ai_decide_call() calls a play of count_played cards when the AI holds ai_count of the rank."""
+    accounted_multi, accounted_single, big_play, pair = params[2:] if params else (
+        CALL_PROB_ACCOUNTED_MULTI, CALL_PROB_ACCOUNTED_SINGLE, CALL_PROB_BIG_PLAY, CALL_PROB_PAIR)
+    total_rank_cards = cards_per_rank  # total number of cards of that rank in game (6 per deck)
+    # If the play is impossible given what AI holds (holds + played > all of them), definitely call
+    if ai_count + count_played > total_rank_cards:
+        return 1.0
+    # Otherwise decide based on suspicion factors
+    if ai_count + count_played == total_rank_cards:
+        # All cards of that rank would be accounted for between AI and played cards
+        if count_played >= 2:
+            return accounted_multi  # suspicious if multiple cards claimed and AI has the rest
+        return accounted_single  # slightly suspicious even if one card (AI holds most of them)
+    # There are still unaccounted cards potentially with the other players
+    if count_played >= 3:
+        return big_play  # a big play (3+) is somewhat risky, call with some chance
+    if count_played == 2:
+        return pair  # 2 cards might raise a little suspicion
+    return 0.0  # single card and nothing impossible, likely no call
+
+
+# Helper function for AI to decide whether to call bluff on someone else's play
+def ai_decide_call(state, ai_index, declared_rank, count_played, params=None):
+    """Return True if AI player at ai_index will call bluff on a play of 'count_played' cards of 'declared_rank'."""
+    ai_count = state.players[ai_index].hand.count(declared_rank)  # how many of declared rank AI holds
+    call_prob = ai_call_probability(ai_count, count_played, params, state.cards_per_rank)
+    if call_prob >= 1.0:
+        return True
+    # Randomize the call decision against the probability threshold
+    return (state.rng.random() < call_prob)
+
+
+class HeuristicPolicy:
+    """The built-in AI: ai_play_turn() and ai_decide_call().
+
+    'params' gives it its own behaviour constants (a vector in AI_PARAMS
+    order) instead of the module's, e.g. to try tuned values against them.
+    """
+    name = "heuristic"
+    params = None
+
+    def __init__(self, params=None):
+        self.params = params
+
+    def choose_play(self, state, player_index):
+        return ai_play_turn(state, player_index, self.params)
+
+    def decide_call(self, state, ai_index, declared_rank, count_played):
+        return ai_decide_call(state, ai_index, declared_rank, count_played, self.params)
+
+
+class HonestPolicy:
+    """Plays every card of the required rank it holds and only bluffs when it must.
+
+    Calls bluff only on plays that its own cards prove impossible.
+    """
+    name = "honest"
+
+    def choose_play(self, state, player_index):
+        hand = state.players[player_index].hand
+        required = hand.count(state.current_rank)
+        if required:
+            return [state.current_rank] * required
+        # Forced bluff: get rid of a single card of the lowest rank held
+        return hand.sorted_cards()[:1]
+
+    def decide_call(self, state, ai_index, declared_rank, count_played):
+        held = state.players[ai_index].hand.count(declared_rank)
+        return held + count_played > state.cards_per_rank
+
+
+class RandomPolicy:
+    """Plays one random card and calls bluff on a coin flip; a baseline to beat."""
+    name = "random"
+
+    def choose_play(self, state, player_index):
+        hand = state.players[player_index].hand
+        return [state.rng.choice(hand.sorted_cards())] if hand else []
+
+    def decide_call(self, state, ai_index, declared_rank, count_played):
+        return state.rng.random() < 0.5
+
+
+# Policies selectable by name (e.g. from the tournament command line)
+POLICIES = {cls.name: cls for cls in (HeuristicPolicy, HonestPolicy, RandomPolicy)}
+DEFAULT_POLICY = HeuristicPolicy()
+
+# Modules that add their policies to POLICIES when imported
+POLICY_MODULES = ("montecarlo", "tracker", "endgame", "policytable")
+
+
+def load_policies():
+    """Import every module of POLICY_MODULES, so POLICIES offers every policy; returns POLICIES."""
+    for name in POLICY_MODULES:
+        importlib.import_module(name)
+    return POLICIES
+
+
+def find_caller(state, candidates):
+    """Ask the AI candidates in random order; return the first that calls bluff, or None."""
+    info = state.last_play_info
+    candidates = list(candidates)
+    state.rng.shuffle(candidates)  # randomize order of who gets to react first
+    for ai_idx in candidates:
+        policy = state.players[ai_idx].policy
+        if policy.decide_call(state, ai_idx, info['declared'], len(info['cards'])):
+            return ai_idx
+    return None
+
+
+def play_ai_turn(state):
+    """Play one complete turn headlessly, letting every seat act as an AI."""
+    player_index = state.current_player
+    policy = state.players[player_index].policy
+    apply_play(state, policy.choose_play(state, player_index))
+    others = [i for i in range(len(state.players)) if i != player_index]
+    return resolve_call(state, find_caller(state, others))
+
+
+def simulate_game(seats=DEFAULT_SEATS, seed=None, policies=None, max_turns=10000, log=None, decks=1):
+    """Play a full game with AI on every seat and return the finished GameState.
+
+    'log' is an optional replay.ReplayWriter to record the game to, 'decks'
+    the number of decks dealt (see new_game()).
+    """
+    state = new_game(seats, seed, policies, decks)
+    if log is not None:
+        log.start_game(state, seed)
+    while not state.game_over and state.turns < max_turns:
+        play_ai_turn(state)
+    if log is not None and not state.game_over:
+        log.on_game_over(state, None)
+    return state
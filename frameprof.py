@@ -0,0 +1,83 @@
+"""Per-phase frame profiler for the pygame client.
+
+The main loop calls mark(phase) as each phase of a frame ends, and
+next_frame() at the top of every iteration. The time since the previous
+mark is charged to that phase. The durations of the last 'window' frames
+are kept per phase, from which summary() gives p50/p95/p99. With
+'keep_rows' every frame is also kept for export as CSV.
+
+When the profiler is disabled, mark() and next_frame() return at once, so
+it can stay wired into the loop.
+"""
+import csv
+import time
+from array import array
+
+# Main loop phases, in the order they happen in a frame
+PHASES = ("events", "logic", "draw", "animate", "flip", "sleep")
+PERCENTILES = (50, 95, 99)
+
+
+class FrameProfiler:
+    """Rolling per-phase frame timings over the last 'window' frames."""
+
+    def __init__(self, window=600, keep_rows=False):
+        self.window = window
+        self.keep_rows = keep_rows
+        self.enabled = False
+        self.frames = 0                      # frames recorded since the profiler was created
+        self.rows = []                       # (start, phase ms..., total ms) of every frame, if keep_rows
+        self._samples = {phase: array('d', bytes(8 * window)) for phase in PHASES}
+        self._totals = array('d', bytes(8 * window))
+        self._current = dict.fromkeys(PHASES, 0.0)
+        self._frame_start = self._last = 0.0
+        self._epoch = time.perf_counter()
+
+    def enable(self, on=True):
+        self.enabled = on
+        # Timing starts with the next next_frame(); the frame in progress is not recorded
+        self._frame_start = 0.0
+
+    def mark(self, phase):
+        """The phase 'phase' of the current frame ends now."""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self._current[phase] += now - self._last
+        self._last = now
+
+    def next_frame(self):
+        """Record the frame that just ended and start timing the next one."""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        current = self._current
+        if self._frame_start:
+            slot = self.frames % self.window
+            for phase in PHASES:
+                self._samples[phase][slot] = current[phase] * 1000
+            total = (now - self._frame_start) * 1000
+            self._totals[slot] = total
+            if self.keep_rows:
+                self.rows.append(((self._frame_start - self._epoch) * 1000,)
+                                 + tuple(current[phase] * 1000 for phase in PHASES) + (total,))
+            self.frames += 1
+        self._current = dict.fromkeys(PHASES, 0.0)
+        self._frame_start = self._last = now
+
+    def summary(self):
+        """{phase: (p50, p95, p99)} in ms over the recorded window, 'frame' being whole frames."""
+        n = min(self.frames, self.window)
+        result = {}
+        for phase, samples in list(self._samples.items()) + [("frame", self._totals)]:
+            ordered = sorted(samples[:n])
+            result[phase] = tuple(ordered[min(n - 1, n * q // 100)] if n else 0.0 for q in PERCENTILES)
+        return result
+
+    def export_csv(self, path):
+        """Write every kept frame to 'path' (one row per frame, times in ms)."""
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(("start_ms",) + tuple(f"{phase}_ms" for phase in PHASES) + ("frame_ms",))
+            writer.writerows((f"{value:.3f}" for value in row) for row in self.rows)
+        return len(self.rows)
@@ -1,17 +1,34 @@
-import pygame
+import argparse
+import os
 import random
+import time
+import zlib
+
+# Startup profiling marks: (phase, time it ended); the clock starts before pygame is imported
+startup_marks = [("start", time.perf_counter())]
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame
+
+import engine
+import tracker  # card tracking for endgame hints
+import endgame  # endgame hints
+import policytable
+from aiworker import AIWorker
+from frameprof import FrameProfiler, PERCENTILES, PHASES
+from netclient import NetClient, TableView, parse_address, waiting_state
+import protocol
+from replay import ReplayWriter
+from session import INPUT_EVENTS, SessionPlayer, SessionRecorder
+from engine import RANKS, TOTAL_CARDS, apply_play, resolve_call, find_caller
+from layout import HandLayout
+from textcache import TextCache
+from timeline import Timeline
 
 # Game constants and configurations
 SCREEN_WIDTH, SCREEN_HEIGHT = 1000, 800
 CARD_WIDTH, CARD_HEIGHT = 50, 70
 
-# Card ranks in play and total cards
-RANKS = list(range(2, 9))          # [2,3,4,5,6,7,8]
-CARDS_PER_RANK = 6
-TOTAL_CARDS = CARDS_PER_RANK * len(RANKS)  # 42 cards total
-PLAYERS_COUNT = 3
-CARDS_PER_PLAYER = TOTAL_CARDS // PLAYERS_COUNT  # 14 each
-
 # Colors (RGB)
 GREEN_TABLE = (34, 139, 34)   # table background
 WHITE = (255, 255, 255)
@@ -21,614 +38,953 @@ YELLOW = (255, 255, 0)
 BLUE = (0, 0, 200)
 RED = (200, 0, 0)
 
-# Positions for AI card placeholder stacks and pile
-AI1_POS = (50, 50)  # top-left corner for AI1's cards
-AI2_POS = (SCREEN_WIDTH - 50 - CARD_WIDTH, 50)  # top-right for AI2's cards
-PILE_POS = ((SCREEN_WIDTH // 2) - (CARD_WIDTH // 2), 
+# Timings (milliseconds)
+AI_THINK_MS = 500        # pause before an AI plays
+CALL_WINDOW_MS = 1000    # time the human has to call bluff on an AI's play
+CARD_MOVE_MS = 250       # duration of one card animation
+CARD_STAGGER_MS = 100    # delay between cards when several fly at once
+
+# AI seats sit in up to two rows along the top of the table (see seat_layout)
+AI_SEATS_PER_ROW = 5
+AI_MARGIN = 40           # table edge to the first and last seat column
+AI_ROW_Y = 50            # card stack top of the first row
+AI_ROW_HEIGHT = 125
+AI_AREA_SIZE = (200, 100)
+# Position of the pile
+PILE_POS = ((SCREEN_WIDTH // 2) - (CARD_WIDTH // 2),
             (SCREEN_HEIGHT // 2) - (CARD_HEIGHT // 2))
 
-# Define a Player class to hold player info
-class Player:
-    def __init__(self, name, is_ai):
-        self.name = name
-        self.is_ai = is_ai
-        self.hand = []  # list of card ranks in player's hand
+# Command line options: table size, which AI policy each opponent uses, and
+# an optional seed so a session's deals and AI decisions can be replayed exactly
+engine.load_policies()
+parser = argparse.ArgumentParser(description="Play Bluff against AI opponents.")
+parser.add_argument("--players", type=int, default=engine.PLAYERS_COUNT,
+                    help=f"seats at the table, you included ({engine.MIN_PLAYERS}-{engine.MAX_PLAYERS})")
+parser.add_argument("--decks", type=int, default=1, help="decks shuffled together")
+parser.add_argument("--ai", nargs="+", metavar="POLICY", default=["heuristic"],
+                    choices=sorted(engine.POLICIES), help="policy of every AI, or one per AI seat")
+parser.add_argument("--seed", type=int, default=None, help="seed of the first game")
+parser.add_argument("--fixed-fps", action="store_true",
+                    help="redraw at a steady frame rate even when nothing is happening")
+parser.add_argument("--asset-cache", metavar="DIR", default=None,
+                    help="load/save prerendered card images in this directory")
+parser.add_argument("--startup-profile", action="store_true",
+                    help="print how long each startup phase took once the first frame is shown")
+parser.add_argument("--log", metavar="FILE", default=None,
+                    help="append every game played to this replay log")
+parser.add_argument("--params", metavar="FILE", default=None,
+                    help="AI constants to use instead of ai_params.json (see tune.py)")
+parser.add_argument("--tables", metavar="FILE", default=None,
+                    help="compiled policy tables for the \"compiled\" AI (see compiletables.py)")
+parser.add_argument("--connect", metavar="HOST[:PORT]", default=None,
+                    help="play at a table on a server (server.py) instead of against local AIs")
+parser.add_argument("--profile-csv", metavar="FILE", default=None,
+                    help="time every frame's phases and write them to FILE on exit (F3 shows them)")
+parser.add_argument("--record", metavar="FILE", default=None,
+                    help="record this session's input and timing to FILE (see session.py)")
+parser.add_argument("--playback", metavar="FILE", default=None,
+                    help="play back a session recorded with --record; its table and AI settings are used")
+parser.add_argument("--playback-fast", action="store_true",
+                    help="play the session back as fast as possible instead of at its recorded pace")
+args = parser.parse_args()
+session_player = None
+if args.playback:
+    if args.record or args.connect:
+        parser.error("--playback cannot be combined with --record or --connect")
+    try:
+        session_player = SessionPlayer(args.playback)
+    except (OSError, ValueError) as e:
+        parser.error(f"cannot play back {args.playback}: {e}")
+    for name in ("players", "decks", "ai", "seed", "tables"):
+        setattr(args, name, session_player.settings.get(name, getattr(args, name)))
+if args.record:
+    if args.connect:
+        parser.error("--record records local games only")
+    if args.seed is None:
+        # The session must be replayable, so its deals cannot come from a random seed
+        args.seed = random.randrange(1 << 32)
+try:
+    CARDS_PER_RANK, CARDS_PER_PLAYER, WIN_HAND_SIZE = engine.table_rules(args.players, args.decks)
+except ValueError as e:
+    parser.error(str(e))
+if len(args.ai) not in (1, args.players - 1):
+    parser.error(f"--ai takes one policy or {args.players - 1} (one per AI seat)")
+if args.connect and args.log:
+    parser.error("--log records local games only")
+if args.params:
+    engine.load_ai_params(args.params)
+if session_player is not None:
+    engine.set_ai_params(session_player.settings['params'])
+SEATS = engine.default_seats(args.players)
+AI_SEATS = list(range(1, args.players))
+if len(args.ai) == 1:
+    args.ai *= len(AI_SEATS)
+try:
+    # The "compiled" policy memory-maps its tables here, so a missing file stops us before the window opens
+    if args.tables:
+        policytable.use_tables(args.tables)
+    ai_policies = [None] + [engine.POLICIES[name]() for name in args.ai]
+    for policy in ai_policies[1:]:
+        if isinstance(policy, policytable.CompiledPolicy):
+            policy.tables.get(args.players, args.decks)
+except (OSError, ValueError) as e:
+    parser.error(f"cannot load the compiled policy tables: {e}")
+# Recording and playback of sessions (see session.py): the timeline runs on
+# frame_clock, the game clock of the frame in progress, so timers and
+# animations depend only on the frames' recorded times
+session_recorder = None
+if args.record:
+    session_recorder = SessionRecorder(args.record, {'players': args.players, 'decks': args.decks, 'ai': args.ai,
+                                                     'seed': args.seed, 'params': engine.ai_params(),
+                                                     'tables': args.tables})
+session = session_recorder or session_player
+frame_clock = 0
+input_latencies = []       # playback: time from handing a frame's input to the loop to its frame being shown
+startup_marks.append(("import + arguments", time.perf_counter()))
 
-# Initialize Pygame and create window
-pygame.init()
+# Initialize only the pygame modules the game uses (no mixer, joystick, ...)
+# and create window
+pygame.display.init()
+pygame.font.init()
+startup_marks.append(("pygame display/font init", time.perf_counter()))
 screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
 pygame.display.set_caption("Bluff Card Game")
 clock = pygame.time.Clock()
+# Timers and card animations, advanced by the main loop every frame
+timeline = Timeline(pygame.time.get_ticks if session is None else lambda: frame_clock)
+startup_marks.append(("open window", time.perf_counter()))
 
 # Load fonts for text
 font_small = pygame.font.Font(None, 24)   # for card ranks and small labels
 font_large = pygame.font.Font(None, 36)   # for general messages
 font_huge = pygame.font.Font(None, 64)    # for winner announcement
+startup_marks.append(("load fonts", time.perf_counter()))
 
-# Create card face surfaces for each rank (white card with rank number)
-card_face = {}
-for rank in RANKS:
-    surf = pygame.Surface((CARD_WIDTH, CARD_HEIGHT))
-    surf.fill(WHITE)
-    pygame.draw.rect(surf, BLACK, surf.get_rect(), 2)  # black border
-    text = font_small.render(str(rank), True, BLACK)
-    text_rect = text.get_rect(center=(CARD_WIDTH//2, CARD_HEIGHT//2))
-    surf.blit(text, text_rect)
-    card_face[rank] = surf
-
-# Create card back surface (for hidden cards)
-card_back = pygame.Surface((CARD_WIDTH, CARD_HEIGHT))
-card_back.fill(BLUE)
-pygame.draw.rect(card_back, BLACK, card_back.get_rect(), 2)
-back_text = font_small.render("X", True, WHITE)  # 'X' to mark back
-back_text_rect = back_text.get_rect(center=(CARD_WIDTH//2, CARD_HEIGHT//2))
-card_back.blit(back_text, back_text_rect)
+# Rendered labels are cached; the fixed vocabulary is prerendered once the
+# first frame is on screen (see prerender_labels). Seat labels are
+# prerendered up to twice a full deal, so big tables get a bigger cache.
+SEAT_LABELS = ["You"] + [f"AI {i}" for i in AI_SEATS]
+LABEL_COUNTS = min(TOTAL_CARDS * args.decks, 2 * CARDS_PER_PLAYER) + 1
+text_cache = TextCache(max(512, 2 * (len(RANKS) + TOTAL_CARDS * args.decks + 2 * len(SEAT_LABELS) * LABEL_COUNTS)))
+
+def prerender_labels():
+    """Render rank banners, card counts and pile counts ahead of use."""
+    text_cache.prerender((font_large, f"Current Rank: {rank}", WHITE) for rank in RANKS)
+    for count in range(LABEL_COUNTS):
+        text_cache.prerender((font_small, f"{who}: {count} cards", color)
+                             for who in SEAT_LABELS for color in (WHITE, YELLOW))
+    text_cache.prerender((font_small, str(count), YELLOW) for count in range(TOTAL_CARDS * args.decks + 1))
 
 # Define buttons as rectangles for confirm, call, and reset
 confirm_button = pygame.Rect(SCREEN_WIDTH//2 - 60, SCREEN_HEIGHT - 200, 120, 30)
 call_button = pygame.Rect(50, SCREEN_HEIGHT - 40, 100, 30)
 reset_button = pygame.Rect(SCREEN_WIDTH//2 - 50, SCREEN_HEIGHT//2 + 50, 100, 30)
 
-# Game state variables
-players = []
-current_player = 0         # index of current player's turn
-current_rank = RANKS[0]    # current required rank to play (cycles through RANKS)
-pile = []                  # face-down pile of played cards (list of ranks)
-selected_indices = []      # indices of cards selected by human player
+# All card and button artwork is packed into one atlas surface, built the
+# first time anything is drawn and converted to the display's pixel format,
+# so every blit is a plain copy from a sub-rect. It can optionally be kept
+# on disk between runs.
+CARD_BACK = "back"   # atlas key of the card back; card faces are keyed by rank
+# (key, size, fill color, label, label color) of every sprite in the atlas
+SPRITES = ([(CARD_BACK, (CARD_WIDTH, CARD_HEIGHT), BLUE, "X", WHITE)]
+           + [(rank, (CARD_WIDTH, CARD_HEIGHT), WHITE, str(rank), BLACK) for rank in RANKS]
+           + [("confirm", confirm_button.size, GRAY, "Confirm", BLACK),
+              ("call", call_button.size, RED, "Call Bluff", WHITE),
+              ("reset", reset_button.size, GRAY, "Reset", BLACK)])
+# Changes to anything that affects the artwork must change this tag
+ATLAS_TAG = format(zlib.crc32(repr(SPRITES).encode()), "08x")
+atlas = None        # the atlas surface, once built
+atlas_rects = {}    # sprite key -> its rect inside the atlas
+
+def build_atlas():
+    """Lay out every sprite in a single row and return the atlas surface."""
+    x = 0
+    for key, size, _, _, _ in SPRITES:
+        atlas_rects[key] = pygame.Rect((x, 0), size)
+        x += size[0]
+    path = None
+    if args.asset_cache:
+        path = os.path.join(args.asset_cache, f"atlas-{ATLAS_TAG}.png")
+        if os.path.exists(path):
+            return pygame.image.load(path).convert()
+    surf = pygame.Surface((x, max(size[1] for _, size, _, _, _ in SPRITES)))
+    for key, _, color, label, label_color in SPRITES:
+        rect = atlas_rects[key]
+        surf.fill(color, rect)
+        if key == CARD_BACK or key in RANKS:
+            pygame.draw.rect(surf, BLACK, rect, 2)  # black border on cards
+        text = font_small.render(label, True, label_color)
+        surf.blit(text, text.get_rect(center=rect.center))
+    if path:
+        os.makedirs(args.asset_cache, exist_ok=True)
+        pygame.image.save(surf, path)
+    return surf.convert()
+
+def get_atlas():
+    global atlas
+    if atlas is None:
+        atlas = build_atlas()
+    return atlas
+
+def blit_sprite(key, pos):
+    """Draw the atlas sprite 'key' with its top-left at pos; returns the screen rect touched."""
+    return screen.blit(get_atlas(), pos, atlas_rects[key])
+
+# Game state variables (the rules state itself lives in an engine.GameState)
+state = None
+game_seed = args.seed      # seed of the next game (None picks a random one)
+selected_indices = set()   # indices of cards selected by human player
 last_action_msg = ""       # message describing the last action for display
-game_over = False
-winner = None
+
+# Variables to manage call timing on AI turns
+waiting_for_call = False
+call_timer = None          # Timer ending the human's call window
+ai_timer = None            # Timer for the AI's minimum "thinking" time before it plays
+ai_choice = None           # cards the current AI chose, once its decision is done
+ai_job = None              # AI decision running on the worker (a play or a call)
+call_pending = None        # how the call window closed ("timeout"/"human"), until settled
+thinking = frozenset()     # AI seats shown as thinking
+callers = ()               # AI seats that may call the current AI's play
+ai_caller = None           # which of them decided to call (None: nobody)
+
+# AI decisions run on a background thread (see aiworker.py); a finished one
+# posts AI_DONE so the main loop wakes up and hands it to its callback
+AI_DONE = pygame.event.custom_type()
+ai_worker = AIWorker(wake=lambda: pygame.event.post(pygame.event.Event(AI_DONE)))
+
+# Optional replay log of every game played in this session
+replay_log = ReplayWriter(args.log) if args.log else None
+
+# With --connect the game is played on a server: its messages are read on a
+# background thread (see netclient.py) and NET_MESSAGE wakes the main loop.
+# table_view mirrors the server's table and 'state' is its GameState.
+NET_MESSAGE = pygame.event.custom_type()
+net = None
+if args.connect:
+    try:
+        net = NetClient(*parse_address(args.connect), wake=lambda: pygame.event.post(pygame.event.Event(NET_MESSAGE)))
+    except OSError as e:
+        parser.error(f"cannot connect to {args.connect}: {e}")
+table_view = None
+awaiting_server = False    # our play was sent and the server has not confirmed it yet
+played_from = None         # (position, card) the confirmed play's animation starts from
 
 # Function to reset and start a new game
 def reset_game():
-    global players, current_player, current_rank, pile, selected_indices
-    global last_action_msg, game_over, winner
-    # Create and shuffle the deck of 42 cards
-    deck = []
-    for rank in RANKS:
-        deck += [rank] * CARDS_PER_RANK
-    random.shuffle(deck)
-    # Initialize players and deal cards
-    players = [
-        Player("You", is_ai=False),
-        Player("John", is_ai=True),
-        Player("Albert", is_ai=True)
-    ]
-    for i, player in enumerate(players):
-        hand_cards = deck[i*CARDS_PER_PLAYER : (i+1)*CARDS_PER_PLAYER]
-        player.hand = sorted(hand_cards)  # sort hand by rank for convenience
-    # Choose a random starting player and starting rank 2
-    current_player = random.randrange(PLAYERS_COUNT)
-    current_rank = RANKS[0]   # starting at 2
-    pile = []
-    selected_indices = []
-    last_action_msg = f"{players[current_player].name} starts. Rank {current_rank} to play."
-    game_over = False
-    winner = None
+    global state, selected_indices, last_action_msg, game_seed
+    global waiting_for_call, call_timer, ai_timer, ai_choice, ai_job, call_pending, thinking, awaiting_server
+    # Drop pending AI moves, decisions and animations from the previous game
+    timeline.clear()
+    ai_worker.cancel()
+    waiting_for_call = False
+    call_timer = ai_timer = ai_choice = ai_job = call_pending = None
+    thinking = frozenset()
+    if net is not None:
+        # Ask the server for a table; until it deals there is nothing to play
+        awaiting_server = False
+        state = waiting_state(args.players)
+        selected_indices = set()
+        last_action_msg = "Waiting for the server to deal..."
+        net.send(protocol.join(args.players, args.decks, 1, game_seed or 0))
+        if game_seed is not None:
+            game_seed += 1
+        return
+    if replay_log is not None and state is not None and not state.game_over:
+        replay_log.on_game_over(state, None)   # abandoned
+    state = engine.new_game(SEATS, game_seed, ai_policies, args.decks)
+    # What the human has seen, for the endgame hint's sampled deals
+    state.listeners.append(tracker.CardTracker(state, 0))
+    if replay_log is not None:
+        replay_log.start_game(state, game_seed)
+    if game_seed is not None:
+        game_seed += 1
+    selected_indices = set()
+    last_action_msg = f"{state.players[state.current_player].name} starts. Rank {state.current_rank} to play."
 
 # Call reset_game once to start the first game
 reset_game()
+startup_marks.append(("deal first game", time.perf_counter()))
 
-# Helper function for AI to decide what cards to play on its turn
-def ai_play_turn(player_index, required_rank):
-    """Select cards for AI player to play. Returns list of actual card ranks played."""
-    player = players[player_index]
-    hand = player.hand
-    actual_cards = []  # cards AI will actually play from its hand
-    declared = required_rank  # AI will declare the required rank
-    
-    # Check if AI has any card of the required rank
-    has_required = required_rank in hand
-    will_bluff = False
-    if has_required:
-        # AI has at least one required-rank card; decide randomly if to bluff
-        # (e.g., 30% chance to bluff even if it can play honestly)
-        if random.random() < 0.3:
-            will_bluff = True
-    else:
-        # AI does not have the required rank, so it must bluff
-        will_bluff = True
-
-    if not will_bluff:
-        # Play honestly: use one (sometimes two) of the required rank
-        count_required = hand.count(required_rank)
-        # If AI has multiple of the rank, it might play 2 at once (50% chance)
-        cards_to_play = 1
-        if count_required > 1 and random.random() < 0.5:
-            cards_to_play = 2
-        # Remove that many required-rank cards from hand
-        for _ in range(cards_to_play):
-            if required_rank in hand:
-                hand.remove(required_rank)
-                actual_cards.append(required_rank)
-    else:
-        # Bluffing: choose a card (or two) of some other rank to play
-        # Pick a rank from hand that is not the required rank
-        other_ranks = [r for r in hand if r != required_rank]
-        if not other_ranks:
-            # If somehow all cards are of the required rank (rare), just use one of them
-            other_ranks = hand[:]
-        # Choose the rank the AI has the most of, to discard heavier
-        if other_ranks:
-            rank_to_play = max(set(other_ranks), key=other_ranks.count)
-        else:
-            rank_to_play = required_rank  # fallback (though this case is unlikely)
-        # Decide to play one or two of that rank
-        count_available = hand.count(rank_to_play)
-        cards_to_play = 1
-        if count_available > 1 and random.random() < 0.5:
-            cards_to_play = 2
-        for _ in range(cards_to_play):
-            # Remove the chosen rank card from hand to play
-            if rank_to_play in hand:
-                hand.remove(rank_to_play)
-                actual_cards.append(rank_to_play)
-    # Now actual_cards contains the ranks AI is throwing (maybe not the same as declared)
-    return actual_cards
-
-# Helper function for AI to decide whether to call bluff on someone else's play
-def ai_decide_call(ai_index, declared_rank, count_played):
-    """Return True if AI player at ai_index will call bluff on a play of 'count_played' cards of 'declared_rank'."""
-    ai_hand = players[ai_index].hand
-    ai_count = ai_hand.count(declared_rank)  # how many of declared rank AI holds
-    total_rank_cards = CARDS_PER_RANK  # total number of cards of that rank in game (6)
-    # If the play is impossible given what AI holds (holds + played > 6), definitely call
-    if ai_count + count_played > total_rank_cards:
-        return True
-    # Otherwise decide based on suspicion factors
-    # Calculate probability of calling (base on how many played and how many AI has)
-    call_prob = 0.0
-    if ai_count + count_played == total_rank_cards:
-        # All cards of that rank would be accounted for between AI and played cards
-        if count_played >= 2:
-            call_prob = 0.5  # suspicious if multiple cards claimed and AI has the rest
+# Function to handle moving a card image smoothly from one point to another (animation)
+def animate_card_move(start_pos, end_pos, card_key, delay_ms=0):
+    """Animate the card sprite card_key moving from start_pos to end_pos, starting delay_ms from now.
+
+    Returns immediately; the main loop draws the card each frame until it arrives.
+    """
+    timeline.move(card_key, start_pos, end_pos, CARD_MOVE_MS, delay_ms)
+
+def player_pos(index):
+    """Screen position cards travel to or from for the given player."""
+    if index == 0:   # user
+        return (SCREEN_WIDTH//2, SCREEN_HEIGHT - CARD_HEIGHT - 20)
+    return AI_POS[index]
+
+# Screen areas that are repainted independently. Each area is only redrawn
+# when the part of the game state it shows changes, and only the redrawn
+# areas are pushed to the display.
+RANK_AREA = pygame.Rect(SCREEN_WIDTH//2 - 250, 0, 500, 40)                # current rank
+
+def seat_layout(n_ai):
+    """Card stack position, fan direction and screen area (label and stack) of each AI seat.
+
+    The seats fill up to two rows, each row split into equal columns. Seats
+    right of the centre fan their stack leftwards from the right edge of
+    their column. With two AIs this is the classic table: one seat in each
+    top corner. Rows move down if a seat would cover the rank banner.
+    """
+    n_rows = -(-n_ai // AI_SEATS_PER_ROW)
+    per_row = -(-n_ai // n_rows)
+    seats = []
+    for k in range(n_ai):
+        row, column = divmod(k, per_row)
+        width = (SCREEN_WIDTH - 2 * AI_MARGIN) / min(per_row, n_ai - row * per_row)
+        left, right = round(AI_MARGIN + column * width), round(AI_MARGIN + (column + 1) * width)
+        y = AI_ROW_Y + row * AI_ROW_HEIGHT
+        area_width = min(AI_AREA_SIZE[0], right - left)
+        mirrored = left + right > SCREEN_WIDTH
+        if mirrored:
+            pos = (right - 10 - CARD_WIDTH, y)
+            area = pygame.Rect(right - area_width, y - 25, area_width, AI_AREA_SIZE[1])
         else:
-            call_prob = 0.2  # slightly suspicious even if one card (AI holds most of them)
+            pos = (left + 10, y)
+            area = pygame.Rect(left, y - 25, area_width, AI_AREA_SIZE[1])
+        seats.append((pos, mirrored, area))
+    if any(area.colliderect(RANK_AREA) for _, _, area in seats):
+        shift = RANK_AREA.bottom - seats[0][2].top
+        seats = [((pos[0], pos[1] + shift), mirrored, area.move(0, shift)) for pos, mirrored, area in seats]
+    return seats
+
+# Seat layout of this table, indexed by seat (seat 0 is the human)
+AI_POS, AI_MIRRORED, AI_AREAS = (dict(zip(AI_SEATS, column)) for column in zip(*seat_layout(len(AI_SEATS))))
+CENTER_AREA = pygame.Rect(0, SCREEN_HEIGHT//2 - 60, SCREEN_WIDTH, 150)    # pile, status, winner, reset
+CONFIRM_AREA = confirm_button.copy()
+HAND_AREA = pygame.Rect(0, SCREEN_HEIGHT - CARD_HEIGHT - 55, SCREEN_WIDTH, CARD_HEIGHT + 55)  # hand, label, call button
+HINT_AREA = pygame.Rect(0, SCREEN_HEIGHT - CARD_HEIGHT - 85, SCREEN_WIDTH, 28)   # endgame hint (H key)
+PROFILE_AREA = pygame.Rect(10, SCREEN_HEIGHT//2 + 95, 300, 145)          # frame profile (F3 key)
+# Card positions of the human's hand, shared by drawing and click handling
+hand_layout = HandLayout(SCREEN_WIDTH, CARD_WIDTH, CARD_HEIGHT, SCREEN_HEIGHT - CARD_HEIGHT - 20)
+
+def draw_rank_area():
+    # Draw the current required rank at top-center
+    rank_text = text_cache.render(font_large, f"Current Rank: {state.current_rank}", WHITE)
+    rank_rect = rank_text.get_rect(midtop=(SCREEN_WIDTH//2, 10))
+    screen.blit(rank_text, rank_rect)
+
+def draw_ai_area(seat):
+    # AI seat - show card backs and count
+    count = len(state.players[seat].hand)
+    x, y = AI_POS[seat]
+    # Draw up to 3 overlapping card backs as a placeholder for AI's hand;
+    # mirrored seats fan leftwards
+    overlap = -10 if AI_MIRRORED[seat] else 10  # overlap offset in pixels
+    for i in range(min(3, count)):
+        blit_sprite(CARD_BACK, (x + i*overlap, y))
+    # Label with count above the cards, aligned with the stack's outer edge
+    label = text_cache.render(font_small, f"AI {seat}: {count} cards", YELLOW if state.current_player == seat else WHITE)
+    if AI_MIRRORED[seat]:
+        screen.blit(label, label.get_rect(topright=(x + CARD_WIDTH, y - 20)))
     else:
-        # There are still unaccounted cards potentially with the third player
-        if count_played >= 3:
-            call_prob = 0.3  # a big play (3+) is somewhat risky, call with some chance
-        elif count_played == 2:
-            call_prob = 0.1  # 2 cards might raise a little suspicion
+        screen.blit(label, label.get_rect(topleft=(x, y - 20)))
+    if seat in thinking:
+        # Thinking indicator beside the stack, on the side it fans out to
+        thinking_text = text_cache.render(font_small, "thinking...", YELLOW)
+        if AI_MIRRORED[seat]:
+            screen.blit(thinking_text, thinking_text.get_rect(midright=(x - 30, y + CARD_HEIGHT//2)))
         else:
-            call_prob = 0.0  # single card and nothing impossible, likely no call
-    # Randomize the call decision against the probability threshold
-    return (random.random() < call_prob)
+            screen.blit(thinking_text, thinking_text.get_rect(midleft=(x + CARD_WIDTH + 30, y + CARD_HEIGHT//2)))
 
-# Function to handle moving a card image smoothly from one point to another (animation)
-def animate_card_move(start_pos, end_pos, card_surf):
-    """Animate a card moving from start_pos to end_pos."""
-    steps = 15  # number of animation steps (frames)
-    dx = (end_pos[0] - start_pos[0]) / steps
-    dy = (end_pos[1] - start_pos[1]) / steps
-    x, y = start_pos
-    for _ in range(steps):
-        # Clear and redraw the scene behind the moving card
-        draw_game_state()  
-        # Draw the moving card at the current interpolated position
-        screen.blit(card_surf, (x, y))
-        pygame.display.flip()
-        clock.tick(60)  # maintain frame rate
-        # Increment position
-        x += dx
-        y += dy
-
-# Function to draw all game elements on the screen (called each frame)
-def draw_game_state():
-    # Fill background
-    screen.fill(GREEN_TABLE)
+def draw_center_area():
     # Draw pile (if any cards in pile)
-    if pile:
-        screen.blit(card_back, PILE_POS)  # show one card back
+    if state.pile:
+        blit_sprite(CARD_BACK, PILE_POS)  # show one card back
         # Display number of cards in pile on top of the card
-        pile_count_text = font_small.render(str(len(pile)), True, YELLOW)
+        pile_count_text = text_cache.render(font_small, str(len(state.pile)), YELLOW)
         pile_text_rect = pile_count_text.get_rect(center=(PILE_POS[0] + CARD_WIDTH//2, PILE_POS[1] + CARD_HEIGHT//2))
         screen.blit(pile_count_text, pile_text_rect)
-    # Draw players' cards and info
-    # Human (player 0) - show all cards
-    user = players[0]
-    hand = user.hand
-    # Determine spacing for user's hand so it spans nicely
-    if hand:
-        margin = min(50, (SCREEN_WIDTH - 100) // len(hand))
-    else:
-        margin = 50
-    start_x = (SCREEN_WIDTH - (CARD_WIDTH + margin*(len(hand)-1) )) // 2 if hand else SCREEN_WIDTH//2
-    for idx, card_rank in enumerate(hand):
-        # If this card is selected, raise it up a bit
-        x = start_x + idx * margin
-        y = SCREEN_HEIGHT - CARD_HEIGHT - 20
-        if idx in selected_indices:
-            y -= 10  # raise selected card
-        # Draw the card face (since user can see own cards)
-        screen.blit(card_face[card_rank], (x, y))
-    # Draw user's label or card count (optional, since they see their hand, but we can show count)
-    user_label = font_small.render(f"You: {len(hand)} cards", True, YELLOW if current_player == 0 else WHITE)
-    user_label_rect = user_label.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT - CARD_HEIGHT - 40))
-    screen.blit(user_label, user_label_rect)
-    # AI1 (player 1) - show card backs and count
-    ai1 = players[1]
-    ai1_count = len(ai1.hand)
-    # Draw up to 3 overlapping card backs as a placeholder for AI's hand
-    overlap = 10  # overlap offset in pixels
-    for i in range(min(3, ai1_count)):
-        screen.blit(card_back, (AI1_POS[0] + i*overlap, AI1_POS[1]))
-    # AI1 label with count
-    ai1_label = font_small.render(f"AI 1: {ai1_count} cards", True, YELLOW if current_player == 1 else WHITE)
-    # Place the label above AI1's cards
-    ai1_label_rect = ai1_label.get_rect(topleft=(AI1_POS[0], AI1_POS[1] - 20))
-    screen.blit(ai1_label, ai1_label_rect)
-    # AI2 (player 2) - show card backs and count
-    ai2 = players[2]
-    ai2_count = len(ai2.hand)
-    for i in range(min(3, ai2_count)):
-        # Overlap to the left for AI2 (so cards fan leftwards)
-        screen.blit(card_back, (AI2_POS[0] - i*overlap, AI2_POS[1]))
-    ai2_label = font_small.render(f"AI 2: {ai2_count} cards", True, YELLOW if current_player == 2 else WHITE)
-    # Place the label above AI2's cards (align right with cards)
-    ai2_label_rect = ai2_label.get_rect(topright=(AI2_POS[0] + CARD_WIDTH, AI2_POS[1] - 20))
-    screen.blit(ai2_label, ai2_label_rect)
-    # Draw the current required rank at top-center
-    rank_text = font_large.render(f"Current Rank: {current_rank}", True, WHITE)
-    rank_rect = rank_text.get_rect(midtop=(SCREEN_WIDTH//2, 10))
-    screen.blit(rank_text, rank_rect)
     # Draw last action/status message (if any)
     if last_action_msg:
-        action_text = font_large.render(last_action_msg, True, WHITE)
+        action_text = text_cache.render(font_large, last_action_msg, WHITE)
         action_rect = action_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 - 10))
         screen.blit(action_text, action_rect)
     # If game is over, draw winner announcement and reset button
-    if game_over and winner is not None:
-        win_text = font_huge.render(f"{winner} wins!", True, YELLOW)
+    if state.game_over and state.winner is not None:
+        win_text = text_cache.render(font_huge, f"{state.winner} wins!", YELLOW)
         win_rect = win_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2))
         screen.blit(win_text, win_rect)
         # Draw reset button
-        pygame.draw.rect(screen, GRAY, reset_button)
-        reset_label = font_small.render("Reset", True, BLACK)
-        reset_label_rect = reset_label.get_rect(center=reset_button.center)
-        screen.blit(reset_label, reset_label_rect)
+        blit_sprite("reset", reset_button.topleft)
+
+def draw_confirm_area():
+    # It's the human's turn, show confirm button
+    if not state.game_over and not state.players[state.current_player].is_ai:
+        blit_sprite("confirm", confirm_button.topleft)
+
+def draw_hand_area():
+    # Human (player 0) - show all cards
+    hand = state.players[0].hand
+    layout = hand_layout.update(hand, selected_indices)
+    # Draw the card faces (since user can see own cards) in one batched blit;
+    # the layout already raises selected cards up a bit
+    sheet = get_atlas()
+    screen.blits([(sheet, rect, atlas_rects[card_rank])
+                  for card_rank, rect in zip(layout.cards, layout.rects)], False)
+    # Draw user's label or card count (optional, since they see their hand, but we can show count)
+    user_label = text_cache.render(font_small, f"You: {len(hand)} cards", YELLOW if state.current_player == 0 else WHITE)
+    user_label_rect = user_label.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT - CARD_HEIGHT - 40))
+    screen.blit(user_label, user_label_rect)
+    # It's an AI turn that has played, allow the call button in the call phase
+    if call_button_visible():
+        blit_sprite("call", call_button.topleft)
+
+# Endgame hint for the human, toggled with the H key. It is solved once per
+# position (the snapshot of the state) and shown until the position changes.
+# Solving takes up to a few hundred milliseconds, so it runs on the AI worker
+# and "thinking..." is shown until its result is in.
+show_hint = False
+hint_solver = endgame.EndgameSolver(0, args.players, win_hand_size=WIN_HAND_SIZE, cards_per_rank=CARDS_PER_RANK)
+hint_position = None       # position of the latest hint asked for
+hint_text = ""
+
+def current_hint():
+    global hint_position, hint_text
+    if (not show_hint or state.game_over or state.current_player != 0
+            or waiting_for_call or ai_job is not None or not endgame.in_endgame(state)):
+        return ""
+    position = state.snapshot()
+    if position != hint_position:
+        hint_position = position
+        hint_text = "Hint: thinking..."
+        # Deals are sampled here, from what the human can see; seeding from
+        # the position keeps the hint steady while it is on screen. The
+        # worker only gets the sampled deals, never the live state
+        deals = endgame.sample_deals(state, 0, random.Random(hash(position)))
+        ai_worker.submit(lambda values: hint_solved(position, values), endgame.deal_values, hint_solver, deals,
+                         engine.RANK_INDEX[state.current_rank])
+    return hint_text
+
+def hint_solved(position, values):
+    """Worker callback: the hint for 'position' is solved (dropped if the game has moved on)."""
+    global hint_text
+    if position != hint_position:
+        return
+    (rank, count), chance = max(values.items(), key=lambda item: item[1])
+    if chance > 0.0:
+        hint_text = f"Hint: play {count} x {rank} (wins {chance:.0%} within {hint_solver.horizon} plays)"
+    else:
+        hint_text = f"Hint: no win in sight within {hint_solver.horizon} plays"
+
+def draw_hint_area():
+    text = current_hint()
+    if text:
+        hint_label = text_cache.render(font_small, text, YELLOW)
+        screen.blit(hint_label, hint_label.get_rect(center=HINT_AREA.center))
+
+# Frame profiler: F3 shows p50/p95/p99 of each main loop phase over the
+# last 600 frames (see frameprof.py). It only runs while shown or with
+# --profile-csv; the overlay text is refreshed twice a second.
+PROFILE_REFRESH_MS = 500
+profiler = FrameProfiler(keep_rows=bool(args.profile_csv))
+profiler.enable(bool(args.profile_csv))
+show_profile = False
+profile_lines = ()
+profile_updated = None
+
+def current_profile():
+    global profile_lines, profile_updated
+    if not show_profile:
+        return ()
+    now = pygame.time.get_ticks()
+    if profile_updated is None or now - profile_updated >= PROFILE_REFRESH_MS:
+        profile_updated = now
+        summary = profiler.summary()
+        profile_lines = (("ms", "p50", "p95", "p99"),) + tuple(
+            (phase,) + tuple(f"{value:.2f}" for value in summary[phase]) for phase in PHASES + ("frame",))
+    return profile_lines
+
+def draw_profile_area():
+    # Phase names on the left, then one right-aligned column per percentile.
+    # Rendered directly: the numbers change too often for the text cache
+    for row, cells in enumerate(current_profile()):
+        y = PROFILE_AREA.y + row * 18
+        screen.blit(font_small.render(cells[0], True, YELLOW), (PROFILE_AREA.x, y))
+        for column, cell in enumerate(cells[1:]):
+            label = font_small.render(cell, True, YELLOW)
+            screen.blit(label, label.get_rect(topright=(PROFILE_AREA.x + 140 + column * 70, y)))
+
+def call_button_visible():
+    return not state.game_over and waiting_for_call and state.players[state.current_player].is_ai
+
+# Each area with a function returning what it shows (redraw when that changes)
+# and the function that paints it
+def ai_area(seat):
+    """(area, key, draw) of an AI seat's screen area."""
+    return (AI_AREAS[seat], lambda: (len(state.players[seat].hand), state.current_player == seat, seat in thinking),
+            lambda: draw_ai_area(seat))
+
+screen_areas = [(RANK_AREA, lambda: state.current_rank, draw_rank_area)] + [ai_area(seat) for seat in AI_SEATS] + [
+    (CENTER_AREA, lambda: (len(state.pile), last_action_msg, state.game_over, state.winner), draw_center_area),
+    (CONFIRM_AREA, lambda: not state.game_over and not state.players[state.current_player].is_ai, draw_confirm_area),
+    (HAND_AREA, lambda: (bytes(state.players[0].hand.counts), frozenset(selected_indices),
+                         state.current_player == 0, call_button_visible()), draw_hand_area),
+    (HINT_AREA, current_hint, draw_hint_area),
+    (PROFILE_AREA, current_profile, draw_profile_area),
+]
+area_keys = [None] * len(screen_areas)  # what each area showed when last drawn
+full_redraw = True                       # repaint the whole window on the next frame
+
+def paint_area(rect, clip):
+    """Repaint the part 'clip' of the screen area 'rect' from scratch."""
+    for area, _, draw in screen_areas:
+        if area is rect:
+            screen.set_clip(clip)
+            screen.fill(GREEN_TABLE, clip)
+            draw()
+            screen.set_clip(None)
+            return
+
+def restore_area(rect):
+    """Repaint the table under 'rect' (e.g. where an animated card was) and return it."""
+    rect = rect.clip(screen.get_rect())
+    screen.fill(GREEN_TABLE, rect)
+    for area, _, _ in screen_areas:
+        if area.colliderect(rect):
+            paint_area(area, area.clip(rect))
+    return rect
+
+# Function to draw all game elements on the screen (called each frame)
+def draw_game_state():
+    """Redraw the areas whose contents changed; returns the rects to pass to display.update()."""
+    global full_redraw
+    dirty = []
+    if full_redraw:
+        screen.fill(GREEN_TABLE)
+        area_keys[:] = [None] * len(screen_areas)
+        dirty.append(screen.get_rect())
+        full_redraw = False
+    for i, (area, key, _) in enumerate(screen_areas):
+        shown = key()
+        if shown != area_keys[i]:
+            area_keys[i] = shown
+            paint_area(area, area)
+            dirty.append(area)
+    return dirty
+
+moving_rects = []  # where animated cards were drawn last frame
+
+def draw_frame():
+    """Draw changed areas and the animated cards on top, then push the changes to the display."""
+    global moving_rects
+    dirty = draw_game_state()
+    profiler.mark("draw")
+    # Erase the animated cards from their previous positions
+    for rect in moving_rects:
+        dirty.append(restore_area(rect))
+    moving_rects = [blit_sprite(key, pos) for key, pos in timeline.visible_tweens()]
+    profiler.mark("animate")
+    pygame.display.update(dirty + moving_rects)
+    profiler.mark("flip")
+
+def start_ai_turn():
+    """The current AI starts choosing its play on the worker; it plays AI_THINK_MS from now at the earliest."""
+    global ai_timer, ai_job, thinking
+    player = state.current_player
+    thinking = frozenset([player])
+    ai_job = ai_worker.submit(ai_chose, state.players[player].policy.choose_play, state, player)
+    ai_timer = timeline.after(AI_THINK_MS, ai_think_time_over)
+
+def ai_chose(cards):
+    """Worker callback: the AI has chosen its play."""
+    global ai_job, ai_choice
+    ai_job = None
+    ai_choice = cards
+    if ai_timer is None:
+        ai_take_turn()
+
+def ai_think_time_over():
+    """Timer callback: the AI has "thought" long enough; it plays once its choice is ready."""
+    global ai_timer
+    ai_timer = None
+    if ai_choice is not None:
+        ai_take_turn()
+
+def ai_take_turn():
+    """The current AI plays the cards it chose, then the call window opens."""
+    global ai_choice, ai_job, thinking, last_action_msg, waiting_for_call, call_timer
+    global callers, ai_caller
+    current_player = state.current_player
+    # AI plays the cards it selected; the declared rank is always the current rank
+    actual_cards, ai_choice = ai_choice, None
+    thinking = frozenset()
+    declared = state.current_rank
+    # Update pile with these cards and record last play info (for checking bluff later)
+    apply_play(state, actual_cards)
+    # Compose action message
+    last_action_msg = f"{state.players[current_player].name} plays {len(actual_cards)} card(s) of {declared}."
+    # Animate AI's card moving to pile (use one card back as representation)
+    animate_card_move(player_pos(current_player), PILE_POS, CARD_BACK)
+    # Set up call phase for human/other AIs to possibly call bluff
+    waiting_for_call = True
+    call_timer = timeline.after(CALL_WINDOW_MS, end_call_window)
+    # The other AIs decide in the background, in one find_caller() job,
+    # whether one of them intends to call (acted on when the window closes,
+    # if the user hasn't called)
+    callers = [i for i in AI_SEATS if i != current_player]
+    ai_caller = None
+    ai_job = ai_worker.submit(caller_decided, find_caller, state, callers)
+
+def caller_decided(caller_index):
+    """Worker callback: the other AIs have decided which of them (if any) would call the play."""
+    global ai_job, ai_caller
+    ai_job = None
+    ai_caller = caller_index
+    if call_pending is not None:
+        settle_call()
+
+def end_call_window():
+    """Timer callback: the human did not call in time, so another AI may call."""
+    global waiting_for_call, call_timer
+    call_timer = None
+    waiting_for_call = False  # end call phase
+    close_call_window("timeout")
+
+def close_call_window(how):
+    """Settle the AI's play now, or as soon as the other AIs have made up their minds."""
+    global call_pending, thinking
+    call_pending = how
+    if ai_job is None:
+        settle_call()
     else:
-        # If game not over, draw action buttons (Confirm on user's turn, Call on AI's turn)
-        if players[current_player].is_ai:
-            # It's an AI turn that has played, maybe allow call button if in call phase
-            if waiting_for_call and players[current_player].is_ai:
-                pygame.draw.rect(screen, RED, call_button)
-                call_text = font_small.render("Call Bluff", True, WHITE)
-                call_text_rect = call_text.get_rect(center=call_button.center)
-                screen.blit(call_text, call_text_rect)
+        thinking = frozenset(callers)
+
+def settle_call():
+    global call_pending, thinking, last_action_msg
+    how, call_pending = call_pending, None
+    thinking = frozenset()
+    accused_index = state.current_player  # AI who just played
+    if how == "human":
+        # Human calls bluff on AI's play
+        caller_index = 0  # human
+        total_cards = len(state.pile)
+        # The engine checks the last play, splits the pile and advances the turn
+        liar = resolve_call(state, caller_index)
+        # Prepare message about call result
+        if liar:
+            last_action_msg = f"You called bluff on {state.players[accused_index].name}! It WAS a bluff."
+        else:
+            last_action_msg = f"You called bluff on {state.players[accused_index].name}, but they were honest."
+        # Animate cards splitting (optional simple animation: one card to each in alternation)
+        # We'll simulate by moving a few representative cards for visual effect
+        cards_to_animate = min(4, total_cards)  # animate at most 4 cards for brevity
+        for j in range(cards_to_animate):
+            # Alternate between the accused player's area and the caller's area
+            target_idx = accused_index if j % 2 == 0 else caller_index
+            animate_card_move(PILE_POS, player_pos(target_idx), CARD_BACK, j * CARD_STAGGER_MS)
+        return
+    # Time up, resolve whether another AI calls or not
+    caller_index = ai_caller
+    liar = resolve_call(state, caller_index)
+    if caller_index is not None:
+        # Other AI called bluff on the AI that just played
+        if liar:
+            last_action_msg = f"{state.players[caller_index].name} calls bluff on {state.players[accused_index].name}! Bluff confirmed."
         else:
-            # It's the human's turn, show confirm button
-            pygame.draw.rect(screen, GRAY, confirm_button)
-            conf_text = font_small.render("Confirm", True, BLACK)
-            conf_text_rect = conf_text.get_rect(center=confirm_button.center)
-            screen.blit(conf_text, conf_text_rect)
+            last_action_msg = f"{state.players[caller_index].name} calls bluff on {state.players[accused_index].name}, but it was truthful."
+        # Quick animation of cards moving from pile to each AI (two moves to illustrate)
+        animate_card_move(PILE_POS, player_pos(accused_index), CARD_BACK)
+        animate_card_move(PILE_POS, player_pos(caller_index), CARD_BACK, CARD_STAGGER_MS)
 
-# Variables to manage call timing on AI turns
-waiting_for_call = False
-call_timer_start = 0
-potential_caller_index = None
-potential_caller_call = False
-
-# Main game loop
-running = True
-while running:
-    # Event handling
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-        if event.type == pygame.MOUSEBUTTONDOWN:
-            mouse_pos = event.pos
-            if game_over:
-                # If game over, only respond to Reset button
-                if reset_button.collidepoint(mouse_pos):
-                    reset_game()
-                continue  # skip other interactions when game is over
-            # If not game over:
-            current_player_obj = players[current_player]
-            if current_player_obj.is_ai:
-                # If it's AI's turn and we're in the call waiting phase, allow human to click "Call Bluff"
-                if waiting_for_call and call_button.collidepoint(mouse_pos):
-                    # Human calls bluff on AI's play
-                    caller_index = 0  # human
-                    waiting_for_call = False  # end call waiting phase
-                    # Determine outcome of call
-                    accused_index = current_player  # AI who just played
-                    # Check if the AI was bluffing (compare actual cards vs declared rank)
-                    # last_play_info holds what AI actually played
-                    liar = False
-                    if last_play_info:
-                        declared = last_play_info['declared']
-                        actual_cards = last_play_info['cards']
-                        # If any actual card is not of the declared rank, it was a bluff
-                        if any(card != declared for card in actual_cards):
-                            liar = True
-                    # Prepare message about call result
-                    if liar:
-                        last_action_msg = f"You called bluff on {players[accused_index].name}! It WAS a bluff."
-                    else:
-                        last_action_msg = f"You called bluff on {players[accused_index].name}, but they were honest."
-                    # Split the pile between the two players (accused and caller)
-                    total_cards = len(pile)
-                    half = total_cards // 2
-                    # If odd number of cards, let caller take the extra one (arbitrary choice)
-                    for i in range(total_cards):
-                        if i < half:
-                            players[accused_index].hand.append(pile[i])
-                        else:
-                            players[caller_index].hand.append(pile[i])
-                    # Clear the pile on table
-                    pile.clear()
-                    # Sort hands (optional, to keep order tidy after adding cards)
-                    players[accused_index].hand.sort()
-                    players[caller_index].hand.sort()
-                    # Animate cards splitting (optional simple animation: one card to each in alternation)
-                    # We'll simulate by moving a few representative cards for visual effect
-                    cards_to_animate = min(4, total_cards)  # animate at most 4 cards for brevity
-                    for j in range(cards_to_animate):
-                        if j % 2 == 0:
-                            # move card to accused player's area
-                            target_idx = accused_index
-                        else:
-                            # move card to caller's area
-                            target_idx = caller_index
-                        # Determine target position (center of player's area)
-                        if target_idx == 0:   # user
-                            target_pos = (SCREEN_WIDTH//2, SCREEN_HEIGHT - CARD_HEIGHT - 20)
-                        elif target_idx == 1: # AI1
-                            target_pos = AI1_POS
-                        else:                 # AI2
-                            target_pos = AI2_POS
-                        animate_card_move(PILE_POS, target_pos, card_back)
-                    # Determine next player (regardless of call outcome, move to next in turn order)
-                    current_player = (accused_index + 1) % PLAYERS_COUNT
-                    # Advance rank in sequence
-                    rank_index = RANKS.index(current_rank)
-                    current_rank = RANKS[(rank_index + 1) % len(RANKS)]
-                    # After call resolution, check win condition for any player
-                    for player in players:
-                        if len(player.hand) <= 5:
-                            game_over = True
-                            winner = player.name
-                    # End of call resolution
-            else:
-                # It's the human's turn: allow card selection and confirm play
-                # Check if a card in user's hand was clicked
-                user_hand = players[0].hand
-                # Compute card positions similar to draw_game_state to determine which card was clicked
-                if user_hand:
-                    margin = min(50, (SCREEN_WIDTH - 100) // len(user_hand))
-                else:
-                    margin = 50
-                start_x = (SCREEN_WIDTH - (CARD_WIDTH + margin*(len(user_hand)-1))) // 2 if user_hand else SCREEN_WIDTH//2
-                card_clicked = False
-                for idx, card_rank in enumerate(user_hand):
-                    card_x = start_x + idx * margin
-                    card_y = SCREEN_HEIGHT - CARD_HEIGHT - 20
-                    card_rect = pygame.Rect(card_x, card_y, CARD_WIDTH, CARD_HEIGHT)
-                    # If this card was raised (selected), adjust rect position to match
-                    if idx in selected_indices:
-                        card_rect.y -= 10
-                    if card_rect.collidepoint(mouse_pos):
-                        card_clicked = True
-                        # Toggle selection of this card
-                        if idx in selected_indices:
-                            # Deselect if already selected
-                            selected_indices.remove(idx)
-                        else:
-                            # If selecting a new card, ensure it matches rank of any already selected cards
-                            if not selected_indices:
-                                # No selection yet, select this card
-                                selected_indices.append(idx)
-                            else:
-                                # There is an existing selection; check rank
-                                first_sel_rank = user_hand[selected_indices[0]]
-                                if card_rank == first_sel_rank:
-                                    selected_indices.append(idx)  # same rank, allow adding
-                                else:
-                                    # Different rank – reset selection to this single card
-                                    selected_indices.clear()
-                                    selected_indices.append(idx)
-                        break
-                # If not clicking on a card, check if Confirm button was clicked
-                if not card_clicked and confirm_button.collidepoint(mouse_pos):
-                    if selected_indices:
-                        # Human confirms playing selected cards
-                        # Determine actual cards and declared rank (which is current_rank)
-                        selected_indices.sort()
-                        actual_cards = [user_hand[i] for i in selected_indices]
-                        declared = current_rank
-                        # Remove these cards from user's hand
-                        # Remove in reverse order to avoid index shifting
-                        for i in sorted(selected_indices, reverse=True):
-                            user_hand.pop(i)
-                        selected_indices.clear()
-                        # Add to pile
-                        pile.extend(actual_cards)
-                        # Record last play info for potential bluff checking
-                        last_play_info = {'player': 0, 'declared': declared, 'cards': actual_cards.copy()}
-                        # Compose message about the play
-                        last_action_msg = f"You played {len(actual_cards)} card(s) of {declared}."
-                        # Animate cards moving to pile
-                        # Compute original positions of the cards that were played for animation
-                        start_positions = []
-                        if actual_cards:
-                            margin = min(50, (SCREEN_WIDTH - 100) // (len(user_hand) + len(actual_cards)))
-                            start_x = (SCREEN_WIDTH - (CARD_WIDTH + margin*(len(user_hand)+len(actual_cards)-1))) // 2
-                        else:
-                            margin = 50
-                            start_x = SCREEN_WIDTH//2
-                        # Note: We compute as if cards were still in hand (approximate positions)
-                        for card_rank in actual_cards:
-                            # The first selected index's original x position (they were contiguous rank)
-                            # For simplicity, animate all from the position of the first selected card
-                            break
-                        if actual_cards:
-                            # Use the first removed card's slot as animation start
-                            first_idx = (start_x + (len(user_hand)) * margin) if user_hand else start_x
-                            first_card_pos = (first_idx, SCREEN_HEIGHT - CARD_HEIGHT - 20)
-                            animate_card_move(first_card_pos, PILE_POS, card_face[actual_cards[0]])
-                        # After human plays, check if AI players call bluff
-                        caller_index = None
-                        # Let both AIs consider calling; pick the first that decides to call
-                        ai_indices = [1, 2]
-                        random.shuffle(ai_indices)  # randomize order of who gets to react first
-                        for ai_idx in ai_indices:
-                            if ai_decide_call(ai_idx, declared, len(actual_cards)):
-                                caller_index = ai_idx
-                                break
-                        if caller_index is not None:
-                            # An AI called bluff on the user
-                            accused_index = 0  # user is the one who just played
-                            # Check if user was bluffing (did all actual cards match declared rank?)
-                            liar = False
-                            if any(card != declared for card in actual_cards):
-                                liar = True
-                            if liar:
-                                last_action_msg = f"{players[caller_index].name} calls bluff! You were BLUFFING."
-                            else:
-                                last_action_msg = f"{players[caller_index].name} calls bluff, but you were honest."
-                            # Split the pile between user (accused) and AI caller
-                            total_cards = len(pile)
-                            half = total_cards // 2
-                            for j in range(total_cards):
-                                if j < half:
-                                    players[accused_index].hand.append(pile[j])
-                                else:
-                                    players[caller_index].hand.append(pile[j])
-                            pile.clear()
-                            players[accused_index].hand.sort()
-                            players[caller_index].hand.sort()
-                            # Animate a few cards moving from center pile to each player
-                            cards_to_animate = min(4, total_cards)
-                            for j in range(cards_to_animate):
-                                if j % 2 == 0:
-                                    target_idx = accused_index
-                                else:
-                                    target_idx = caller_index
-                                if target_idx == 0:
-                                    target_pos = (SCREEN_WIDTH//2, SCREEN_HEIGHT - CARD_HEIGHT - 20)
-                                elif target_idx == 1:
-                                    target_pos = AI1_POS
-                                else:
-                                    target_pos = AI2_POS
-                                animate_card_move(PILE_POS, target_pos, card_back)
-                            # Next player is still the one after the user (even though call interrupted)
-                            current_player = (accused_index + 1) % PLAYERS_COUNT
-                            # Advance rank
-                            rank_index = RANKS.index(current_rank)
-                            current_rank = RANKS[(rank_index + 1) % len(RANKS)]
-                            # Check win condition for any player
-                            for player in players:
-                                if len(player.hand) <= 5:
-                                    game_over = True
-                                    winner = player.name
-                        else:
-                            # No AI called the bluff, play stands
-                            # Check if user now has <=5 cards (win condition)
-                            if len(players[0].hand) <= 5:
-                                game_over = True
-                                winner = players[0].name
-                            # Advance to next turn if game not over
-                            if not game_over:
-                                current_player = (current_player + 1) % PLAYERS_COUNT
-                                # Advance rank in sequence
-                                rank_index = RANKS.index(current_rank)
-                                current_rank = RANKS[(rank_index + 1) % len(RANKS)]
-            # End of MOUSEBUTTONDOWN handling
-
-    # If game is over, just update display (reset happens via button event above)
-    if game_over:
-        draw_game_state()
-        pygame.display.flip()
-        clock.tick(30)
-        continue
-
-    # If it's an AI player's turn (and not currently waiting for call resolution)
-    if not players[current_player].is_ai:
-        # Human player's turn: just wait for user input (handled in events above)
-        pass
+def human_play_called(caller_index):
+    """Worker callback: find_caller() has asked the AIs about the human's play."""
+    global ai_job, thinking, last_action_msg
+    ai_job = None
+    thinking = frozenset()
+    total_cards = len(state.pile)
+    # Settle the play; the engine advances the turn and checks for a winner
+    liar = resolve_call(state, caller_index)
+    if caller_index is not None:
+        # An AI called bluff on the user
+        if liar:
+            last_action_msg = f"{state.players[caller_index].name} calls bluff! You were BLUFFING."
+        else:
+            last_action_msg = f"{state.players[caller_index].name} calls bluff, but you were honest."
+        # Animate a few cards moving from center pile to each player
+        cards_to_animate = min(4, total_cards)
+        for j in range(cards_to_animate):
+            target_idx = 0 if j % 2 == 0 else caller_index
+            animate_card_move(PILE_POS, player_pos(target_idx), CARD_BACK, j * CARD_STAGGER_MS)
+
+def net_message(message):
+    """Act on a message from the table server: update the mirrored table, then the messages and animations."""
+    global state, table_view, selected_indices, last_action_msg, waiting_for_call, awaiting_server
+    kind = message[0]
+    if kind == protocol.WELCOME:
+        table_view = TableView(message)
+        return
+    if kind == protocol.ERROR:
+        awaiting_server = False
+        last_action_msg = "The server refused that move."
+        return
+    if table_view is None:
+        return
+    table_view.apply(message)
+    if kind == protocol.DEAL:
+        timeline.clear()
+        state = table_view.state
+        selected_indices = set()
+        waiting_for_call = False
+        last_action_msg = f"{state.players[state.current_player].name} starts. Rank {state.current_rank} to play."
+    elif kind == protocol.PLAYED:
+        info = state.last_play_info
+        player, declared, count = info['player'], info['declared'], len(info['cards'])
+        if player == 0:
+            awaiting_server = False
+            last_action_msg = f"You played {count} card(s) of {declared}."
+            start, card = played_from
+            animate_card_move(start, PILE_POS, card)
+        else:
+            last_action_msg = f"{state.players[player].name} plays {count} card(s) of {declared}."
+            animate_card_move(player_pos(player), PILE_POS, CARD_BACK)
+    elif kind == protocol.OVER and state.winner is None:
+        last_action_msg = "The server abandoned the game at its turn limit."
+    elif kind == protocol.WINDOW:
+        # The server's call window is open for us until it resolves the play
+        waiting_for_call = True
+    elif kind == protocol.RESOLVED:
+        waiting_for_call = False
+        caller, liar = message[1], message[2]
+        if caller is None:
+            return
+        caller, accused = table_view.view(caller), state.last_play_info['player']
+        caller_name, accused_name = state.players[caller].name, state.players[accused].name
+        if caller == 0:
+            last_action_msg = (f"You called bluff on {accused_name}! It WAS a bluff." if liar else
+                               f"You called bluff on {accused_name}, but they were honest.")
+        elif accused == 0:
+            last_action_msg = (f"{caller_name} calls bluff! You were BLUFFING." if liar else
+                               f"{caller_name} calls bluff, but you were honest.")
+        else:
+            last_action_msg = (f"{caller_name} calls bluff on {accused_name}! Bluff confirmed." if liar else
+                               f"{caller_name} calls bluff on {accused_name}, but it was truthful.")
+        animate_card_move(PILE_POS, player_pos(accused), CARD_BACK)
+        animate_card_move(PILE_POS, player_pos(caller), CARD_BACK, CARD_STAGGER_MS)
+
+def wait_for_events():
+    """Return the pending input events, sleeping first if there is nothing to animate.
+
+    While cards are moving (or with --fixed-fps, or while the frame
+    profile is shown) this paces frames with the
+    clock. Otherwise it blocks in pygame.event.wait() until input arrives or
+    the next timer (AI play, end of a call window) is due, so an idle
+    client uses no CPU.
+    """
+    if args.fixed_fps or show_profile or timeline.tweens:
+        # Slower frame rate once the game is over (reset happens via button event)
+        clock.tick(30 if state.game_over else 60)
+        return pygame.event.get()
+    due = timeline.next_due()
+    if due is None:
+        event = pygame.event.wait()
     else:
-        # AI player's turn logic
-        if not waiting_for_call:
-            # Simulate a short "thinking" delay for the AI
-            pygame.time.delay(500)
-            # AI selects and plays cards
-            actual_cards = ai_play_turn(current_player, current_rank)
-            # The AI declares the current_rank (may or may not match actual_cards)
-            declared = current_rank
-            # Update pile with these cards
-            pile.extend(actual_cards)
-            # Record last play info (for checking bluff later)
-            last_play_info = {'player': current_player, 'declared': declared, 'cards': actual_cards.copy()}
-            # Compose action message
-            last_action_msg = f"{players[current_player].name} plays {len(actual_cards)} card(s) of {declared}."
-            # Animate AI's card moving to pile (use one card back as representation)
-            start_pos = AI1_POS if current_player == 1 else AI2_POS
-            animate_card_move(start_pos, PILE_POS, card_back)
-            # Set up call phase for human/other AI to possibly call bluff
-            waiting_for_call = True
-            call_timer_start = pygame.time.get_ticks()
-            # Identify the other AI (aside from current player) who could call
-            potential_caller_index = 1 if current_player == 2 else 2  # the AI that is not current (since current is either 1 or 2)
-            # Determine in advance if that AI intends to call (will execute after short delay if user doesn't call)
-            potential_caller_call = ai_decide_call(potential_caller_index, declared, len(actual_cards))
+        timeout = due - pygame.time.get_ticks()
+        if timeout <= 0:
+            return pygame.event.get()
+        event = pygame.event.wait(timeout)
+    events = [] if event.type == pygame.NOEVENT else [event]
+    return events + pygame.event.get()
+
+# Only wake up for the events the game reacts to (no mouse motion etc.)
+pygame.event.set_blocked(None)
+pygame.event.set_allowed([pygame.QUIT, pygame.MOUSEBUTTONDOWN, pygame.KEYDOWN,
+                          pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, AI_DONE, NET_MESSAGE])
+
+def print_startup_profile():
+    print("Startup profile:")
+    for (_, previous), (phase, end) in zip(startup_marks, startup_marks[1:]):
+        print(f"  {phase:<26} {(end - previous) * 1000:8.2f} ms")
+    print(f"  {'total':<26} {(startup_marks[-1][1] - startup_marks[0][1]) * 1000:8.2f} ms")
+
+def print_playback_report():
+    matched = session_player.matched
+    outcome = ("stopped early" if matched is None and session_player.position < len(session_player.frames) else
+               "no digest recorded" if matched is None else
+               "matches the recording" if matched else "DIVERGED from the recording")
+    print(f"Played back {session_player.position} of {len(session_player.frames)} frames: {outcome}")
+    if input_latencies:
+        ordered = sorted(input_latencies)
+        n = len(ordered)
+        cells = "  ".join(f"p{q} {ordered[min(n - 1, n * q // 100)] * 1000:.2f}" for q in PERCENTILES)
+        print(f"Input-to-frame latency (ms) over {n} input frames: {cells}  max {ordered[-1] * 1000:.2f}")
+
+# Main game loop (skipped when the module is imported, e.g. by bench.py)
+if __name__ == "__main__":
+    running = True
+    startup_pending = True
+    events = []
+    while running:
+        profiler.next_frame()
+        if session_player is not None:
+            # Playback: the recorded frame's clock, input and number of AI results to collect
+            frame = session_player.next_frame()
+            if frame is None:
+                break
+            frame_clock, ai_results, events = frame
         else:
-            # Already waiting for call (which means an AI just played and we gave time for user to call)
-            # Check if the call waiting period has expired
-            if pygame.time.get_ticks() - call_timer_start > 1000:  # 1 second window for user to call
-                # Time up, resolve whether the other AI calls or not
-                caller_index = None
-                if potential_caller_call:
-                    caller_index = potential_caller_index
-                waiting_for_call = False  # end call phase
-                if caller_index is not None:
-                    # Other AI calls bluff on the AI that just played
-                    accused_index = current_player
-                    liar = False
-                    # Check if the accused AI lied about their cards
-                    if last_play_info:
-                        declared = last_play_info['declared']
-                        actual_cards = last_play_info['cards']
-                        if any(card != declared for card in actual_cards):
-                            liar = True
-                    if liar:
-                        last_action_msg = f"{players[caller_index].name} calls bluff on {players[accused_index].name}! Bluff confirmed."
-                    else:
-                        last_action_msg = f"{players[caller_index].name} calls bluff on {players[accused_index].name}, but it was truthful."
-                    # Split pile between the AI who played and the AI who called
-                    total_cards = len(pile)
-                    half = total_cards // 2
-                    for i in range(total_cards):
-                        if i < half:
-                            players[accused_index].hand.append(pile[i])
+            frame_clock = pygame.time.get_ticks()
+            ai_results = None
+        frame_start = time.perf_counter()
+        # Event handling
+        for event in events:
+            if event.type == pygame.QUIT:
+                running = False
+            if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                # The window contents were lost (e.g. uncovered), paint everything again
+                full_redraw = True
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_h:
+                # Toggle the endgame hint above the hand
+                show_hint = not show_hint
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                # Toggle the frame profile overlay; profile only while it is shown (or for --profile-csv)
+                show_profile = not show_profile
+                if show_profile != profiler.enabled and not args.profile_csv:
+                    profiler.enable(show_profile)
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                mouse_pos = event.pos
+                if state.game_over:
+                    # If game over, only respond to Reset button (shown once there is a winner)
+                    if reset_button.collidepoint(mouse_pos) and state.winner is not None:
+                        reset_game()
+                    continue  # skip other interactions when game is over
+                # If not game over:
+                current_player_obj = state.players[state.current_player]
+                if current_player_obj.is_ai:
+                    # If it's AI's turn and we're in the call waiting phase, allow human to click "Call Bluff"
+                    if waiting_for_call and call_button.collidepoint(mouse_pos):
+                        # Human calls bluff on AI's play (settled once the other AIs' decision is in)
+                        waiting_for_call = False  # end call waiting phase
+                        if net is not None:
+                            # The server settles it (and times the window)
+                            net.send(protocol.CALL_FRAME)
+                            continue
+                        call_timer.cancel()
+                        call_timer = None
+                        close_call_window("human")
+                elif ai_job is None and not awaiting_server:
+                    # It's the human's turn (and the AIs are not still deciding
+                    # whether to call the last play): allow card selection and confirm play
+                    # Check if a card in user's hand was clicked
+                    user_hand = state.players[0].hand
+                    # The cached layout is the one the hand was last drawn with
+                    layout = hand_layout.update(user_hand, selected_indices)
+                    clicked_idx = layout.card_at(mouse_pos)
+                    card_clicked = clicked_idx is not None
+                    if card_clicked:
+                        # Toggle selection of this card
+                        if clicked_idx in selected_indices:
+                            # Deselect if already selected
+                            selected_indices.discard(clicked_idx)
+                        elif selected_indices and layout.cards[clicked_idx] != layout.cards[next(iter(selected_indices))]:
+                            # Different rank from the existing selection – reset selection to this single card
+                            selected_indices.clear()
+                            selected_indices.add(clicked_idx)
                         else:
-                            players[caller_index].hand.append(pile[i])
-                    pile.clear()
-                    players[accused_index].hand.sort()
-                    players[caller_index].hand.sort()
-                    # Quick animation of cards moving from pile to each AI (two moves to illustrate)
-                    animate_card_move(PILE_POS, AI1_POS if accused_index == 1 else AI2_POS, card_back)
-                    animate_card_move(PILE_POS, AI1_POS if caller_index == 1 else AI2_POS, card_back)
-                    # Next player is the one after the accused (current_player) in turn order
-                    current_player = (accused_index + 1) % PLAYERS_COUNT
-                    # Advance rank
-                    rank_index = RANKS.index(current_rank)
-                    current_rank = RANKS[(rank_index + 1) % len(RANKS)]
-                else:
-                    # No one called within the window
-                    # No call scenario: check if current AI (who just played) won by reducing hand
-                    if len(players[current_player].hand) <= 5:
-                        game_over = True
-                        winner = players[current_player].name
-                    # Advance to next turn if game continues
-                    if not game_over:
-                        current_player = (current_player + 1) % PLAYERS_COUNT
-                        rank_index = RANKS.index(current_rank)
-                        current_rank = RANKS[(rank_index + 1) % len(RANKS)]
-    # Draw the current game state
-    draw_game_state()
-    pygame.display.flip()
-    clock.tick(60)
-
-# Quit Pygame when loop ends
-pygame.quit()
\ No newline at end of file
+                            # No selection yet or the same rank, allow adding
+                            selected_indices.add(clicked_idx)
+                    # If not clicking on a card, check if Confirm button was clicked
+                    if not card_clicked and confirm_button.collidepoint(mouse_pos):
+                        if selected_indices:
+                            # Human confirms playing selected cards
+                            # Determine actual cards and declared rank (which is current_rank)
+                            played = sorted(selected_indices)
+                            actual_cards = [layout.cards[i] for i in played]
+                            declared = state.current_rank
+                            # Animation starts from the first played card's slot in the hand
+                            first_card_pos = layout.rects[played[0]].topleft
+                            selected_indices.clear()
+                            if net is not None:
+                                # The server plays it; its PLAYED message starts the animation
+                                played_from = (first_card_pos, actual_cards[0])
+                                awaiting_server = True
+                                net.send(protocol.play(engine.Hand(actual_cards).counts))
+                                continue
+                            # Move the cards from the user's hand to the pile (records last play info)
+                            apply_play(state, actual_cards)
+                            # Compose message about the play
+                            last_action_msg = f"You played {len(actual_cards)} card(s) of {declared}."
+                            # Animate cards moving to pile
+                            animate_card_move(first_card_pos, PILE_POS, actual_cards[0])
+                            # After human plays, check if AI players call bluff
+                            # Let every AI consider calling (in one job on the worker); the first that
+                            # decides to call does, and human_play_called() settles the play
+                            thinking = frozenset(AI_SEATS)
+                            ai_job = ai_worker.submit(human_play_called, find_caller, state, AI_SEATS)
+                # End of MOUSEBUTTONDOWN handling
+
+        profiler.mark("events")
+
+        # Act on finished AI decisions, run due timers (AI plays, end of call
+        # windows) and retire finished animations
+        poll_start = time.perf_counter()
+        ai_results = ai_worker.poll(ai_results)
+        poll_time = time.perf_counter() - poll_start
+        if session_recorder is not None:
+            session_recorder.frame(frame_clock, events, ai_results)
+        if net is not None:
+            for message in net.poll():
+                net_message(message)
+            if net.closed and last_action_msg != "Disconnected from the server.":
+                state.game_over = True
+                last_action_msg = "Disconnected from the server."
+        timeline.update()
+
+        # If it's an AI player's turn, let it start thinking about its play; the
+        # human's turn just waits for input (handled in events above)
+        if (net is None and not state.game_over and state.players[state.current_player].is_ai and not waiting_for_call
+                and ai_timer is None and ai_job is None and ai_choice is None and call_pending is None):
+            start_ai_turn()
+        profiler.mark("logic")
+
+        # Draw whatever changed in the game state, plus any moving cards
+        draw_frame()
+        if startup_pending:
+            # The window is up; report startup timing and do the deferred work
+            startup_pending = False
+            startup_marks.append(("first frame", time.perf_counter()))
+            if args.startup_profile:
+                print_startup_profile()
+            prerender_labels()
+        if session is not None:
+            session.check(state, sorted(selected_indices), waiting_for_call)
+            if session_player is not None and any(event.type in INPUT_EVENTS for event in events):
+                # Waiting for the worker is playback's own doing, not part of the latency
+                input_latencies.append(time.perf_counter() - frame_start - poll_time)
+        # Sleep until the next frame, input or timer
+        if running and session_player is not None:
+            # Keep the recorded pace; of the window's own events only closing it counts
+            if not args.playback_fast:
+                session_player.wait()
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    running = False
+                elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                    full_redraw = True
+        elif running:
+            events = wait_for_events()
+        profiler.mark("sleep")
+
+    # Quit Pygame when loop ends
+    if args.profile_csv:
+        profiler.next_frame()
+        print(f"Wrote {profiler.export_csv(args.profile_csv)} frame timings to {args.profile_csv}")
+    if session_recorder is not None:
+        session_recorder.close()
+        print(f"Recorded {session_recorder.frames} frames to {args.record}")
+    if session_player is not None:
+        print_playback_report()
+    if replay_log is not None:
+        if not state.game_over:
+            replay_log.on_game_over(state, None)
+        replay_log.close()
+    ai_worker.shutdown()
+    if net is not None:
+        net.close()
+    pygame.quit()
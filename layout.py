@@ -0,0 +1,62 @@
+"""Screen layout of the human player's hand, shared by drawing and hit-testing.
+
+The card rects are only recomputed when the hand or the selection changes,
+and a click is mapped to a card by arithmetic on its x coordinate instead of
+testing every card's rect.
+"""
+import pygame
+
+
+class HandLayout:
+    """Positions of the cards of one hand laid out in a row centred on the screen."""
+
+    def __init__(self, screen_width, card_width, card_height, base_y, raise_px=10):
+        self.screen_width = screen_width
+        self.card_width = card_width
+        self.card_height = card_height
+        self.base_y = base_y          # top of an unselected card
+        self.raise_px = raise_px      # how far selected cards are lifted
+        self.cards = []               # card ranks, in display order
+        self.rects = []               # screen rect of each card
+        self.selected = frozenset()
+        self.margin = 50              # x distance between neighbouring cards
+        self.start_x = screen_width // 2
+        self._key = None
+
+    def update(self, hand, selected):
+        """Recompute the layout if 'hand' (an engine.Hand) or the selected indices changed."""
+        key = (bytes(hand.counts), frozenset(selected))
+        if key == self._key:
+            return self
+        self._key = key
+        self.cards = hand.sorted_cards()
+        self.selected = key[1]
+        n = len(self.cards)
+        # Determine spacing for the hand so it spans nicely
+        if n:
+            self.margin = min(50, (self.screen_width - 100) // n)
+            self.start_x = (self.screen_width - (self.card_width + self.margin * (n - 1))) // 2
+        else:
+            self.margin = 50
+            self.start_x = self.screen_width // 2
+        self.rects = [pygame.Rect(self.start_x + idx * self.margin,
+                                  self.base_y - (self.raise_px if idx in self.selected else 0),
+                                  self.card_width, self.card_height)
+                      for idx in range(n)]
+        return self
+
+    def card_at(self, pos):
+        """Index of the card drawn on top at screen position pos, or None."""
+        n = len(self.rects)
+        if not n or self.margin <= 0:
+            return None
+        x, y = pos
+        # Cards are drawn left to right, so the topmost card under x is the
+        # last one starting at or left of it; only a lifted neighbour can
+        # show through above an unselected card
+        idx = min((x - self.start_x) // self.margin, n - 1)
+        while idx >= 0 and x < self.rects[idx].right:
+            if self.rects[idx].collidepoint(pos):
+                return idx
+            idx -= 1
+        return None
@@ -0,0 +1,170 @@
+"""Loopback load generator for server.py: many bot tables at once, with latency percentiles.
+
+Every bot is one connection playing game after game at its own table (one
+remote seat, the rest AI). A bot plays every card of the required rank it
+holds (or else its lowest card). It calls plays its own hand proves
+impossible and passes otherwise, answering every message at once. Latency
+is the time from sending a PLAY, CALL or PASS to receiving the server's
+PLAYED or RESOLVED for it.
+
+With --spawn a server is started in a subprocess on a free port. Bots can
+be spread over --processes so the generator is not the bottleneck; on a
+single core, server and generator share it.
+
+Usage: python loadgen.py [--tables 2000] [--seconds 20] [--spawn | --port 7777]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+import protocol
+from engine import CARDS_PER_RANK, PLAYERS_COUNT
+from server import raise_open_file_limit
+
+PERCENTILES = (50, 90, 95, 99, 99.9)
+
+
+async def bot(host, port, players, decks, deadline, latencies, totals):
+    """One connection playing games until 'deadline' (time.perf_counter())."""
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.get_extra_info("socket").setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    cards_per_rank = CARDS_PER_RANK * decks
+    join = protocol.join(players, decks)
+    writer.write(join)
+    seat = hand = last_play = sent = None
+    try:
+        while True:
+            message = await protocol.read_message(reader)
+            kind = message[0]
+            totals['messages'] += 1
+            if kind == protocol.WELCOME:
+                seat = message[2]
+            elif kind == protocol.DEAL:
+                hand = message[3]
+            elif kind == protocol.HAND:
+                hand = message[1]
+            elif kind == protocol.TURN:
+                if message[1] == seat:
+                    slot = message[2]
+                    counts = bytearray(len(hand))
+                    if hand[slot]:
+                        counts[slot] = hand[slot]
+                    else:
+                        counts[next(i for i, n in enumerate(hand) if n)] = 1
+                    sent = time.perf_counter()
+                    writer.write(protocol.play(counts))
+            elif kind == protocol.PLAYED:
+                last_play = message[2], message[3]
+                if message[1] == seat and sent is not None:
+                    latencies.append(time.perf_counter() - sent)
+                    sent = None
+                    totals['plays'] += 1
+            elif kind == protocol.WINDOW:
+                slot, count = last_play
+                call = hand[slot] + count > cards_per_rank
+                sent = time.perf_counter()
+                writer.write(protocol.CALL_FRAME if call else protocol.PASS_FRAME)
+            elif kind == protocol.RESOLVED:
+                if sent is not None:
+                    latencies.append(time.perf_counter() - sent)
+                    sent = None
+            elif kind == protocol.OVER:
+                totals['games'] += 1
+                if time.perf_counter() >= deadline:
+                    break
+                writer.write(join)
+            elif kind == protocol.ERROR:
+                totals['errors'] += 1
+    finally:
+        writer.close()
+
+
+def run_bots(host, port, n_bots, seconds, players, decks):
+    """Worker: run n_bots bots for 'seconds'; returns (latencies as bytes of doubles, totals)."""
+    raise_open_file_limit()
+    latencies = array('d')
+    totals = dict.fromkeys(('games', 'plays', 'messages', 'errors', 'failed'), 0)
+
+    async def main():
+        deadline = time.perf_counter() + seconds
+        results = await asyncio.gather(*(bot(host, port, players, decks, deadline, latencies, totals)
+                                         for _ in range(n_bots)), return_exceptions=True)
+        totals['failed'] = sum(isinstance(r, Exception) for r in results)
+
+    asyncio.run(main())
+    return latencies.tobytes(), totals
+
+
+def spawn_server(ai):
+    """Start server.py on a free loopback port; returns (process, port) once it accepts connections."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = os.path.join(os.path.dirname(os.path.abspath(__file__)), "server.py")
+    process = subprocess.Popen([sys.executable, server, "--port", str(port), "--ai", ai])
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return process, port
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("the server did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load a Bluff table server with bots and report latencies.")
+    parser.add_argument("--tables", type=int, default=2000, help="concurrent bot connections (one table each)")
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--players", type=int, default=PLAYERS_COUNT)
+    parser.add_argument("--decks", type=int, default=1)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7777)
+    parser.add_argument("--spawn", action="store_true", help="start a server of our own on a free port")
+    parser.add_argument("--ai", default="heuristic", help="policy of the AI seats (with --spawn)")
+    parser.add_argument("--processes", type=int, default=1, help="processes to run the bots in")
+    args = parser.parse_args()
+
+    server = None
+    if args.spawn:
+        server, args.port = spawn_server(args.ai)
+    try:
+        start = time.perf_counter()
+        shares = [args.tables // args.processes + (i < args.tables % args.processes)
+                  for i in range(args.processes)]
+        if args.processes == 1:
+            results = [run_bots(args.host, args.port, args.tables, args.seconds, args.players, args.decks)]
+        else:
+            with ProcessPoolExecutor(max_workers=args.processes) as pool:
+                results = list(pool.map(run_bots, *zip(*[(args.host, args.port, n, args.seconds,
+                                                          args.players, args.decks) for n in shares])))
+        elapsed = time.perf_counter() - start
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    latencies = array('d')
+    totals = {}
+    for data, counts in results:
+        latencies.frombytes(data)
+        for name, n in counts.items():
+            totals[name] = totals.get(name, 0) + n
+    print(f"{args.tables} tables for {elapsed:.1f}s: {totals['games']} games ({totals['games'] / elapsed:.0f}/s), "
+          f"{totals['messages'] / elapsed:.0f} messages/s received, "
+          f"{totals['errors']} errors, {totals['failed']} failed connections")
+    if latencies:
+        ordered = sorted(latencies)
+        n = len(ordered)
+        cells = "  ".join(f"p{q:g} {ordered[min(n - 1, int(n * q / 100))] * 1000:.2f}" for q in PERCENTILES)
+        print(f"latency (ms) over {n} replies: {cells}  max {ordered[-1] * 1000:.2f}")
+
+
+if __name__ == "__main__":
+    main()
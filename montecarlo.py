@@ -0,0 +1,227 @@
+"""Information-set Monte Carlo AI: decides by playing out sampled games.
+
+The policy never looks at cards it could not know. For every decision it
+deals the cards it cannot know at random into the opponents' hands and the
+pile, with the sizes it can see. A CardTracker (see tracker.py) tells it
+which cards those are: not its own hand, its own plays still on the pile,
+or the cards a call showed going into someone's hand. Each option
+is then tried in such a "determinization" and the game is played out with
+the heuristic AI on every seat. Options are sampled with UCB1 until a
+wall-clock budget per decision runs out, so the search is anytime: a small
+budget keeps the pygame client at 60 fps, and a larger one on fast
+hardware just means more rollouts.
+
+Rollout statistics are kept in a small LRU transposition cache keyed by
+everything the AI can see. When the same decision comes up again, within
+the turn or later in another game, the search continues from the earlier
+statistics instead of starting over.
+
+Importing this module registers the policy in engine.POLICIES as
+"montecarlo".
+"""
+import math
+import random
+import time
+from collections import OrderedDict
+
+import engine
+from engine import (RANKS, RANK_INDEX, GameState, Hand, Player,
+                    apply_play, resolve_call, find_caller, play_ai_turn)
+from tracker import CardTracker, find_tracker
+
+ROLLOUT_TURNS = 100      # plays per rollout before it is scored as unfinished
+UCB_EXPLORATION = 1.0    # UCB1 exploration constant (rewards are in [0, 1])
+
+
+class MonteCarloPolicy:
+    """Determinized Monte Carlo search over plays and calls, within budget_ms per decision.
+
+    The budget is checked before each rollout, so a decision overruns it
+    by at most one rollout. The default leaves room for both AIs to decide
+    on a call within one 60 fps frame. max_rollouts optionally caps the
+    rollouts per decision as well; with a generous budget that makes a
+    seeded game reproducible.
+    """
+    name = "montecarlo"
+
+    def __init__(self, budget_ms=5, max_rollouts=None, cache_size=4096):
+        self.budget_ms = budget_ms
+        self.max_rollouts = max_rollouts
+        self.cache_size = cache_size
+        self.rollouts = 0           # total rollouts played, for profiling
+        self._cache = OrderedDict()
+
+    def start_game(self, state, player_index):
+        # Follow the game, so sampled deals keep the cards this seat knows about in place
+        state.listeners.append(CardTracker(state, player_index))
+
+    def choose_play(self, state, player_index):
+        hand = state.players[player_index].hand
+        options = play_options(hand, state.current_rank)
+        if len(options) <= 1:
+            return list(options[0]) if options else []
+        key = ('play', player_index, state.current_player, state.current_rank) + observed(state, player_index)
+        best = self._search(state, player_index, key, options, self._play_rollout)
+        return list(best) if best is not None else engine.ai_play_turn(state, player_index)
+
+    def decide_call(self, state, ai_index, declared_rank, count_played):
+        # A play that our own cards prove impossible needs no search
+        if state.players[ai_index].hand.count(declared_rank) + count_played > state.cards_per_rank:
+            return True
+        key = ('call', ai_index, state.last_play_info['player'], declared_rank, count_played) \
+            + observed(state, ai_index)
+        best = self._search(state, ai_index, key, (False, True), self._call_rollout)
+        if best is None:
+            return engine.ai_decide_call(state, ai_index, declared_rank, count_played)
+        return best
+
+    def _search(self, state, observer, key, options, rollout):
+        """Run UCB1 over 'options' until the budget is spent; return the most tried one, or None."""
+        stats = self._cache.get(key)
+        if stats is None:
+            stats = self._cache[key] = {option: [0.0, 0] for option in options}   # option: [reward, visits]
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(key)
+        rng = random.Random(state.rng.getrandbits(32))
+        deadline = time.perf_counter() + self.budget_ms / 1000
+        done = 0
+        while time.perf_counter() < deadline and (self.max_rollouts is None or done < self.max_rollouts):
+            total = sum(visits for _, visits in stats.values())
+            option = max(options, key=lambda o: ucb(stats[o], total))
+            entry = stats[option]
+            entry[0] += rollout(state, observer, option, rng)
+            entry[1] += 1
+            done += 1
+        self.rollouts += done
+        best = max(options, key=lambda o: stats[o][1])
+        return best if stats[best][1] else None
+
+    def _play_rollout(self, state, observer, cards, rng):
+        sim = determinize(state, observer, rng)
+        apply_play(sim, cards)
+        others = [i for i in range(len(sim.players)) if i != observer]
+        resolve_call(sim, find_caller(sim, others))
+        return play_out(sim, observer)
+
+    def _call_rollout(self, state, observer, call, rng):
+        info = state.last_play_info
+        sim = determinize(state, observer, rng, info, honest_prior())
+        if call:
+            caller = observer
+        else:
+            others = [i for i in range(len(sim.players)) if i not in (observer, info['player'])]
+            caller = find_caller(sim, others)
+        resolve_call(sim, caller)
+        return play_out(sim, observer)
+
+
+def honest_prior():
+    """Chance that a play which could be honest (enough unseen cards of the declared rank) actually is.
+
+    The heuristic AI bluffs BLUFF_CHANCE of the time. It is read at every
+    decision, so set_ai_params() (tune.py, --params, session playback)
+    applies to the searches too.
+    """
+    return 1.0 - engine.BLUFF_CHANCE
+
+
+def ucb(entry, total):
+    reward, visits = entry
+    if not visits:
+        return math.inf
+    return reward / visits + UCB_EXPLORATION * math.sqrt(math.log(total) / visits)
+
+
+def observed(state, observer):
+    """Everything 'observer' can see of the state (and knows from its tracker), as a hashable tuple."""
+    seen = (bytes(state.players[observer].hand.counts),
+            tuple(len(p.hand) for p in state.players), len(state.pile))
+    known = find_tracker(state, observer)
+    if known is None:
+        return seen
+    return seen + (known.pile_known.tobytes(),) + tuple(low.tobytes() for low in known.low)
+
+
+def play_options(hand, required_rank):
+    """Candidate plays: 1..all of the required rank, or one or two of any other rank."""
+    options = []
+    for rank, n in zip(RANKS, hand.counts):
+        most = n if rank == required_rank else min(n, 2)
+        options += [(rank,) * k for k in range(1, most + 1)]
+    return options
+
+
+def determinize(state, observer, rng, last_play=None, honest_prior=0.0):
+    """Return a copy of 'state' with the cards 'observer' cannot know dealt at random.
+
+    What the observer knows comes from its CardTracker in state.listeners:
+    the cards it put on the pile itself and the cards a call showed going
+    into a hand stay where they are, and only the rest is dealt. Without a
+    tracker it only knows its own hand.
+
+    If last_play (state.last_play_info) is given, the play still on the pile
+    is also sampled: honest with chance honest_prior when enough unseen
+    cards of the declared rank remain, otherwise made of other ranks.
+    """
+    known = find_tracker(state, observer) or CardTracker(state, observer)
+    own = state.players[observer].hand.counts
+    unseen = list(known.free)
+    played = []
+    if last_play is not None:
+        declared = RANK_INDEX[last_play['declared']]
+        count = len(last_play['cards'])
+        others = sum(unseen) - unseen[declared]
+        honest = unseen[declared] >= count and (others < count or rng.random() < honest_prior)
+        if honest:
+            played = [last_play['declared']] * count
+        else:
+            pool = [rank for rank, n in zip(RANKS, unseen) if rank != last_play['declared'] for _ in range(n)]
+            played = rng.sample(pool, count)
+        for rank in played:
+            unseen[RANK_INDEX[rank]] -= 1
+    pool = [rank for rank, n in zip(RANKS, unseen) for _ in range(n)]
+    rng.shuffle(pool)
+
+    players = []
+    for i, player in enumerate(state.players):
+        sim_player = Player(str(i), True)
+        if i == observer:
+            sim_player.hand.add_counts(own)
+        else:
+            size = len(player.hand) - known.low_total[i]
+            sim_player.hand = Hand(pool[-size:] if size else ())
+            sim_player.hand.add_counts(known.low[i])
+            del pool[len(pool) - size:]
+        players.append(sim_player)
+    sim = GameState(players, rng)
+    sim.current_player = state.current_player
+    sim.current_rank = state.current_rank
+    sim.turns = state.turns
+    sim.cards_per_rank = state.cards_per_rank
+    sim.win_hand_size = state.win_hand_size
+    sim.pile = Hand(pool + played)
+    sim.pile.add_counts(known.pile_known)
+    if last_play is not None:
+        sim.last_play_info = {'player': last_play['player'], 'declared': last_play['declared'],
+                              'cards': played}
+    return sim
+
+
+def play_out(sim, observer):
+    """Finish 'sim' with the heuristic AI on every seat; 1 if observer won, else 0.
+
+    A rollout still running after ROLLOUT_TURNS scores 0.5 if observer holds
+    the fewest cards.
+    """
+    limit = sim.turns + ROLLOUT_TURNS
+    while not sim.game_over and sim.turns < limit:
+        play_ai_turn(sim)
+    if sim.game_over:
+        return 1.0 if sim.winner == str(observer) else 0.0
+    own = len(sim.players[observer].hand)
+    return 0.5 if all(own <= len(p.hand) for p in sim.players) else 0.0
+
+
+engine.POLICIES[MonteCarloPolicy.name] = MonteCarloPolicy
@@ -0,0 +1,131 @@
+"""Network play for the pygame client: a connection to server.py and the table as one seat sees it.
+
+NetClient reads the socket on a background thread and hands the decoded
+messages to the main loop in poll(), as AIWorker does with AI decisions.
+'wake' is called from the thread when messages arrive. TableView keeps an
+engine.GameState mirror of the table for game.py to draw. The view is
+rotated so the local seat is seat 0, where the client draws the human.
+Opponents' hands and the pile are only known by their size.
+"""
+import socket
+import threading
+from collections import deque
+
+import engine
+import protocol
+from engine import RANKS, GameState, Player
+
+
+class NetClient:
+    """A connection to a table server; messages are read on a thread and collected with poll()."""
+
+    def __init__(self, host, port, wake=None):
+        self.wake = wake
+        self.closed = False
+        self._sock = socket.create_connection((host, port))
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._messages = deque()
+        self._thread = threading.Thread(target=self._read, name="net", daemon=True)
+        self._thread.start()
+
+    def send(self, data):
+        self._sock.sendall(data)
+
+    def poll(self):
+        """Messages received since the last poll, oldest first."""
+        messages = []
+        while self._messages:
+            messages.append(self._messages.popleft())
+        return messages
+
+    def close(self):
+        self._sock.close()
+
+    def _read(self):
+        frames = protocol.FrameBuffer()
+        try:
+            while True:
+                data = self._sock.recv(65536)
+                if not data:
+                    break
+                self._messages.extend(frames.feed(data))
+                if self.wake is not None:
+                    self.wake()
+        except (OSError, ValueError):
+            pass
+        self.closed = True
+        if self.wake is not None:
+            self.wake()
+
+
+class TableView:
+    """The mirror of a server table seen from seat 'seat', built from WELCOME and DEAL."""
+
+    def __init__(self, welcome):
+        _, self.table, self.seat, self.n_players, self.decks, self.win_hand_size, names = welcome
+        self.state = None
+        # Seats in view order (the local seat first), with the local seat shown as "You"
+        self.names = [names[self.table_seat(i)] for i in range(self.n_players)]
+        self.names[0] = "You"
+
+    def view(self, seat):
+        """View index (0 = local seat) of a table seat."""
+        return (seat - self.seat) % self.n_players
+
+    def table_seat(self, view):
+        return (view + self.seat) % self.n_players
+
+    def apply(self, message):
+        """Update the mirrored state with a server message; seats in it are turned into view indices."""
+        kind = message[0]
+        state = self.state
+        if kind == protocol.DEAL:
+            _, first, pile_size, hand, sizes = message
+            players = [Player(name, i != 0) for i, name in enumerate(self.names)]
+            state = self.state = GameState(players, None)
+            state.cards_per_rank = engine.CARDS_PER_RANK * self.decks
+            state.win_hand_size = self.win_hand_size
+            state.current_player = self.view(first)
+            players[0].hand.set_frozen(bytes(hand))
+            self._set_sizes(sizes)
+            state.pile.size = pile_size
+        elif kind == protocol.TURN:
+            state.current_player = self.view(message[1])
+            state.current_rank = RANKS[message[2]]
+        elif kind == protocol.PLAYED:
+            _, player, slot, count, pile_size = message
+            player = self.view(player)
+            state.last_play_info = {'player': player, 'declared': RANKS[slot], 'cards': [None] * count}
+            state.turns += 1
+            if player != 0:
+                state.players[player].hand.size -= count
+            state.pile.size = pile_size
+        elif kind == protocol.RESOLVED:
+            self._set_sizes(message[4])
+            state.pile.size = message[3]
+        elif kind == protocol.HAND:
+            state.players[0].hand.set_frozen(bytes(message[1]))
+        elif kind == protocol.OVER:
+            state.game_over = True
+            state.winner = None if message[1] is None else self.names[self.view(message[1])]
+
+    def _set_sizes(self, sizes):
+        # Only the local hand has known cards; the others (and the pile) just have a size
+        for seat, size in enumerate(sizes):
+            view = self.view(seat)
+            if view != 0:
+                self.state.players[view].hand.size = size
+
+
+def waiting_state(n_players):
+    """A finished, empty table to show until the server deals (nothing to click but nothing to win)."""
+    state = GameState([Player("You", False)] + [Player(name, True) for name, _ in engine.default_seats(n_players)[1:]],
+                      None)
+    state.game_over = True
+    return state
+
+
+def parse_address(text, default_port=7777):
+    """'host:port' (or just 'host') as (host, port)."""
+    host, _, port = text.rpartition(":") if ":" in text else (text, "", "")
+    return host or "127.0.0.1", int(port) if port else default_port
@@ -0,0 +1,259 @@
+"""Compiled AI policies: decisions looked up in precomputed tables.
+
+compiletables.py evaluates a policy offline over the inputs of its
+decisions and stores the result as dense tables; this module memory-maps
+them and decides with a lookup, however slow the compiled policy was.
+
+A call is looked up by how many of the declared rank the caller holds, how
+many cards were played, the pile size (the play included), the accused's
+hand size and the caller's. The table gives the chance of calling, in
+255ths. A play is looked up by how many of the required rank the player
+holds, its hand size, the pile size and the next player's hand size. The
+table gives the cumulative chances of its actions, in 65535ths: play k
+cards honestly, or bluff with k cards of the most-held other rank, for k
+from 1 to the cards of a rank. The current rank itself is not an input:
+the deal and the rank cycle treat every rank alike, so no policy decides
+differently by rank, and it would make the tables len(RANKS) = 7 times
+bigger.
+
+Sizes go into SIZE_BUCKETS buckets of doubling width: 0, 1, 2-3, 4-7, ...
+and everything from 64 up. For the pile that is its size; for a hand it is
+how far it is above the winning hand size. Every hand at or below it is in
+bucket 0, so "this play wins unless it is called" is never averaged with
+hands one card bigger.
+
+File: a header (magic, version, size buckets, table sets, length of a
+JSON blob saying what was compiled), the blob, one ENTRY per table set
+(table shape and the offsets of its two tables), then the tables, each
+little-endian and 8-byte aligned:
+
+    call   u8   [held 0..R][played 1..R][pile][accused][own hand]
+    play   u16  [held 0..R][own hand][pile][next hand][action 0..2R-1]
+
+R is the number of cards of a rank (6 per deck). Play actions 0..R-1 are
+honest plays of 1..R cards and R..2R-1 bluffs of 1..R cards.
+
+Importing this module registers the policy in engine.POLICIES as
+"compiled". It uses the tables in TABLES_FILE, or those of use_tables().
+"""
+import json
+import os
+import struct
+import sys
+
+import numpy as np
+
+import engine
+from engine import RANKS, RANK_INDEX, CARDS_PER_RANK
+
+TABLES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "policy_tables.bin")
+
+MAGIC = b"BLUFFTBL"
+VERSION = 1
+HEADER = struct.Struct("<8sHHHI")          # magic, version, size buckets, table sets, info length
+ENTRY = struct.Struct("<BB6xQQ")           # players, decks, offset of the call table, of the play table
+SIZE_BUCKETS = 8
+CALL_ALWAYS = 255                          # call table value of a certain call
+PLAY_SCALE = 65535                         # play table values are cumulative chances out of this
+
+# Bucket of every hand or pile size a table of up to engine.MAX_DECKS decks can have
+BUCKET = bytes(min(n.bit_length(), SIZE_BUCKETS - 1) for n in range(len(RANKS) * CARDS_PER_RANK * engine.MAX_DECKS + 1))
+
+
+def bucket_range(b):
+    """Smallest and largest size in bucket b (the last bucket is open-ended: None)."""
+    if b == 0:
+        return 0, 0
+    return 1 << (b - 1), (1 << b) - 1 if b < SIZE_BUCKETS - 1 else None
+
+
+def hand_bucket(size, win_hand_size):
+    return BUCKET[size - win_hand_size] if size > win_hand_size else 0
+
+
+def hand_range(b, win_hand_size):
+    """Smallest and largest hand size in hand bucket b (the last one is open-ended: None)."""
+    if b == 0:
+        return 0, win_hand_size
+    low, high = bucket_range(b)
+    return win_hand_size + low, None if high is None else win_hand_size + high
+
+
+def call_shape(cards_per_rank):
+    return (cards_per_rank + 1, cards_per_rank) + (SIZE_BUCKETS,) * 3
+
+
+def play_shape(cards_per_rank):
+    return (cards_per_rank + 1,) + (SIZE_BUCKETS,) * 3 + (2 * cards_per_rank,)
+
+
+def bluff_slot(counts, required_slot):
+    """Slot of the most-held rank other than the required one (lowest on ties), or None."""
+    best = None
+    for i, n in enumerate(counts):
+        if n and i != required_slot and (best is None or n > counts[best]):
+            best = i
+    return best
+
+
+class TableSet:
+    """The call and play tables of one table shape (players, decks).
+
+    'call' and 'play' are the NumPy arrays, for batch lookups. Single
+    decisions index flat memoryviews of the same mapping instead, which is
+    several times cheaper than indexing a NumPy array with a tuple.
+    """
+
+    def __init__(self, players, decks, call, play):
+        self.players = players
+        self.decks = decks
+        self.cards_per_rank, _, self.win_hand_size = engine.table_rules(players, decks)
+        self.call = call
+        self.play = play
+        self._call = memoryview(call).cast("B")
+        # The file is little-endian; elsewhere fall back to (slower) NumPy scalars
+        self._play = memoryview(play).cast("B").cast("H") if sys.byteorder == "little" else play.reshape(-1)
+
+    def call_value(self, held, played, pile_size, accused_size, hand_size):
+        """Chance of calling, in 255ths."""
+        r, win = self.cards_per_rank, self.win_hand_size
+        played = 1 if played < 1 else r if played > r else played
+        index = (((min(held, r) * r + played - 1) * SIZE_BUCKETS + BUCKET[pile_size]) * SIZE_BUCKETS
+                 + hand_bucket(accused_size, win)) * SIZE_BUCKETS + hand_bucket(hand_size, win)
+        return self._call[index]
+
+    def play_action(self, held, hand_size, pile_size, next_size, draw):
+        """(honest, count) of the action a uniform draw in [0, 1) picks."""
+        r, win = self.cards_per_rank, self.win_hand_size
+        actions = 2 * r
+        start = (((min(held, r) * SIZE_BUCKETS + hand_bucket(hand_size, win)) * SIZE_BUCKETS + BUCKET[pile_size])
+                 * SIZE_BUCKETS + hand_bucket(next_size, win)) * actions
+        threshold = draw * PLAY_SCALE
+        row = self._play
+        # The first action whose cumulative chance exceeds the draw
+        action = 0
+        while action < actions - 1 and row[start + action] <= threshold:
+            action += 1
+        return action < r, action % r + 1
+
+    # Vectorized lookups for batch.py: every argument is an int array (sizes up to len(BUCKET))
+
+    def call_values(self, held, played, pile_size, accused_size, hand_size):
+        r, win = self.cards_per_rank, self.win_hand_size
+        buckets = np.frombuffer(BUCKET, dtype=np.uint8)
+        return self.call[np.minimum(held, r), np.clip(played, 1, r) - 1, buckets[pile_size],
+                         buckets[np.maximum(accused_size - win, 0)], buckets[np.maximum(hand_size - win, 0)]]
+
+    def play_actions(self, held, hand_size, pile_size, next_size, draws):
+        """(honest, count) arrays of the actions picked by 'draws'."""
+        r, win = self.cards_per_rank, self.win_hand_size
+        buckets = np.frombuffer(BUCKET, dtype=np.uint8)
+        rows = self.play[np.minimum(held, r), buckets[np.maximum(hand_size - win, 0)], buckets[pile_size],
+                         buckets[np.maximum(next_size - win, 0)]]
+        action = np.minimum((rows <= (draws * PLAY_SCALE)[:, None]).sum(axis=1), 2 * r - 1)
+        return action < r, action % r + 1
+
+
+class PolicyTables:
+    """Every table set in a compiled tables file, memory-mapped; get() picks one by table shape."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            magic, version, buckets, n_sets, info_size = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != VERSION or buckets != SIZE_BUCKETS:
+                raise ValueError(f"{path} is not a version {VERSION} policy tables file")
+            self.info = json.loads(f.read(info_size))
+            entries = [ENTRY.unpack(f.read(ENTRY.size)) for _ in range(n_sets)]
+        self.sets = {}
+        for players, decks, call_offset, play_offset in entries:
+            r = CARDS_PER_RANK * decks
+            call = np.memmap(path, dtype="u1", mode="r", offset=call_offset, shape=call_shape(r))
+            play = np.memmap(path, dtype="<u2", mode="r", offset=play_offset, shape=play_shape(r))
+            self.sets[players, decks] = TableSet(players, decks, call, play)
+
+    def get(self, players, decks):
+        try:
+            return self.sets[players, decks]
+        except KeyError:
+            raise ValueError(f"{self.path} has no tables for {players} players with {decks} deck(s) "
+                             f"(compile them with compiletables.py --players {players} --decks {decks})") from None
+
+
+def write_tables(path, sets, info):
+    """Write table sets, {(players, decks): (call, play)} as NumPy arrays, and the 'info' dict to 'path'."""
+    blob = json.dumps(info).encode()
+    offset = HEADER.size + len(blob) + ENTRY.size * len(sets)
+    entries, arrays = [], []
+    for (players, decks), (call, play) in sorted(sets.items()):
+        offsets = []
+        for table in (call.astype("u1"), play.astype("<u2")):
+            offset += -offset % 8
+            offsets.append(offset)
+            arrays.append((offset, table.tobytes()))
+            offset += table.nbytes
+        entries.append(ENTRY.pack(players, decks, *offsets))
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, SIZE_BUCKETS, len(sets), len(blob)) + blob + b"".join(entries))
+        for offset, data in arrays:
+            f.write(bytes(offset - f.tell()) + data)
+
+
+_loaded = {}
+
+
+def load_tables(path=None):
+    """The PolicyTables of 'path' (default: TABLES_FILE); each file is mapped once per process."""
+    path = os.path.abspath(path or TABLES_FILE)
+    if path not in _loaded:
+        _loaded[path] = PolicyTables(path)
+    return _loaded[path]
+
+
+def use_tables(path):
+    """Make 'path' the tables of CompiledPolicy objects created from now on (and check it loads)."""
+    global TABLES_FILE
+    load_tables(path)
+    TABLES_FILE = path
+
+
+class CompiledPolicy:
+    """Plays and calls by table lookup, as compiled by compiletables.py from some other policy."""
+    name = "compiled"
+
+    def __init__(self, tables=None):
+        self.tables = tables if tables is not None else load_tables()
+        self._shape = self._set = None
+
+    def table_set(self, state):
+        shape = (len(state.players), state.cards_per_rank // CARDS_PER_RANK)
+        if shape != self._shape:
+            self._set = self.tables.get(*shape)
+            self._shape = shape
+        return self._set
+
+    def choose_play(self, state, player_index):
+        hand = state.players[player_index].hand
+        if not hand:
+            return []
+        tables = self.table_set(state)
+        counts = hand.counts
+        required_slot = RANK_INDEX[state.current_rank]
+        held = counts[required_slot]
+        next_hand = state.players[(player_index + 1) % len(state.players)].hand
+        honest, count = tables.play_action(held, len(hand), len(state.pile), len(next_hand), state.rng.random())
+        slot = required_slot if honest and held else bluff_slot(counts, required_slot)
+        if slot is None:
+            slot = required_slot   # only the required rank left
+        return [RANKS[slot]] * min(count, counts[slot])
+
+    def decide_call(self, state, ai_index, declared_rank, count_played):
+        held = state.players[ai_index].hand.count(declared_rank)
+        accused = state.players[state.last_play_info['player']].hand
+        value = self.table_set(state).call_value(held, count_played, len(state.pile), len(accused),
+                                                 len(state.players[ai_index].hand))
+        # Like ai_decide_call(), a certain call draws no random number
+        return value >= CALL_ALWAYS or state.rng.random() * CALL_ALWAYS < value
+
+
+engine.POLICIES[CompiledPolicy.name] = CompiledPolicy
@@ -0,0 +1,171 @@
+"""Compact binary protocol between the table server (server.py) and its clients.
+
+Every message is a frame: a u16 payload length, a u8 kind and the payload,
+little-endian. Cards always travel as rank counts, one byte per entry of
+RANKS, and seats as u8 (NO_SEAT for nobody).
+
+    Client -> server
+    JOIN      players u8, decks u8, humans u8, seed u64 (0: random)
+    PLAY      rank counts of the cards played (declared as the current rank)
+    CALL      call bluff on the play in the open call window
+    PASS      let the call window close as far as this seat is concerned
+
+    Server -> client
+    WELCOME   table u32, seat u8, players u8, decks u8, win hand size u8,
+              then a NAME_BYTES ASCII name per seat
+    DEAL      first player u8, pile size u16, hand counts, hand sizes (u8 per seat)
+    TURN      player u8, rank slot u8                  it is 'player's turn
+    PLAYED    player u8, declared slot u8, count u8, pile size u16
+    WINDOW    ms u16                                   the receiver may call now
+    RESOLVED  caller u8, liar u8, pile size u16, hand sizes (u8 per seat)
+    HAND      hand counts                              the receiver's hand changed
+    OVER      winner u8
+    ERROR     code u8                                  the last message was refused
+
+After DEAL a client only gets deltas: who plays, what was claimed, how a
+play was resolved and the hand sizes that changed with it. Its own hand is
+resent (HAND) whenever it changes, so a client never has to track it.
+"""
+import struct
+
+from engine import RANKS
+
+# Message kinds
+JOIN, PLAY, CALL, PASS = 1, 2, 3, 4
+WELCOME, DEAL, TURN, PLAYED, WINDOW, RESOLVED, HAND, OVER, ERROR = range(16, 25)
+# ERROR codes
+BAD_MESSAGE, NOT_YOUR_TURN, BAD_PLAY, NO_WINDOW, BAD_TABLE = 1, 2, 3, 4, 5
+
+NO_SEAT = 255
+NAME_BYTES = 10
+N_RANKS = len(RANKS)
+
+HEADER = struct.Struct("<HB")
+JOIN_BODY = struct.Struct("<BBBQ")
+WELCOME_BODY = struct.Struct("<IBBBB")
+DEAL_BODY = struct.Struct("<BH")
+TURN_BODY = struct.Struct("<BB")
+PLAYED_BODY = struct.Struct("<BBBH")
+WINDOW_BODY = struct.Struct("<H")
+RESOLVED_BODY = struct.Struct("<BBH")
+SEAT_BODY = struct.Struct("<B")
+
+
+def frame(kind, payload=b""):
+    return HEADER.pack(len(payload), kind) + payload
+
+
+def join(players, decks=1, humans=1, seed=0):
+    return frame(JOIN, JOIN_BODY.pack(players, decks, humans, seed))
+
+
+def play(counts):
+    return frame(PLAY, bytes(counts))
+
+
+def welcome(table, seat, players, decks, win_hand_size, names):
+    return frame(WELCOME, WELCOME_BODY.pack(table, seat, players, decks, win_hand_size)
+                 + b"".join(name.encode("ascii", "replace")[:NAME_BYTES].ljust(NAME_BYTES, b"\0")
+                            for name in names))
+
+
+def deal(first, pile_size, hand, sizes):
+    return frame(DEAL, DEAL_BODY.pack(first, pile_size) + bytes(hand) + bytes(sizes))
+
+
+def turn(player, slot):
+    return frame(TURN, TURN_BODY.pack(player, slot))
+
+
+def played(player, slot, count, pile_size):
+    return frame(PLAYED, PLAYED_BODY.pack(player, slot, count, pile_size))
+
+
+def window(ms):
+    return frame(WINDOW, WINDOW_BODY.pack(ms))
+
+
+def resolved(caller, liar, pile_size, sizes):
+    return frame(RESOLVED, RESOLVED_BODY.pack(NO_SEAT if caller is None else caller, liar, pile_size)
+                 + bytes(sizes))
+
+
+def hand(counts):
+    return frame(HAND, bytes(counts))
+
+
+def over(winner):
+    return frame(OVER, SEAT_BODY.pack(NO_SEAT if winner is None else winner))
+
+
+def error(code):
+    return frame(ERROR, SEAT_BODY.pack(code))
+
+
+# Prebuilt frames of the messages without a payload
+CALL_FRAME = frame(CALL)
+PASS_FRAME = frame(PASS)
+
+
+def decode(kind, payload):
+    """Turn a frame into a tuple (kind, fields...); raises ValueError on a malformed one."""
+    try:
+        if kind in (CALL, PASS):
+            return (kind,)
+        if kind == JOIN:
+            return (kind,) + JOIN_BODY.unpack(payload)
+        if kind in (PLAY, HAND):
+            if len(payload) != N_RANKS:
+                raise ValueError("bad rank counts")
+            return kind, payload
+        if kind == WELCOME:
+            fields = WELCOME_BODY.unpack_from(payload)
+            names = payload[WELCOME_BODY.size:]
+            names = [names[i:i + NAME_BYTES].rstrip(b"\0").decode("ascii", "replace")
+                     for i in range(0, len(names), NAME_BYTES)]
+            return (kind,) + fields + (names,)
+        if kind == DEAL:
+            first, pile_size = DEAL_BODY.unpack_from(payload)
+            rest = payload[DEAL_BODY.size:]
+            return kind, first, pile_size, rest[:N_RANKS], rest[N_RANKS:]
+        if kind == TURN:
+            return (kind,) + TURN_BODY.unpack(payload)
+        if kind == PLAYED:
+            return (kind,) + PLAYED_BODY.unpack(payload)
+        if kind == WINDOW:
+            return (kind,) + WINDOW_BODY.unpack(payload)
+        if kind == RESOLVED:
+            caller, liar, pile_size = RESOLVED_BODY.unpack_from(payload)
+            return kind, None if caller == NO_SEAT else caller, bool(liar), pile_size, payload[RESOLVED_BODY.size:]
+        if kind in (OVER, ERROR):
+            value, = SEAT_BODY.unpack(payload)
+            return kind, None if kind == OVER and value == NO_SEAT else value
+    except struct.error as e:
+        raise ValueError(str(e)) from None
+    raise ValueError(f"unknown message kind {kind}")
+
+
+async def read_message(reader):
+    """Read and decode the next frame from an asyncio StreamReader."""
+    size, kind = HEADER.unpack(await reader.readexactly(HEADER.size))
+    return decode(kind, await reader.readexactly(size) if size else b"")
+
+
+class FrameBuffer:
+    """Splits a byte stream (e.g. from a plain socket) into decoded messages."""
+
+    def __init__(self):
+        self._data = bytearray()
+
+    def feed(self, data):
+        """Add received bytes; returns the messages completed by them."""
+        self._data += data
+        messages = []
+        while len(self._data) >= HEADER.size:
+            size, kind = HEADER.unpack_from(self._data)
+            end = HEADER.size + size
+            if len(self._data) < end:
+                break
+            messages.append(decode(kind, bytes(self._data[HEADER.size:end])))
+            del self._data[:end]
+        return messages
@@ -0,0 +1,222 @@
+"""Compact binary replay logs: a streaming writer and a memory-mapped reader.
+
+A log file is a short header followed by fixed-width 16-byte records,
+appended game after game:
+
+    kind   a        b            c        cards (10 bytes)        extra (u16)
+    GAME   players  first seat   seed     seed u64, decks u8      0
+    SEAT   seat     is_ai        0        policy name (ASCII)     0
+    DEAL   seat     0            0        rank counts             0
+    TURN   player   declared     caller   rank counts played      pile size
+    END    winner   0            0        turns as u32            0
+
+c of GAME says what the seed is: SEED_NONE, SEED_INT (the u64 is the seed)
+or SEED_HASHED (crc32 of str(seed), for string seeds), and byte 8 of its
+cards how many decks were dealt (0 in older logs means one). When the deal
+leaves cards over, they start the pile: a DEAL record with seat NO_SEAT.
+A TURN record holds
+a play and how it was resolved. caller is NO_SEAT if nobody called, and
+pile size is the pile after the play, i.e. what a call splits. Whether it
+was a bluff follows from the counts. A winner of NO_SEAT means the game was
+abandoned at a turn limit. A game cut off by a crash has no END record.
+
+ReplayWriter is a GameListener that buffers records and appends them to
+the file in large writes. ReplayReader memory-maps one or more logs as
+NumPy record arrays and hands out games as views into them. Scanning
+millions of games never builds a Python object per record.
+
+Usage: python replay.py LOG [LOG ...]    (prints a summary of the logs)
+"""
+import argparse
+import os
+import struct
+import zlib
+
+import numpy as np
+
+from engine import RANKS, RANK_INDEX, CARDS_PER_RANK, GameListener
+
+MAGIC = b"BLUFFLOG"
+VERSION = 1
+HEADER = struct.Struct("<8sHH")            # magic, version, record size
+RECORD = struct.Struct("<BBBB10sH")
+RECORD_DTYPE = np.dtype([('kind', 'u1'), ('a', 'u1'), ('b', 'u1'), ('c', 'u1'),
+                         ('cards', 'u1', (10,)), ('extra', '<u2')])
+assert RECORD.size == RECORD_DTYPE.itemsize == 16
+
+# Record kinds
+GAME, SEAT, DEAL, TURN, END = 1, 2, 3, 4, 5
+# GAME seed kinds
+SEED_NONE, SEED_INT, SEED_HASHED = 0, 1, 2
+NO_SEAT = 255
+
+
+def counts_field(counts):
+    return bytes(counts).ljust(10, b"\0")
+
+
+class ReplayWriter(GameListener):
+    """Appends the games it is attached to (start_game) to the log at 'path'."""
+
+    def __init__(self, path, buffer_records=4096):
+        self.path = path
+        self.buffer_records = buffer_records
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+        self._buffer = bytearray()
+        self._pending = None             # TURN record waiting for the play to be resolved
+        self.games = 0
+
+    def start_game(self, state, seed=None):
+        """Record the seats and deal of a freshly dealt game and follow it from now on."""
+        if seed is None:
+            seed_kind, seed_value = SEED_NONE, 0
+        elif isinstance(seed, int) and 0 <= seed < 1 << 64:
+            seed_kind, seed_value = SEED_INT, seed
+        else:
+            seed_kind, seed_value = SEED_HASHED, zlib.crc32(str(seed).encode())
+        decks = state.cards_per_rank // CARDS_PER_RANK
+        self._add(GAME, len(state.players), state.current_player, seed_kind,
+                  struct.pack("<QB", seed_value, decks).ljust(10, b"\0"))
+        for i, player in enumerate(state.players):
+            name = getattr(player.policy, 'name', '') if player.is_ai else "human"
+            self._add(SEAT, i, player.is_ai, 0, name.encode("ascii", "replace")[:10])
+        for i, player in enumerate(state.players):
+            self._add(DEAL, i, 0, 0, counts_field(player.hand.counts))
+        if state.pile:
+            self._add(DEAL, NO_SEAT, 0, 0, counts_field(state.pile.counts))
+        state.listeners.append(self)
+
+    def on_play(self, state, player, cards):
+        self._flush_turn()
+        played = bytearray(len(RANKS))
+        for card in cards:
+            played[RANK_INDEX[card]] += 1
+        self._pending = [player, RANK_INDEX[state.last_play_info['declared']], NO_SEAT,
+                         counts_field(played), len(state.pile)]
+
+    def on_call(self, state, accused, caller):
+        self._pending[2] = caller
+        self._flush_turn()
+
+    def on_game_over(self, state, winner):
+        self._flush_turn()
+        self._add(END, NO_SEAT if winner is None else winner, 0, 0,
+                  struct.pack("<I", state.turns).ljust(10, b"\0"))
+        if self in state.listeners:
+            state.listeners.remove(self)
+        self.games += 1
+
+    def flush(self):
+        self._file.write(self._buffer)
+        self._file.flush()
+        self._buffer.clear()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _flush_turn(self):
+        if self._pending is not None:
+            player, declared, caller, cards, pile_size = self._pending
+            self._add(TURN, player, declared, caller, cards, pile_size)
+            self._pending = None
+
+    def _add(self, kind, a, b, c, cards, extra=0):
+        self._buffer += RECORD.pack(kind, a, b, c, cards, extra)
+        if len(self._buffer) >= self.buffer_records * RECORD.size:
+            self.flush()
+
+
+class ReplayReader:
+    """Memory-mapped view of one or more replay logs, one NumPy record array per file.
+
+    Iterating yields each game's records (a view, nothing is copied); len()
+    is the number of games started.
+    """
+
+    def __init__(self, *paths):
+        self.logs = []
+        for path in paths:
+            records = open_log(path)
+            starts = np.flatnonzero(records['kind'] == GAME)
+            self.logs.append((records, starts))
+
+    def __len__(self):
+        return sum(len(starts) for _, starts in self.logs)
+
+    def __iter__(self):
+        for records, starts in self.logs:
+            ends = np.append(starts[1:], len(records))
+            for start, end in zip(starts, ends):
+                yield records[start:end]
+
+    def records(self):
+        """Yield the whole record array of each log (for column-wise scans)."""
+        for records, _ in self.logs:
+            yield records
+
+
+def open_log(path):
+    """Memory-map the records of the log at 'path' (a partly written last record is ignored)."""
+    with open(path, "rb") as f:
+        magic, version, record_size = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+        raise ValueError(f"{path} is not a version {VERSION} replay log")
+    count = (os.path.getsize(path) - HEADER.size) // RECORD.size
+    if not count:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=HEADER.size, shape=(count,))
+
+
+def decode(game):
+    """Turn one game's records into plain Python data (for inspection, not bulk scans)."""
+    n_ranks = len(RANKS)
+    result = {'seats': [], 'deal': [], 'pile': [], 'turns': [], 'winner': None, 'complete': False}
+    for record in game:
+        kind, a, b, c = int(record['kind']), int(record['a']), int(record['b']), int(record['c'])
+        cards = bytes(record['cards'])
+        if kind == GAME:
+            seed, decks = struct.unpack("<QB", cards[:9])
+            result.update(players=a, first=b, seed_kind=c, seed=seed, decks=decks or 1)
+        elif kind == SEAT:
+            result['seats'].append((cards.rstrip(b"\0").decode("ascii"), bool(b)))
+        elif kind == DEAL and a == NO_SEAT:
+            result['pile'] = [rank for rank, n in zip(RANKS, cards[:n_ranks]) for _ in range(n)]
+        elif kind == DEAL:
+            result['deal'].append([rank for rank, n in zip(RANKS, cards[:n_ranks]) for _ in range(n)])
+        elif kind == TURN:
+            result['turns'].append({'player': a, 'declared': RANKS[b],
+                                    'cards': [rank for rank, n in zip(RANKS, cards[:n_ranks]) for _ in range(n)],
+                                    'caller': None if c == NO_SEAT else c,
+                                    'pile': int(record['extra'])})
+        elif kind == END:
+            result['winner'] = None if a == NO_SEAT else a
+            result['turns_played'] = struct.unpack("<I", cards[:4])[0]
+            result['complete'] = True
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize Bluff replay logs.")
+    parser.add_argument("logs", nargs="+")
+    args = parser.parse_args()
+    reader = ReplayReader(*args.logs)
+    turns = calls = ends = 0
+    for records in reader.records():
+        kinds = records['kind']
+        turns += np.count_nonzero(kinds == TURN)
+        calls += np.count_nonzero((kinds == TURN) & (records['c'] != NO_SEAT))
+        ends += np.count_nonzero(kinds == END)
+    print(f"{len(reader)} games ({ends} finished), {turns} plays, {calls} calls")
+
+
+if __name__ == "__main__":
+    main()
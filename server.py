@@ -0,0 +1,380 @@
+"""Asyncio server hosting many Bluff tables over TCP (see protocol.py).
+
+Each table is one coroutine driving an engine.GameState. It holds no pygame
+or other display state, so a table costs a few kilobytes and thousands of
+them share one event loop. Remote seats are TCP connections (players using
+game.py --connect, or bots such as loadgen.py); the other seats are played
+by AI policies inside the table coroutine.
+
+A JOIN asks for a table shape: players, decks, how many of the seats are
+remote (humans) and an optional seed. Connections asking for the same
+shape are seated together in arrival order, and the table starts as soon as
+its remote seats are filled. When a game ends the connection stays open
+and may JOIN again.
+
+The call window after a play is an async timer: the remote seats other than
+the player may CALL within CALL_WINDOW_MS, as in the local client. The
+window closes early once all of them have PASSed. If nobody remote calls,
+the AI-controlled seats decide with engine.find_caller(). If a remote seat
+does not play within TURN_TIMEOUT_S, or disconnects, the AI takes it over
+and plays it (and calls for it) to the end of the game. A game still going
+after MAX_TURNS plays is abandoned: OVER goes out with no winner.
+
+Usage: python server.py [--host 127.0.0.1] [--port 7777] [--ai heuristic]
+"""
+import argparse
+import asyncio
+import itertools
+import socket
+import traceback
+
+import engine
+import protocol
+from engine import RANK_INDEX, RANKS, apply_play, resolve_call, find_caller
+
+engine.load_policies()
+
+CALL_WINDOW_MS = 1000    # time remote seats have to call bluff on a play
+TURN_TIMEOUT_S = 60      # a remote seat that takes longer to play is played by the AI
+MAX_TURNS = 10000        # a game still going after this many plays is abandoned (as in engine.simulate_game)
+DRAIN_BYTES = 64 * 1024  # a table waits for a connection to drain past this much unsent data
+
+
+class Connection:
+    """A remote seat: one TCP connection and the table it currently sits at.
+
+    Messages are collected and written once per event loop iteration, so a
+    turn's TURN, PLAYED, RESOLVED and HAND frames go out in one send().
+    """
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.table = None
+        self.seat = None
+        self._out = bytearray()
+
+    def send(self, data):
+        if not self._out:
+            asyncio.get_running_loop().call_soon(self.flush)
+        self._out += data
+
+    def flush(self):
+        if self._out and not self.writer.is_closing():
+            self.writer.write(self._out)
+        self._out = bytearray()
+
+
+class Table:
+    """One game between the seated connections and AI policies; run() plays it."""
+
+    def __init__(self, table_id, key, ai):
+        players, decks, humans, seed = key
+        self.id = table_id
+        self.key = key               # the table shape, as asked for by JOIN
+        self.n_players = players
+        self.decks = decks
+        self.humans = humans
+        self.seed = seed or None
+        self.ai = ai
+        self.conns = []              # remote seats 0..humans-1, in arrival order (None once left)
+        self.state = None
+        self.play_wait = None        # (seat, Future of its play) while a remote seat is to play
+        self.window = None           # Future of the caller while the call window is open
+        self.window_open = set()     # remote seats that may still call in the open window
+
+    @property
+    def full(self):
+        return len(self.conns) == self.humans
+
+    def sit(self, conn):
+        conn.table, conn.seat = self, len(self.conns)
+        self.conns.append(conn)
+
+    def leave(self, conn):
+        """'conn' has gone; the AI plays its seat from now on."""
+        seat = conn.seat
+        conn.table = conn.seat = None
+        if self.state is None:
+            # Still filling up: give the seat to the next connection
+            self.conns.remove(conn)
+            for i, other in enumerate(self.conns):
+                other.seat = i
+            return
+        self.conns[seat] = None
+        self.take_over(seat)
+        if self.play_wait is not None and self.play_wait[0] == seat and not self.play_wait[1].done():
+            self.play_wait[1].set_result(None)
+        self.passed(seat)
+
+    def take_over(self, seat):
+        """From now on the AI plays (and calls for) remote seat 'seat'."""
+        player = self.state.players[seat]
+        if not player.is_ai:
+            player.is_ai = True
+            player.policy = engine.POLICIES[self.ai]()
+
+    def ai_controlled(self, seat):
+        return self.state.players[seat].is_ai
+
+    def broadcast(self, data):
+        for conn in self.conns:
+            if conn is not None:
+                conn.send(data)
+
+    def sizes(self):
+        return bytes(len(p.hand) for p in self.state.players)
+
+    def deal(self):
+        """Deal the game and tell the seats; called as the table fills, before run() is scheduled.
+
+        From here on a connection that leaves is taken over by the AI
+        instead of giving up its seat.
+        """
+        names = [f"Player {i + 1}" for i in range(self.humans)] + engine.AI_NAMES[:self.n_players - self.humans]
+        seats = [(name, i >= self.humans) for i, name in enumerate(names)]
+        policies = [None] * self.humans + [engine.POLICIES[self.ai]() for _ in seats[self.humans:]]
+        state = self.state = engine.new_game(seats, self.seed, policies, self.decks)
+        for seat, conn in enumerate(self.conns):
+            conn.send(protocol.welcome(self.id, seat, self.n_players, self.decks, state.win_hand_size, names))
+            conn.send(protocol.deal(state.current_player, len(state.pile),
+                                    state.players[seat].hand.counts, self.sizes()))
+
+    async def run(self):
+        state = self.state
+        while not state.game_over and state.turns < MAX_TURNS:
+            player = state.current_player
+            self.broadcast(protocol.turn(player, RANK_INDEX[state.current_rank]))
+            cards = None if self.ai_controlled(player) else await self.remote_play(player)
+            if cards is None:
+                # An AI seat, or a remote one that timed out or left
+                self.take_over(player)
+                cards = state.players[player].policy.choose_play(state, player)
+            apply_play(state, cards)
+            self.broadcast(protocol.played(player, RANK_INDEX[state.current_rank], len(cards), len(state.pile)))
+            self.send_hand(player)
+            caller = await self.call_window(player)
+            if caller is None:
+                caller = find_caller(state, [i for i in range(self.n_players)
+                                             if i != player and self.ai_controlled(i)])
+            liar = resolve_call(state, caller)
+            self.broadcast(protocol.resolved(caller, bool(liar), len(state.pile), self.sizes()))
+            if caller is not None:
+                self.send_hand(player)
+                self.send_hand(caller)
+            await self.drain()
+            # Once every remote seat is AI-controlled nothing above awaits;
+            # let the other tables have their turn
+            await asyncio.sleep(0)
+        if state.game_over:
+            winner = next(i for i, p in enumerate(state.players) if p.name == state.winner)
+        else:
+            winner = None   # abandoned at MAX_TURNS
+        self.broadcast(protocol.over(winner))
+        self.detach()
+
+    def detach(self):
+        """Free the remote seats, so their connections can JOIN another table."""
+        for conn in self.conns:
+            if conn is not None:
+                conn.table = conn.seat = None
+
+    def send_hand(self, seat):
+        conn = self.conns[seat] if seat < self.humans else None
+        if conn is not None:
+            conn.send(protocol.hand(self.state.players[seat].hand.counts))
+
+    async def drain(self):
+        # Backpressure: only a client that has stopped reading makes the table wait
+        for conn in self.conns:
+            if conn is not None and conn.writer.transport.get_write_buffer_size() > DRAIN_BYTES:
+                try:
+                    await conn.writer.drain()
+                except ConnectionError:
+                    pass
+
+    async def remote_play(self, seat):
+        """The cards the remote 'seat' plays, or None if it timed out or left."""
+        future = asyncio.get_running_loop().create_future()
+        self.play_wait = (seat, future)
+        try:
+            return await asyncio.wait_for(future, TURN_TIMEOUT_S)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            self.play_wait = None
+
+    def offer_play(self, seat, counts):
+        """A remote seat sent PLAY; returns an ERROR code, or None if the play was taken."""
+        if self.play_wait is None or self.play_wait[0] != seat or self.play_wait[1].done():
+            return protocol.NOT_YOUR_TURN
+        hand = self.state.players[seat].hand.counts
+        if not any(counts) or any(n > held for n, held in zip(counts, hand)):
+            return protocol.BAD_PLAY
+        self.play_wait[1].set_result([rank for rank, n in zip(RANKS, counts) for _ in range(n)])
+        return None
+
+    async def call_window(self, player):
+        """Let the remote seats other than 'player' call; returns the caller or None."""
+        remote = {seat for seat, conn in enumerate(self.conns)
+                  if conn is not None and seat != player and not self.ai_controlled(seat)}
+        if not remote:
+            return None
+        self.window = asyncio.get_running_loop().create_future()
+        self.window_open = remote
+        message = protocol.window(CALL_WINDOW_MS)
+        for seat in remote:
+            self.conns[seat].send(message)
+        try:
+            return await asyncio.wait_for(self.window, CALL_WINDOW_MS / 1000)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            self.window = None
+            self.window_open = set()
+
+    def called(self, seat):
+        if seat not in self.window_open or self.window.done():
+            return protocol.NO_WINDOW
+        self.window.set_result(seat)
+        return None
+
+    def passed(self, seat):
+        self.window_open.discard(seat)
+        if self.window is not None and not self.window_open and not self.window.done():
+            self.window.set_result(None)
+
+
+class TableServer:
+    """Seats connections at tables and runs the tables; 'ai' names the policy of the AI seats."""
+
+    def __init__(self, ai="heuristic"):
+        self.ai = ai
+        self.lobby = {}              # (players, decks, humans, seed) -> Table still filling up
+        self.tables = {}             # task -> Table of every running table
+        self.ids = itertools.count(1)
+        self.connections = 0
+        self.games = 0
+
+    async def handle(self, reader, writer):
+        """Serve one connection until it closes."""
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        conn = Connection(writer)
+        self.connections += 1
+        try:
+            while True:
+                message = await protocol.read_message(reader)
+                code = self.dispatch(conn, message)
+                if code is not None:
+                    conn.send(protocol.error(code))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except ValueError:
+            # A malformed frame ends the connection: get the error out before closing it
+            conn.send(protocol.error(protocol.BAD_MESSAGE))
+            conn.flush()
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass
+        finally:
+            self.connections -= 1
+            if conn.table is not None:
+                self.leave(conn)
+            writer.close()
+
+    def dispatch(self, conn, message):
+        """Act on one client message; returns an ERROR code or None."""
+        kind, table = message[0], conn.table
+        if kind == protocol.JOIN:
+            return self.join(conn, *message[1:])
+        if table is None or table.state is None:
+            return protocol.BAD_MESSAGE
+        if kind == protocol.PLAY:
+            return table.offer_play(conn.seat, message[1])
+        if kind == protocol.CALL:
+            return table.called(conn.seat)
+        if kind == protocol.PASS:
+            table.passed(conn.seat)
+            return None
+        return protocol.BAD_MESSAGE
+
+    def join(self, conn, players, decks, humans, seed):
+        if conn.table is not None:
+            return protocol.BAD_TABLE
+        try:
+            engine.table_rules(players, decks)
+        except ValueError:
+            return protocol.BAD_TABLE
+        if not 1 <= humans <= players:
+            return protocol.BAD_TABLE
+        key = (players, decks, humans, seed)
+        table = self.lobby.get(key)
+        if table is None:
+            table = self.lobby[key] = Table(next(self.ids), key, self.ai)
+        table.sit(conn)
+        if table.full:
+            del self.lobby[key]
+            table.deal()
+            task = asyncio.get_running_loop().create_task(table.run())
+            self.tables[task] = table
+            task.add_done_callback(self.table_done)
+        return None
+
+    def leave(self, conn):
+        table = conn.table
+        table.leave(conn)
+        if table.state is None and not table.conns and self.lobby.get(table.key) is table:
+            del self.lobby[table.key]
+
+    def table_done(self, task):
+        table = self.tables.pop(task)
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            # A bug in a policy or the server: report it and drop the table, not the server
+            traceback.print_exception(task.exception())
+            table.detach()
+            return
+        self.games += 1
+
+
+def raise_open_file_limit():
+    """Allow as many sockets as the hard limit does (thousands of tables, thousands of sockets)."""
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+async def serve(host, port, ai):
+    server = TableServer(ai)
+    listener = await asyncio.start_server(server.handle, host, port, backlog=4096)
+    print(f"serving Bluff tables on {host}:{port}", flush=True)
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        print(f"{server.games} games played, {len(server.tables)} tables still running")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Host Bluff tables over TCP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7777)
+    parser.add_argument("--ai", default="heuristic", choices=sorted(engine.POLICIES),
+                        help="policy of the AI seats")
+    args = parser.parse_args()
+    raise_open_file_limit()
+    try:
+        asyncio.run(serve(args.host, args.port, args.ai))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""Recorded input sessions of the pygame client, for exact playback.
+
+A session file holds everything the client's main loop takes from outside
+during a run: the seed, table and AI settings, and for every frame the game
+clock, the input events handled and how many AI decisions were collected.
+Played back (game.py --playback FILE), the loop is fed the same frames. The
+timeline runs on the recorded clock, and AI decisions are waited for instead
+of raced against, so the session unfolds exactly as it was played. A crc32
+of every frame's game state is kept while recording and checked on playback.
+Policies with a wall-clock budget ("montecarlo" without max_rollouts) decide
+differently from run to run; a session using them shows up as diverged.
+
+File: a header (magic, version, length of a JSON settings blob), the blob,
+then fixed-width 17-byte records, frame after frame:
+
+    kind   a              b             c             d
+    FRAME  clock (ms)     AI results    events        0
+    EVENT  pygame type    x or key      y or mod      button
+    END    frames         state crc32   0             0
+
+Only the events the loop reacts to are kept (see RECORDED_EVENTS). The
+END record is written by close(). A session cut off by a crash has no END
+record, so its digest cannot be checked.
+
+Usage: python session.py FILE [FILE ...]    (prints a summary of the sessions)
+"""
+import argparse
+import json
+import os
+import struct
+import time
+import zlib
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+import pygame
+
+MAGIC = b"BLUFFSES"
+VERSION = 2     # 2: state digests include the hand and pile contents
+HEADER = struct.Struct("<8sHI")             # magic, version, settings length
+RECORD = struct.Struct("<BIIII")
+
+# Record kinds
+FRAME, EVENT, END = 1, 2, 3
+
+RECORDED_EVENTS = (pygame.QUIT, pygame.MOUSEBUTTONDOWN, pygame.KEYDOWN, pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED)
+INPUT_EVENTS = (pygame.MOUSEBUTTONDOWN, pygame.KEYDOWN)
+
+
+def event_record(event):
+    if event.type == pygame.MOUSEBUTTONDOWN:
+        return RECORD.pack(EVENT, event.type, event.pos[0], event.pos[1], event.button)
+    if event.type == pygame.KEYDOWN:
+        return RECORD.pack(EVENT, event.type, event.key, event.mod, 0)
+    return RECORD.pack(EVENT, event.type, 0, 0, 0)
+
+
+def make_event(kind, a, b, c):
+    if kind == pygame.MOUSEBUTTONDOWN:
+        return pygame.event.Event(kind, pos=(a, b), button=c)
+    if kind == pygame.KEYDOWN:
+        return pygame.event.Event(kind, key=a, mod=b, unicode="", scancode=0)
+    return pygame.event.Event(kind)
+
+
+def fold_state(digest, state, *extra):
+    """Fold 'state' (and any display state in 'extra') into the running crc32 'digest'.
+
+    Every field of the state's snapshot goes in, the hands and pile as
+    their rank counts (a Snapshot's repr only shows sizes).
+    """
+    snap = state.snapshot()
+    for counts in snap.hands:
+        digest = zlib.crc32(counts, digest)
+    digest = zlib.crc32(snap.pile, digest)
+    rest = (snap.current_player, snap.current_rank, snap.last_play, snap.game_over, snap.winner, snap.turns, extra)
+    return zlib.crc32(repr(rest).encode(), digest)
+
+
+class SessionRecorder:
+    """Writes a session to 'path'; 'settings' is a JSON-able dict of what playback must reuse."""
+
+    def __init__(self, path, settings, buffer_frames=256):
+        self.buffer_frames = buffer_frames
+        self._file = open(path, "wb")
+        blob = json.dumps(settings).encode()
+        self._file.write(HEADER.pack(MAGIC, VERSION, len(blob)) + blob)
+        self._buffer = bytearray()
+        self.frames = 0
+        self.digest = 0
+
+    def frame(self, ticks, events, ai_results):
+        """Record one main loop iteration: its clock, the events it handled and the AI results it polled."""
+        events = [e for e in events if e.type in RECORDED_EVENTS]
+        self._buffer += RECORD.pack(FRAME, ticks, ai_results, len(events), 0)
+        for event in events:
+            self._buffer += event_record(event)
+        self.frames += 1
+        if self.frames % self.buffer_frames == 0:
+            self.flush()
+
+    def check(self, state, *extra):
+        self.digest = fold_state(self.digest, state, *extra)
+
+    def flush(self):
+        self._file.write(self._buffer)
+        self._file.flush()
+        self._buffer.clear()
+
+    def close(self):
+        self._buffer += RECORD.pack(END, self.frames, self.digest, 0, 0)
+        self.flush()
+        self._file.close()
+
+
+class SessionPlayer:
+    """A recorded session read back frame by frame; next_frame() gives (clock, AI results, events)."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, blob_size = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: not a version {VERSION} session file")
+        self.settings = json.loads(data[HEADER.size:HEADER.size + blob_size])
+        self.frames = []                 # (clock ms, AI results, events) per frame
+        self.recorded_digest = None      # None if the recording was cut off
+        for kind, a, b, c, d in RECORD.iter_unpack(data[HEADER.size + blob_size:]):
+            if kind == FRAME:
+                self.frames.append((a, b, []))
+            elif kind == EVENT:
+                self.frames[-1][2].append(make_event(a, b, c, d))
+            elif kind == END:
+                self.recorded_digest = b
+        self.position = 0
+        self.digest = 0
+        self._start = None
+
+    def next_frame(self):
+        """The next recorded frame, or None at the end of the session."""
+        if self.position == len(self.frames):
+            return None
+        frame = self.frames[self.position]
+        self.position += 1
+        return frame
+
+    def wait(self):
+        """Sleep until the next frame is due, keeping the recorded pace between frames."""
+        if self.position == len(self.frames):
+            return
+        now = time.perf_counter()
+        if self._start is None:
+            self._start = now - self.frames[self.position - 1][0] / 1000
+        delay = self._start + self.frames[self.position][0] / 1000 - now
+        if delay > 0:
+            time.sleep(delay)
+
+    def check(self, state, *extra):
+        self.digest = fold_state(self.digest, state, *extra)
+
+    @property
+    def matched(self):
+        """Whether playback reproduced the recording (None if there is nothing to compare with)."""
+        if self.recorded_digest is None or self.position < len(self.frames):
+            return None
+        return self.digest == self.recorded_digest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize recorded pygame client sessions.")
+    parser.add_argument("sessions", nargs="+", metavar="FILE")
+    args = parser.parse_args()
+    for path in args.sessions:
+        player = SessionPlayer(path)
+        frames = player.frames
+        events = [e for _, _, frame_events in frames for e in frame_events]
+        clicks = sum(e.type == pygame.MOUSEBUTTONDOWN for e in events)
+        keys = sum(e.type == pygame.KEYDOWN for e in events)
+        length = (frames[-1][0] - frames[0][0]) / 1000 if frames else 0.0
+        settings = ", ".join(f"{name} {value}" for name, value in player.settings.items() if name != "params")
+        print(f"{path}: {len(frames)} frames over {length:.1f}s, {clicks} clicks, {keys} keys, "
+              f"{sum(n for _, n, _ in frames)} AI results")
+        print(f"  {settings}")
+        if player.recorded_digest is None:
+            print("  no END record (the recording was cut off)")
+
+
+if __name__ == "__main__":
+    main()
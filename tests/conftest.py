@@ -0,0 +1,23 @@
+"""The modules live at the top of the repository; let the tests import them."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def game():
+    """The pygame client module, imported headlessly as bench.py does."""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    pytest.importorskip("pygame")
+    # The client parses its own command line when imported
+    argv, sys.argv = sys.argv, ["game.py", "--seed", "1"]
+    try:
+        import game
+    finally:
+        sys.argv = argv
+    yield game
+    game.ai_worker.shutdown()
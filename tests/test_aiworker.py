@@ -0,0 +1,82 @@
+"""AIWorker: results reach their callbacks on poll(), in submission order, and cancel() drops jobs."""
+import threading
+
+import pytest
+
+from aiworker import AIWorker
+
+
+@pytest.fixture
+def worker():
+    worker = AIWorker()
+    yield worker
+    worker.shutdown()
+
+
+def blocked(gate, value, ran=None, started=None):
+    """A job that waits for 'gate' before returning 'value' (and records that it ran)."""
+    if started is not None:
+        started.set()
+    gate.wait(5)
+    if ran is not None:
+        ran.append(value)
+    return value
+
+
+def test_poll_hands_over_finished_jobs_in_order(worker):
+    gate = threading.Event()
+    results = []
+    worker.submit(results.append, blocked, gate, "first")
+    worker.submit(results.append, lambda: "second")
+    # Nothing is handed over while the oldest job runs, even on later polls
+    assert worker.poll() == 0 and worker.busy
+    gate.set()
+    assert worker.poll(wait_for=2) == 2
+    assert results == ["first", "second"]
+    assert not worker.busy
+    assert worker.poll() == 0
+
+
+def test_poll_wait_for_hands_over_exactly_that_many(worker):
+    results = []
+    for i in range(3):
+        worker.submit(results.append, lambda i=i: i)
+    assert worker.poll(wait_for=2) == 2
+    assert results == [0, 1]
+    assert worker.poll(wait_for=1) == 1
+    assert results == [0, 1, 2]
+
+
+def test_wake_is_called_when_a_job_finishes():
+    woken = threading.Event()
+    worker = AIWorker(wake=woken.set)
+    try:
+        worker.submit(lambda result: None, lambda: 1)
+        assert woken.wait(5)
+        assert worker.poll() == 1
+    finally:
+        worker.shutdown()
+
+
+def test_cancel_drops_running_and_queued_jobs(worker):
+    gate, started = threading.Event(), threading.Event()
+    ran, results = [], []
+    worker.submit(results.append, blocked, gate, "running", ran, started)
+    worker.submit(results.append, blocked, gate, "queued", ran)
+    assert started.wait(5)
+    worker.cancel()
+    assert not worker.busy
+    gate.set()
+    # A later job still runs, after the cancelled one that had started
+    worker.submit(results.append, lambda: "after")
+    assert worker.poll(wait_for=1) == 1
+    assert results == ["after"]
+    assert ran == ["running"]
+
+
+def test_poll_reraises_a_policy_error(worker):
+    def fail():
+        raise RuntimeError("policy bug")
+    worker.submit(lambda result: None, fail)
+    with pytest.raises(RuntimeError, match="policy bug"):
+        worker.poll(wait_for=1)
@@ -0,0 +1,48 @@
+"""batch.py against the engine: same deal, same call rule, same outcomes."""
+import numpy as np
+import pytest
+
+import batch
+import engine
+from engine import RANKS
+
+
+@pytest.mark.parametrize("players, decks", [(2, 1), (3, 1), (5, 2)])
+def test_deal_batch_matches_table_rules(players, decks):
+    cards_per_rank, cards_per_player, _ = engine.table_rules(players, decks)
+    hands, pile = batch.deal_batch(np.random.default_rng(0), 50, players, decks)
+    assert hands.shape == (50, players, len(RANKS))
+    assert (hands.sum(axis=2) == cards_per_player).all()
+    assert ((hands.sum(axis=1) + pile) == cards_per_rank).all()
+
+
+@pytest.mark.parametrize("cards_per_rank", [6, 12])
+def test_call_decisions_match_ai_call_probability(cards_per_rank):
+    params = engine.ai_params()
+    for own in range(cards_per_rank + 1):
+        for played in range(1, cards_per_rank + 1):
+            prob = engine.ai_call_probability(own, played, params, cards_per_rank)
+            # A draw just below the probability calls, one at it does not
+            below = np.array([[max(prob - 1e-9, 0.0)]])
+            at = np.array([[prob]])
+            own_counts = np.array([[own]])
+            count = np.array([played])
+            assert batch.call_decisions(own_counts, count, at, params, cards_per_rank)[0, 0] == (prob >= 1.0)
+            assert batch.call_decisions(own_counts, count, below, params, cards_per_rank)[0, 0] == (prob > 0.0)
+
+
+def test_batch_outcomes_agree_with_engine():
+    n_games = 3000
+    seats = [(str(i), True) for i in range(3)]
+    engine_wins = np.zeros(3)
+    engine_turns = []
+    for seed in range(n_games):
+        state = engine.simulate_game(seats, seed=seed, max_turns=1000)
+        engine_wins[int(state.winner)] += 1
+        engine_turns.append(state.turns)
+    winners, turns = batch.simulate_batch(n_games, seed=1, n_players=3)
+    assert (winners >= 0).all()
+    batch_wins = np.bincount(winners, minlength=3)
+    # Win shares within about three standard errors, mean length within 5%
+    assert np.abs(batch_wins - engine_wins).max() / n_games < 0.04
+    assert abs(turns.mean() - np.mean(engine_turns)) / np.mean(engine_turns) < 0.05
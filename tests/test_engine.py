@@ -0,0 +1,146 @@
+"""Rules engine checks: the deal, plays, calls and seeded reproducibility."""
+import pytest
+
+import engine
+from engine import RANKS, GameState, Hand, Player
+
+
+def seats(n):
+    return [(f"P{i}", True) for i in range(n)]
+
+
+def total_cards(state):
+    return sum(len(p.hand) for p in state.players) + len(state.pile)
+
+
+@pytest.mark.parametrize("players, decks", [(2, 1), (3, 1), (4, 1), (5, 2), (10, 4)])
+def test_deal_conserves_cards(players, decks):
+    state = engine.new_game(seats(players), seed=1, decks=decks)
+    cards_per_rank, cards_per_player, win_hand_size = engine.table_rules(players, decks)
+    assert state.cards_per_rank == cards_per_rank
+    assert state.win_hand_size == win_hand_size
+    assert all(len(p.hand) == cards_per_player for p in state.players)
+    assert total_cards(state) == cards_per_rank * len(RANKS)
+    for rank in RANKS:
+        held = sum(p.hand.count(rank) for p in state.players) + state.pile.count(rank)
+        assert held == cards_per_rank
+
+
+def test_standard_table_rules():
+    assert engine.table_rules() == (engine.CARDS_PER_RANK, engine.CARDS_PER_PLAYER, engine.WIN_HAND_SIZE)
+
+
+@pytest.mark.parametrize("players, decks", [(1, 1), (11, 1), (3, 0), (3, engine.MAX_DECKS + 1)])
+def test_table_rules_rejects_bad_tables(players, decks):
+    with pytest.raises(ValueError):
+        engine.table_rules(players, decks)
+
+
+def fixed_state(hands, pile=()):
+    state = GameState([Player(str(i), True) for i in range(len(hands))], None)
+    for player, cards in zip(state.players, hands):
+        player.hand = Hand(cards)
+    state.pile = Hand(pile)
+    return state
+
+
+def test_apply_play_moves_cards_and_records_play():
+    state = fixed_state([[2, 2, 3, 4, 5, 6, 7], [8] * 7])
+    engine.apply_play(state, [2, 3])
+    assert state.players[0].hand.sorted_cards() == [2, 4, 5, 6, 7]
+    assert state.pile.sorted_cards() == [2, 3]
+    assert state.last_play_info == {'player': 0, 'declared': RANKS[0], 'cards': [2, 3]}
+    assert state.turns == 1
+    assert engine.is_bluff(state.last_play_info)
+
+
+def test_uncalled_play_passes_the_turn():
+    state = fixed_state([[2] * 7 + [3], [8] * 8])
+    engine.apply_play(state, [2])
+    assert engine.resolve_call(state, None) is None
+    assert not state.game_over
+    assert state.current_player == 1
+    assert state.current_rank == RANKS[1]
+
+
+def test_uncalled_play_down_to_win_size_wins():
+    state = fixed_state([[2] * 6, [8] * 8])
+    engine.apply_play(state, [2])
+    engine.resolve_call(state, None)
+    assert state.game_over and state.winner == "0"
+
+
+def test_call_splits_pile_caller_takes_odd_card():
+    state = fixed_state([[2, 2, 3, 3, 4, 4, 5, 6], [7] * 8, [8] * 8], pile=[5, 6])
+    engine.apply_play(state, [3])
+    assert engine.resolve_call(state, 2) is True
+    # Pile 3, 5, 6: the accused takes the lowest card, the caller the other two
+    assert state.players[0].hand.sorted_cards() == [2, 2, 3, 3, 4, 4, 5, 6]
+    assert state.players[2].hand.sorted_cards() == [5, 6] + [8] * 8
+    assert not state.pile
+    assert state.current_player == 1
+    assert not state.game_over
+
+
+def test_honest_play_called_is_not_a_lie():
+    state = fixed_state([[2, 2, 3, 4, 5, 6, 7, 8], [7] * 8])
+    engine.apply_play(state, [2, 2])
+    assert engine.resolve_call(state, 1) is False
+    assert len(state.players[0].hand) + len(state.players[1].hand) == 16
+
+
+def test_same_seed_same_game():
+    a = engine.simulate_game(seats(3), seed=42)
+    b = engine.simulate_game(seats(3), seed=42)
+    assert a.snapshot() == b.snapshot()
+    assert a.game_over and a.winner == b.winner
+
+
+@pytest.mark.parametrize("name", ["heuristic", "honest", "random"])
+def test_policies_finish_games_with_cards_conserved(name):
+    policies = [engine.POLICIES[name]() for _ in range(3)]
+    for seed in range(20):
+        state = engine.simulate_game(seats(3), seed=seed, policies=policies)
+        assert total_cards(state) == engine.TOTAL_CARDS
+        if state.game_over:
+            winner = next(p for p in state.players if p.name == state.winner)
+            assert len(winner.hand) <= state.win_hand_size
+
+
+
+def test_load_policies_registers_every_policy_module():
+    policies = engine.load_policies()
+    assert policies is engine.POLICIES
+    for name in ("heuristic", "honest", "random", "montecarlo", "counting", "endgame", "compiled"):
+        assert name in policies
+
+
+@pytest.mark.parametrize("content", [
+    "{not json",
+    '{"version": 0, "params": {}}',
+    '[1, 2, 3]',
+    '{"version": 1, "params": {"BLUFF_CHANCE": 0.5}}',
+    '{"version": 1, "params": {"BLUFF_CHANCE": "often", "DOUBLE_PLAY_CHANCE": 0, "CALL_PROB_ACCOUNTED_MULTI": 0,'
+    ' "CALL_PROB_ACCOUNTED_SINGLE": 0, "CALL_PROB_BIG_PLAY": 0, "CALL_PROB_PAIR": 0}}',
+])
+def test_broken_params_file_warns_and_keeps_the_constants(tmp_path, content):
+    path = tmp_path / "ai_params.json"
+    path.write_text(content)
+    before = engine.ai_params()
+    with pytest.raises(ValueError):
+        engine.load_ai_params(str(path))
+    with pytest.warns(UserWarning, match="ignoring"):
+        assert engine.load_saved_params(str(path)) is None
+    assert engine.ai_params() == before
+
+
+def test_saved_params_load(tmp_path):
+    path = str(tmp_path / "ai_params.json")
+    before = engine.ai_params()
+    assert engine.load_saved_params(path) is None
+    engine.save_ai_params(path, [0.5] * len(engine.AI_PARAMS), note="test")
+    try:
+        assert engine.load_saved_params(path)['note'] == "test"
+        assert engine.ai_params() == (0.5,) * len(engine.AI_PARAMS)
+    finally:
+        engine.set_ai_params(before)
@@ -0,0 +1,95 @@
+"""FrameProfiler on a hand-driven clock: per-phase percentiles, the rolling window and CSV export."""
+import csv
+
+import pytest
+
+import frameprof
+from frameprof import PHASES, FrameProfiler
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1.0      # seconds; not 0, which the profiler reads as "no frame started"
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(frameprof.time, "perf_counter", clock)
+    return clock
+
+
+def play_frame(profiler, clock, events_ms, draw_ms):
+    """One frame: 'events' then 'draw' take the given times, the other phases none."""
+    clock.now += events_ms / 1000
+    profiler.mark("events")
+    clock.now += draw_ms / 1000
+    profiler.mark("draw")
+    profiler.next_frame()
+
+
+def test_percentiles_of_each_phase_and_frame(clock):
+    profiler = FrameProfiler(window=100)
+    profiler.enable()
+    profiler.next_frame()
+    # Frame i spends i ms on events and 2 ms drawing, in shuffled order
+    for i in [37, 2, 91, 64] + [i for i in range(1, 101) if i not in (37, 2, 91, 64)]:
+        play_frame(profiler, clock, i, 2)
+    assert profiler.frames == 100
+    summary = profiler.summary()
+    assert summary["events"] == pytest.approx((51, 96, 100))
+    assert summary["draw"] == pytest.approx((2, 2, 2))
+    assert summary["frame"] == pytest.approx((53, 98, 102))
+    assert summary["logic"] == (0, 0, 0)
+
+
+def test_summary_covers_the_last_window_frames_only(clock):
+    profiler = FrameProfiler(window=10)
+    profiler.enable()
+    profiler.next_frame()
+    for _ in range(20):
+        play_frame(profiler, clock, 500, 0)
+    for _ in range(10):
+        play_frame(profiler, clock, 1, 0)
+    assert profiler.summary()["events"] == pytest.approx((1, 1, 1))
+
+
+def test_few_frames_and_no_frames(clock):
+    profiler = FrameProfiler(window=100)
+    assert profiler.summary()["frame"] == (0.0, 0.0, 0.0)
+    profiler.enable()
+    profiler.next_frame()
+    play_frame(profiler, clock, 4, 0)
+    play_frame(profiler, clock, 8, 0)
+    # With two samples p50 is the larger one, as is every higher percentile
+    assert profiler.summary()["events"] == pytest.approx((8, 8, 8))
+
+
+def test_disabled_profiler_records_nothing(clock):
+    profiler = FrameProfiler(window=10, keep_rows=True)
+    for _ in range(5):
+        play_frame(profiler, clock, 3, 3)
+    assert profiler.frames == 0 and profiler.rows == []
+    # The frame in progress when it is enabled is not recorded either
+    profiler.enable()
+    play_frame(profiler, clock, 3, 3)
+    assert profiler.frames == 0
+
+
+def test_export_csv_writes_every_kept_frame(clock, tmp_path):
+    profiler = FrameProfiler(window=2, keep_rows=True)
+    profiler.enable()
+    profiler.next_frame()
+    for i in range(1, 6):
+        play_frame(profiler, clock, i, 1)
+    path = tmp_path / "frames.csv"
+    assert profiler.export_csv(str(path)) == 5
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert list(rows[0]) == ["start_ms"] + [f"{phase}_ms" for phase in PHASES] + ["frame_ms"]
+    assert [float(row["events_ms"]) for row in rows] == pytest.approx([1, 2, 3, 4, 5])
+    assert [float(row["frame_ms"]) for row in rows] == pytest.approx([2, 3, 4, 5, 6])
+    assert float(rows[1]["start_ms"]) - float(rows[0]["start_ms"]) == pytest.approx(2)
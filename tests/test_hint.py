@@ -0,0 +1,47 @@
+"""The client's endgame hint is solved on the AI worker, never in the frame."""
+import endgame
+import engine
+
+
+def endgame_position(game):
+    """Reset the client to a game where it is the human's turn in the endgame."""
+    game.reset_game()
+    state = game.state
+    while state.game_over or state.current_player != 0 or not endgame.in_endgame(state):
+        if state.game_over:
+            game.reset_game()
+            state = game.state
+            continue
+        engine.play_ai_turn(state)
+    return state
+
+
+def test_hint_shows_thinking_until_solved(game):
+    state = endgame_position(game)
+    game.show_hint = True
+    try:
+        assert game.current_hint() == "Hint: thinking..."
+        assert game.ai_worker.poll(1) == 1
+        text = game.current_hint()
+        assert text.startswith("Hint: ") and text != "Hint: thinking..."
+        # Same position: no new job, same text
+        assert game.current_hint() == text
+        assert not game.ai_worker.busy
+        assert state.snapshot() == game.hint_position
+    finally:
+        game.show_hint = False
+
+
+def test_stale_hint_is_dropped(game):
+    state = endgame_position(game)
+    game.show_hint = True
+    try:
+        assert game.current_hint() == "Hint: thinking..."
+        # The game moves on (and a newer hint is asked for) before the result is in
+        engine.play_ai_turn(state)
+        game.hint_position = state.snapshot()
+        game.hint_text = "newer"
+        assert game.ai_worker.poll(1) == 1
+        assert game.hint_text == "newer"
+    finally:
+        game.show_hint = False
@@ -0,0 +1,42 @@
+"""HandLayout.card_at against testing every card's rect, topmost first."""
+import random
+
+import pytest
+
+from engine import RANKS, Hand
+
+layout = pytest.importorskip("layout", reason="layout.py needs pygame")
+
+SCREEN_WIDTH, CARD_WIDTH, CARD_HEIGHT = 1000, 50, 70
+BASE_Y = 800 - CARD_HEIGHT - 20
+
+
+def card_at_by_scan(hand_layout, pos):
+    # Later cards are drawn over earlier ones
+    for idx in reversed(range(len(hand_layout.rects))):
+        if hand_layout.rects[idx].collidepoint(pos):
+            return idx
+    return None
+
+
+def check_every_point(hand_layout):
+    xs = range(-5, SCREEN_WIDTH + 5)
+    # Every row on either side of a card edge, raised or not, and one inside
+    top, bottom = BASE_Y - hand_layout.raise_px, BASE_Y + CARD_HEIGHT
+    ys = [y + d for y in (top, BASE_Y, bottom - hand_layout.raise_px, bottom) for d in (-1, 0)] + [BASE_Y + 30]
+    for x in xs:
+        for y in ys:
+            assert hand_layout.card_at((x, y)) == card_at_by_scan(hand_layout, (x, y)), (x, y)
+
+
+@pytest.mark.parametrize("size", [0, 1, 2, 7, 18, 20, 35, 42])
+def test_card_at_matches_scan(size):
+    rng = random.Random(size)
+    hand = Hand(rng.choice(RANKS) for _ in range(size))
+    hand_layout = layout.HandLayout(SCREEN_WIDTH, CARD_WIDTH, CARD_HEIGHT, BASE_Y)
+    selections = [set(), set(range(size)), set(range(0, size, 2))]
+    selections += [set(rng.sample(range(size), rng.randint(0, size))) for _ in range(3)]
+    for selected in selections:
+        hand_layout.update(hand, selected)
+        assert len(hand_layout.rects) == size
+        check_every_point(hand_layout)
@@ -0,0 +1,70 @@
+"""Monte Carlo AI: determinizations only use what the observer knows."""
+import random
+
+import pytest
+
+import engine
+import montecarlo
+
+
+@pytest.fixture
+def restore_params():
+    params = engine.ai_params()
+    yield
+    engine.set_ai_params(params)
+
+
+def test_honest_prior_follows_set_ai_params(restore_params):
+    params = list(engine.ai_params())
+    params[0] = 0.8
+    engine.set_ai_params(params)
+    assert montecarlo.honest_prior() == pytest.approx(0.2)
+    # A prior of 0.2 shows in the sampled last plays
+    state = next(s for s in (engine.new_game([(str(i), True) for i in range(3)], seed=seed) for seed in range(20))
+                 if s.current_rank in s.players[s.current_player].hand)
+    rank = state.current_rank
+    engine.apply_play(state, [rank])
+    observer = (state.current_player + 1) % 3
+    rng = random.Random(0)
+    samples = [montecarlo.determinize(state, observer, rng, state.last_play_info, montecarlo.honest_prior())
+               for _ in range(2000)]
+    honest = sum(sim.last_play_info['cards'] == [rank] for sim in samples) / len(samples)
+    assert honest == pytest.approx(0.2, abs=0.05)
+
+
+def test_determinize_keeps_known_cards_in_place():
+    policies = [montecarlo.MonteCarloPolicy(max_rollouts=1)] + [engine.HeuristicPolicy() for _ in range(3)]
+    rng = random.Random(1)
+    checked = 0
+    for seed in range(20):
+        state = engine.new_game([(str(i), True) for i in range(4)], seed=seed, policies=policies)
+        known = montecarlo.find_tracker(state, 0)
+        assert known is not None
+        while not state.game_over and state.turns < 200:
+            engine.play_ai_turn(state)
+            for _ in range(3):
+                sim = montecarlo.determinize(state, 0, rng)
+                assert sim.snapshot().hands[0] == state.snapshot().hands[0]
+                assert [len(p.hand) for p in sim.players] == [len(p.hand) for p in state.players]
+                assert len(sim.pile) == len(state.pile)
+                for i, rank in enumerate(engine.RANKS):
+                    assert sum(p.hand.count(rank) for p in sim.players) + sim.pile.count(rank) \
+                        == state.cards_per_rank
+                    assert sim.pile.count(rank) >= known.pile_known[i]
+                    for seat in range(1, 4):
+                        assert sim.players[seat].hand.count(rank) >= known.lower(seat, rank)
+                checked += 1
+    assert checked > 1000
+
+
+def test_own_plays_stay_on_the_sampled_pile():
+    policies = [montecarlo.MonteCarloPolicy(max_rollouts=1)] + [engine.HeuristicPolicy() for _ in range(2)]
+    state = engine.new_game([(str(i), True) for i in range(3)], seed=2, policies=policies)
+    state.current_player = 0
+    cards = state.players[0].hand.sorted_cards()[:3]
+    engine.apply_play(state, cards)
+    engine.resolve_call(state, None)
+    rng = random.Random(0)
+    for _ in range(50):
+        pile = montecarlo.determinize(state, 0, rng).pile
+        assert all(pile.count(rank) >= cards.count(rank) for rank in cards)
@@ -0,0 +1,110 @@
+"""Compiled policy tables: the file format, and single against vectorized lookups."""
+import numpy as np
+import pytest
+
+import compiletables
+import engine
+import policytable
+from engine import CARDS_PER_RANK
+from policytable import BUCKET, CALL_ALWAYS, PLAY_SCALE, call_shape, play_shape
+
+
+def random_tables(rng, decks):
+    """A random (call, play) pair; play rows are cumulative and end at PLAY_SCALE, as compiled ones do."""
+    r = CARDS_PER_RANK * decks
+    call = rng.integers(0, CALL_ALWAYS + 1, size=call_shape(r), dtype=np.uint8)
+    weights = rng.integers(0, 4, size=play_shape(r))
+    weights[..., -1] += 1
+    play = np.round(np.cumsum(weights, axis=-1) / weights.sum(axis=-1, keepdims=True) * PLAY_SCALE)
+    return call, play.astype(np.uint16)
+
+
+@pytest.fixture
+def tables_file(tmp_path):
+    rng = np.random.default_rng(0)
+    sets = {(3, 1): random_tables(rng, 1), (5, 2): random_tables(rng, 2)}
+    path = str(tmp_path / "tables.bin")
+    policytable.write_tables(path, sets, {"policy": "test", "samples": 1})
+    return path, sets
+
+
+def test_write_then_load_round_trips(tables_file):
+    path, sets = tables_file
+    tables = policytable.PolicyTables(path)
+    assert tables.info == {"policy": "test", "samples": 1}
+    assert sorted(tables.sets) == sorted(sets)
+    for (players, decks), (call, play) in sets.items():
+        table_set = tables.get(players, decks)
+        assert (table_set.players, table_set.decks) == (players, decks)
+        assert np.array_equal(table_set.call, call)
+        assert np.array_equal(table_set.play, play)
+    with pytest.raises(ValueError):
+        tables.get(4, 1)
+    # load_tables maps each file once
+    assert policytable.load_tables(path) is policytable.load_tables(path)
+
+
+def test_load_refuses_other_files(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"NOTTABLE" + bytes(64))
+    with pytest.raises(ValueError):
+        policytable.PolicyTables(str(path))
+
+
+def lookup_inputs(rng, table_set, n):
+    r = table_set.cards_per_rank
+    sizes = len(BUCKET) - 1
+    return (rng.integers(0, r + 1, n), rng.integers(0, sizes + 1, n), rng.integers(0, sizes + 1, n),
+            rng.integers(0, sizes + 1, n), r)
+
+
+@pytest.mark.parametrize("shape", [(3, 1), (5, 2)])
+def test_call_value_matches_call_values(tables_file, shape):
+    table_set = policytable.PolicyTables(tables_file[0]).get(*shape)
+    rng = np.random.default_rng(1)
+    held, pile, accused, own, r = lookup_inputs(rng, table_set, 2000)
+    # Out-of-range played counts are clipped by both
+    played = rng.integers(0, r + 3, 2000)
+    values = table_set.call_values(held, played, pile, accused, own)
+    for i in range(len(held)):
+        assert table_set.call_value(int(held[i]), int(played[i]), int(pile[i]), int(accused[i]),
+                                    int(own[i])) == values[i]
+
+
+@pytest.mark.parametrize("shape", [(3, 1), (5, 2)])
+def test_play_action_matches_play_actions(tables_file, shape):
+    table_set = policytable.PolicyTables(tables_file[0]).get(*shape)
+    rng = np.random.default_rng(2)
+    held, hand, pile, next_hand, _ = lookup_inputs(rng, table_set, 2000)
+    draws = rng.random(2000)
+    draws[:10] = 0.0
+    draws[10:20] = np.nextafter(1.0, 0.0)
+    honest, count = table_set.play_actions(held, hand, pile, next_hand, draws)
+    for i in range(len(held)):
+        assert table_set.play_action(int(held[i]), int(hand[i]), int(pile[i]), int(next_hand[i]),
+                                     float(draws[i])) == (honest[i], count[i])
+
+
+def test_compiled_slices_are_valid_tables():
+    params = engine.ai_params()
+    r = CARDS_PER_RANK
+    for held in (0, 3, r):
+        call = compiletables.compile_call_slice("heuristic", 3, 1, held, 1, 0, params)
+        play = compiletables.compile_play_slice("heuristic", 3, 1, held, 1, 0, params)
+        assert call.shape == call_shape(r)[1:]
+        assert play.shape == play_shape(r)[1:]
+        # More of the rank than exist is always called
+        for played in range(1, r + 1):
+            if held + played > r:
+                assert (call[played - 1] == CALL_ALWAYS).all()
+        assert (np.diff(play.astype(int), axis=-1) >= 0).all()
+        assert (play[..., -1] == PLAY_SCALE).all()
+
+
+def test_compiled_policy_plays_whole_games(tables_file):
+    tables = policytable.PolicyTables(tables_file[0])
+    seats = [(str(i), True) for i in range(3)]
+    for seed in range(20):
+        state = engine.simulate_game(seats, seed=seed, max_turns=2000,
+                                     policies=[policytable.CompiledPolicy(tables) for _ in seats])
+        assert state.turns > 0
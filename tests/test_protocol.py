@@ -0,0 +1,71 @@
+"""Every protocol message survives encoding and decoding, whole or fed in pieces."""
+import asyncio
+
+import pytest
+
+import protocol
+from protocol import NO_SEAT
+
+HAND = bytes([1, 0, 2, 0, 3, 0, 6])
+SIZES = bytes([14, 9, 0])
+
+MESSAGES = [
+    (protocol.join(3, 2, 1, 2**64 - 1), (protocol.JOIN, 3, 2, 1, 2**64 - 1)),
+    (protocol.play(HAND), (protocol.PLAY, HAND)),
+    (protocol.CALL_FRAME, (protocol.CALL,)),
+    (protocol.PASS_FRAME, (protocol.PASS,)),
+    (protocol.welcome(7, 1, 3, 1, 5, ["You", "Alice", "a name too long"]),
+     (protocol.WELCOME, 7, 1, 3, 1, 5, ["You", "Alice", "a name too"])),
+    (protocol.deal(2, 3, HAND, SIZES), (protocol.DEAL, 2, 3, HAND, SIZES)),
+    (protocol.turn(1, 6), (protocol.TURN, 1, 6)),
+    (protocol.played(0, 3, 4, 300), (protocol.PLAYED, 0, 3, 4, 300)),
+    (protocol.window(1500), (protocol.WINDOW, 1500)),
+    (protocol.resolved(2, True, 0, SIZES), (protocol.RESOLVED, 2, True, 0, SIZES)),
+    (protocol.resolved(None, False, 12, SIZES), (protocol.RESOLVED, None, False, 12, SIZES)),
+    (protocol.hand(HAND), (protocol.HAND, HAND)),
+    (protocol.over(1), (protocol.OVER, 1)),
+    (protocol.over(None), (protocol.OVER, None)),
+    (protocol.error(protocol.BAD_PLAY), (protocol.ERROR, protocol.BAD_PLAY)),
+]
+
+
+@pytest.mark.parametrize("data, message", MESSAGES)
+def test_round_trip(data, message):
+    size, kind = protocol.HEADER.unpack_from(data)
+    assert len(data) == protocol.HEADER.size + size
+    assert protocol.decode(kind, data[protocol.HEADER.size:]) == message
+
+
+def test_frame_buffer_reassembles_any_split():
+    stream = b"".join(data for data, _ in MESSAGES)
+    expected = [message for _, message in MESSAGES]
+    for chunk in (1, 2, 3, 7, len(stream)):
+        buffer = protocol.FrameBuffer()
+        received = []
+        for i in range(0, len(stream), chunk):
+            received += buffer.feed(stream[i:i + chunk])
+        assert received == expected
+
+
+def test_read_message_from_a_stream():
+    async def read_all():
+        reader = asyncio.StreamReader()
+        for data, _ in MESSAGES:
+            reader.feed_data(data)
+        return [await protocol.read_message(reader) for _ in MESSAGES]
+    assert asyncio.run(read_all()) == [message for _, message in MESSAGES]
+
+
+@pytest.mark.parametrize("kind, payload", [
+    (protocol.PLAY, b"\1\2"),               # too few rank counts
+    (protocol.JOIN, b"\3"),                 # truncated body
+    (protocol.TURN, b"\1\2\3"),             # too long
+    (200, b""),                             # unknown kind
+])
+def test_malformed_frames_raise_value_error(kind, payload):
+    with pytest.raises(ValueError):
+        protocol.decode(kind, payload)
+
+
+def test_no_seat_fits_a_seat_byte():
+    assert protocol.decode(protocol.ERROR, bytes([NO_SEAT])) == (protocol.ERROR, NO_SEAT)
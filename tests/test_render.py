@@ -0,0 +1,43 @@
+"""The pygame client's incremental redraw paints the same screen as a full repaint."""
+import random
+
+import pytest
+
+import engine
+
+pygame = pytest.importorskip("pygame")
+
+
+def screen_bytes(game):
+    return pygame.image.tobytes(game.screen, "RGB")
+
+
+def test_incremental_redraw_matches_full_repaint(game):
+    rng = random.Random(0)
+    game.reset_game()
+    game.full_redraw = True
+    game.draw_game_state()
+    for step in range(300):
+        state = game.state
+        if state.game_over:
+            game.reset_game()
+        elif rng.random() < 0.3 and state.players[0].hand:
+            # Toggle the selection of a card in the human's hand
+            game.selected_indices ^= {rng.randrange(len(state.players[0].hand))}
+        else:
+            engine.play_ai_turn(state)
+            game.selected_indices = set()
+            game.last_action_msg = f"Turn {state.turns}"
+            game.waiting_for_call = rng.random() < 0.5
+        dirty = game.draw_game_state()
+        incremental = screen_bytes(game)
+        game.full_redraw = True
+        game.draw_game_state()
+        assert screen_bytes(game) == incremental, f"step {step}, redrew {dirty}"
+
+
+def test_unchanged_frame_redraws_nothing(game):
+    game.reset_game()
+    game.full_redraw = True
+    game.draw_game_state()
+    assert game.draw_game_state() == []
@@ -0,0 +1,73 @@
+"""Replay logs: games written, read back and re-simulated from the records."""
+import engine
+import replay
+from engine import GameState, Hand, Player
+
+
+def seats(n):
+    return [(str(i), True) for i in range(n)]
+
+
+def write_games(path, n_players, decks, seeds):
+    finished = []
+    with replay.ReplayWriter(path) as log:
+        for seed in seeds:
+            finished.append(engine.simulate_game(seats(n_players), seed=seed, log=log, decks=decks))
+    return finished
+
+
+def replay_game(game):
+    """Play a decoded game's turns through the engine; return the final state."""
+    state = GameState([Player(str(i), is_ai) for i, (_, is_ai) in enumerate(game['seats'])], None)
+    state.cards_per_rank, _, state.win_hand_size = engine.table_rules(game['players'], game['decks'])
+    for player, cards in zip(state.players, game['deal']):
+        player.hand = Hand(cards)
+    state.pile = Hand(game['pile'])
+    state.current_player = game['first']
+    for turn in game['turns']:
+        assert turn['player'] == state.current_player
+        assert turn['declared'] == state.current_rank
+        engine.apply_play(state, turn['cards'])
+        assert len(state.pile) == turn['pile']
+        engine.resolve_call(state, turn['caller'])
+    return state
+
+
+def test_logged_games_replay_to_the_recorded_result(tmp_path):
+    path = tmp_path / "games.bin"
+    finished = write_games(path, 3, 1, range(200)) + write_games(path, 5, 2, range(200, 250))
+    reader = replay.ReplayReader(path)
+    assert len(reader) == len(finished)
+    for records, state in zip(reader, finished):
+        game = replay.decode(records)
+        assert game['complete']
+        assert game['turns_played'] == len(game['turns']) == state.turns
+        assert game['seats'] == [("heuristic", True)] * len(state.players)
+        replayed = replay_game(game)
+        assert replayed.game_over
+        assert replayed.winner == state.winner == str(game['winner'])
+        assert replayed.snapshot().hands == state.snapshot().hands
+
+
+def test_seeds_are_recorded(tmp_path):
+    path = tmp_path / "seeds.bin"
+    with replay.ReplayWriter(path) as log:
+        engine.simulate_game(seats(3), seed=123, log=log)
+        engine.simulate_game(seats(3), seed="abc", log=log)
+        engine.simulate_game(seats(3), log=log)
+    kinds = [(g['seed_kind'], g['seed']) for g in map(replay.decode, replay.ReplayReader(path))]
+    assert kinds[0] == (replay.SEED_INT, 123)
+    assert kinds[1][0] == replay.SEED_HASHED
+    assert kinds[2] == (replay.SEED_NONE, 0)
+    # An integer seed is enough to play the game again
+    again = engine.simulate_game(seats(3), seed=kinds[0][1])
+    assert str(replay.decode(next(iter(replay.ReplayReader(path))))['winner']) == again.winner
+
+
+def test_turn_limit_records_no_winner(tmp_path):
+    path = tmp_path / "limit.bin"
+    with replay.ReplayWriter(path) as log:
+        state = engine.simulate_game(seats(3), seed=1, max_turns=3, log=log)
+    assert not state.game_over
+    game = replay.decode(next(iter(replay.ReplayReader(path))))
+    assert game['complete'] and game['winner'] is None and len(game['turns']) == 3
@@ -0,0 +1,122 @@
+"""The table server over a real socket: errors reach the client, silent seats go to the AI."""
+import asyncio
+
+import protocol
+import server
+
+
+async def start(ai="heuristic"):
+    table_server = server.TableServer(ai)
+    listener = await asyncio.start_server(table_server.handle, "127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    return table_server, listener, reader, writer
+
+
+def test_malformed_frame_gets_an_error_before_the_close():
+    async def run():
+        _, listener, reader, writer = await start()
+        async with listener:
+            # A PLAY must carry one count per rank
+            writer.write(protocol.frame(protocol.PLAY, b"\1\2"))
+            message = await asyncio.wait_for(protocol.read_message(reader), 5)
+            eof = await asyncio.wait_for(reader.read(), 5)
+            writer.close()
+        return message, eof
+    message, eof = asyncio.run(run())
+    assert message == (protocol.ERROR, protocol.BAD_MESSAGE)
+    assert eof == b""
+
+
+def test_errors_keep_the_connection_open():
+    async def run():
+        _, listener, reader, writer = await start()
+        async with listener:
+            writer.write(protocol.CALL_FRAME + protocol.join(1, 1, 1))
+            replies = [await asyncio.wait_for(protocol.read_message(reader), 5) for _ in range(2)]
+            writer.close()
+        return replies
+    assert asyncio.run(run()) == [(protocol.ERROR, protocol.BAD_MESSAGE), (protocol.ERROR, protocol.BAD_TABLE)]
+
+
+def test_timed_out_seat_is_taken_over_and_calls(monkeypatch):
+    monkeypatch.setattr(server, "TURN_TIMEOUT_S", 0.02)
+    monkeypatch.setattr(server, "CALL_WINDOW_MS", 10)
+
+    async def run():
+        table_server, listener, reader, writer = await start(ai="random")
+        async with listener:
+            # Join, then never play, call or pass
+            writer.write(protocol.join(3, 1, 1, 5))
+            resolved = []
+            while True:
+                message = await asyncio.wait_for(protocol.read_message(reader), 5)
+                if message[0] == protocol.RESOLVED:
+                    resolved.append(message)
+                elif message[0] == protocol.OVER:
+                    break
+            writer.close()
+        return table_server, resolved
+    table_server, resolved = asyncio.run(run())
+    assert table_server.games == 1
+    # Once the AI has the seat it also calls for it (a "random" AI calls half the plays)
+    assert any(caller == 0 for _, caller, _, _, _ in resolved)
+
+
+class FakeWriter:
+    """Enough of a StreamWriter for a Connection that never reads."""
+
+    def __init__(self):
+        self.data = bytearray()
+        self.transport = self
+
+    def write(self, data):
+        self.data += data
+
+    def is_closing(self):
+        return False
+
+    def get_write_buffer_size(self):
+        return 0
+
+    async def drain(self):
+        pass
+
+
+def test_leaving_before_the_table_runs_hands_the_seat_to_the_ai(monkeypatch):
+    monkeypatch.setattr(server, "TURN_TIMEOUT_S", 0.01)
+    monkeypatch.setattr(server, "CALL_WINDOW_MS", 5)
+
+    async def run():
+        table_server = server.TableServer()
+        first, second = server.Connection(FakeWriter()), server.Connection(FakeWriter())
+        assert table_server.join(first, 3, 1, 2, 7) is None
+        assert table_server.join(second, 3, 1, 2, 7) is None
+        # The table task exists but has not run yet
+        table_server.leave(first)
+        while table_server.tables:
+            await asyncio.sleep(0.01)
+        return table_server
+    assert asyncio.run(run()).games == 1
+
+
+def test_abandoned_table_does_not_stall_the_loop(monkeypatch):
+    monkeypatch.setattr(server, "MAX_TURNS", 40)
+
+    async def run():
+        table_server, listener, reader, writer = await start()
+        async with listener:
+            writer.write(protocol.join(2, 4, 1, 3))
+            assert (await asyncio.wait_for(protocol.read_message(reader), 5))[0] == protocol.WELCOME
+            table, = table_server.tables.values()
+            writer.close()
+            # Everything else on the loop keeps running while the AI plays the game out
+            ticks = 0
+            while table_server.games == 0:
+                ticks += 1
+                await asyncio.sleep(0)
+        return ticks, table.state
+    ticks, state = asyncio.run(run())
+    assert ticks >= state.turns // 2
+    # Abandoned at the turn limit
+    assert state.turns == 40 and not state.game_over
@@ -0,0 +1,73 @@
+"""Session files: frames read back as recorded, and the state digest sees every card."""
+import pytest
+
+import engine
+
+pygame = pytest.importorskip("pygame")
+import session
+
+
+def test_digest_sees_hand_contents():
+    a = engine.new_game(seed=1)
+    b = engine.new_game(seed=1)
+    assert session.fold_state(0, a) == session.fold_state(0, b)
+    # Swap one card between two hands: same sizes, same Snapshot repr
+    first, second = b.players[0].hand, b.players[1].hand
+    give = next(r for r in engine.RANKS if first.count(r))
+    take = next(r for r in engine.RANKS if second.count(r) and r != give)
+    first.remove(give)
+    second.add(give)
+    second.remove(take)
+    first.add(take)
+    assert repr(a.snapshot()) == repr(b.snapshot())
+    assert session.fold_state(0, a) != session.fold_state(0, b)
+
+
+def test_digest_sees_pile_contents_and_extra():
+    a = engine.new_game(engine.default_seats(4), seed=2)
+    b = engine.new_game(engine.default_seats(4), seed=2)
+    assert a.pile
+    rank = next(r for r in engine.RANKS if b.pile.count(r))
+    other = next(r for r in engine.RANKS if r != rank)
+    b.pile.remove(rank)
+    b.pile.add(other)
+    assert session.fold_state(0, a) != session.fold_state(0, b)
+    assert session.fold_state(0, a, [1], True) != session.fold_state(0, a, [1], False)
+
+
+def test_recorded_frames_play_back(tmp_path):
+    path = tmp_path / "s.ses"
+    settings = {'players': 3, 'seed': 5}
+    frames = [
+        (0, 0, [pygame.event.Event(pygame.KEYDOWN, key=pygame.K_h, mod=0)]),
+        (16, 2, [pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=(10, 700), button=1),
+                 pygame.event.Event(pygame.MOUSEMOTION, pos=(0, 0))]),     # not recorded
+        (33, 0, []),
+    ]
+    state = engine.new_game(seed=5)
+    recorder = session.SessionRecorder(path, settings, buffer_frames=2)
+    for ticks, results, events in frames:
+        recorder.frame(ticks, events, results)
+        recorder.check(state, True)
+    recorder.close()
+
+    player = session.SessionPlayer(path)
+    assert player.settings == settings
+    for ticks, results, events in frames:
+        got_ticks, got_results, got_events = player.next_frame()
+        assert (got_ticks, got_results) == (ticks, results)
+        kept = [e for e in events if e.type in session.RECORDED_EVENTS]
+        assert [e.type for e in got_events] == [e.type for e in kept]
+        for got, event in zip(got_events, kept):
+            assert getattr(got, 'pos', None) == getattr(event, 'pos', None)
+            assert getattr(got, 'key', None) == getattr(event, 'key', None)
+        player.check(state, True)
+    assert player.next_frame() is None
+    assert player.matched is True
+
+
+def test_other_versions_are_refused(tmp_path):
+    path = tmp_path / "old.ses"
+    path.write_bytes(session.HEADER.pack(session.MAGIC, 1, 2) + b"{}")
+    with pytest.raises(ValueError):
+        session.SessionPlayer(path)
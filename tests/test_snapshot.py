@@ -0,0 +1,71 @@
+"""GameState snapshots: immutable, hashable, and restore() undoes anything since."""
+import pytest
+
+import engine
+
+
+def seats(n=3):
+    return [(str(i), True) for i in range(n)]
+
+
+def test_restore_undoes_turns():
+    state = engine.new_game(seats(), seed=7)
+    snaps = [state.snapshot()]
+    hands = [[p.hand.sorted_cards() for p in state.players]]
+    while not state.game_over:
+        engine.play_ai_turn(state)
+        snaps.append(state.snapshot())
+        hands.append([p.hand.sorted_cards() for p in state.players])
+    # Step back through the whole game, then forward again by restoring
+    for snap, cards in reversed(list(zip(snaps, hands))):
+        state.restore(snap)
+        assert state.snapshot() == snap
+        assert [p.hand.sorted_cards() for p in state.players] == cards
+        assert [len(p.hand) for p in state.players] == [sum(h) for h in snap.hands]
+    state.restore(snaps[-1])
+    assert state.game_over and state.snapshot() == snaps[-1]
+
+
+def test_restored_game_plays_on_the_same():
+    state = engine.new_game(seats(), seed=11)
+    for _ in range(5):
+        engine.play_ai_turn(state)
+    snap = state.snapshot()
+    rng_state = state.rng.getstate()
+    first = engine.simulate_game(seats(), seed=11).snapshot()
+    while not state.game_over:
+        engine.play_ai_turn(state)
+    assert state.snapshot() == first
+    # Replaying from the snapshot with the same random numbers ends the same
+    state.restore(snap)
+    state.rng.setstate(rng_state)
+    while not state.game_over:
+        engine.play_ai_turn(state)
+    assert state.snapshot() == first
+
+
+def test_equal_positions_hash_equal():
+    a = engine.new_game(seats(), seed=5)
+    b = engine.new_game(seats(), seed=5)
+    assert a.snapshot() == b.snapshot()
+    assert hash(a.snapshot()) == hash(b.snapshot())
+    assert len({a.snapshot(), b.snapshot()}) == 1
+    engine.play_ai_turn(b)
+    assert a.snapshot() != b.snapshot()
+
+
+def test_unchanged_hands_are_shared():
+    state = engine.new_game(seats(), seed=2)
+    before = state.snapshot()
+    mover = state.current_player
+    engine.apply_play(state, state.players[mover].hand.sorted_cards()[:1])
+    after = state.snapshot()
+    for seat, (old, new) in enumerate(zip(before.hands, after.hands)):
+        assert (old is new) == (seat != mover)
+
+
+def test_snapshot_is_immutable():
+    snap = engine.new_game(seats(), seed=1).snapshot()
+    with pytest.raises(AttributeError):
+        snap.turns = 3
+    assert isinstance(snap.hands[0], bytes)
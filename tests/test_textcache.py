@@ -0,0 +1,55 @@
+"""TextCache: least recently used eviction and the hit/miss counters."""
+from textcache import TextCache
+
+
+class FakeFont:
+    """Stands in for a pygame font: each render returns a new object and is counted."""
+
+    def __init__(self):
+        self.renders = []
+
+    def render(self, text, antialias, color):
+        self.renders.append((text, color))
+        return object()
+
+
+def test_hits_reuse_the_surface_and_are_counted():
+    font = FakeFont()
+    cache = TextCache(max_entries=4)
+    first = cache.render(font, "Bluff!", (255, 0, 0))
+    assert cache.render(font, "Bluff!", (255, 0, 0)) is first
+    # Another colour or font is another surface
+    cache.render(font, "Bluff!", (0, 0, 0))
+    cache.render(FakeFont(), "Bluff!", (255, 0, 0))
+    assert (cache.hits, cache.misses) == (1, 3)
+    assert font.renders == [("Bluff!", (255, 0, 0)), ("Bluff!", (0, 0, 0))]
+    assert len(cache) == 3
+
+
+def test_least_recently_used_is_evicted():
+    font = FakeFont()
+    cache = TextCache(max_entries=3)
+    surfaces = {text: cache.render(font, text, 0) for text in "abc"}
+    # Using "a" makes "b" the least recently used
+    assert cache.render(font, "a", 0) is surfaces["a"]
+    cache.render(font, "d", 0)
+    assert len(cache) == 3
+    assert cache.render(font, "a", 0) is surfaces["a"]
+    assert cache.render(font, "c", 0) is surfaces["c"]
+    misses = cache.misses
+    assert cache.render(font, "b", 0) is not surfaces["b"]
+    assert cache.misses == misses + 1
+    assert len(cache) == 3
+
+
+def test_prerender_and_clear():
+    font = FakeFont()
+    cache = TextCache(max_entries=2)
+    cache.prerender([(font, "x", 0), (font, "y", 0), (font, "z", 0)])
+    assert len(cache) == 2 and cache.misses == 3
+    cache.render(font, "z", 0)
+    assert cache.hits == 1
+    cache.clear()
+    assert len(cache) == 0
+    cache.render(font, "z", 0)
+    assert cache.misses == 4
@@ -0,0 +1,95 @@
+"""Timeline: timer order, cancelling, and tween positions, on a hand-driven clock."""
+from timeline import Timeline
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+def test_timers_fire_in_due_order_then_scheduling_order():
+    clock = Clock()
+    timeline = Timeline(clock)
+    fired = []
+    timeline.after(30, lambda: fired.append("c"))
+    timeline.after(10, lambda: fired.append("a"))
+    timeline.after(20, lambda: fired.append("b1"))
+    timeline.after(20, lambda: fired.append("b2"))
+    clock.now = 9
+    timeline.update()
+    assert fired == []
+    clock.now = 20
+    timeline.update()
+    assert fired == ["a", "b1", "b2"]
+    clock.now = 100
+    timeline.update()
+    timeline.update()
+    assert fired == ["a", "b1", "b2", "c"]
+    assert timeline.next_due() is None
+
+
+def test_timer_scheduled_by_a_timer_waits_for_its_own_time():
+    clock = Clock()
+    timeline = Timeline(clock)
+    fired = []
+    timeline.after(10, lambda: timeline.after(5, lambda: fired.append("later")))
+    clock.now = 10
+    timeline.update()
+    assert fired == [] and timeline.next_due() == 15
+    clock.now = 15
+    timeline.update()
+    assert fired == ["later"]
+
+
+def test_cancelled_timer_never_fires():
+    clock = Clock()
+    timeline = Timeline(clock)
+    fired = []
+    first = timeline.after(10, lambda: fired.append("first"))
+    timeline.after(20, lambda: fired.append("second"))
+    first.cancel()
+    # next_due skips the cancelled timer
+    assert timeline.next_due() == 20
+    clock.now = 50
+    timeline.update()
+    assert fired == ["second"]
+
+
+def test_tween_moves_from_start_to_end():
+    clock = Clock()
+    timeline = Timeline(clock)
+    tween = timeline.move("card", (0, 100), (200, 0), 100, delay_ms=50)
+    # Not visible before it starts
+    assert list(timeline.visible_tweens()) == []
+    clock.now = 50
+    assert list(timeline.visible_tweens()) == [("card", (0, 100))]
+    clock.now = 100
+    assert list(timeline.visible_tweens()) == [("card", (100, 50))]
+    assert tween.position(150) == (200, 0)
+    assert tween.position(1000) == (200, 0)
+    clock.now = 149
+    timeline.update()
+    assert timeline.tweens == [tween]
+    clock.now = 150
+    timeline.update()
+    assert timeline.tweens == []
+
+
+def test_zero_length_tween_is_at_its_end():
+    timeline = Timeline(Clock())
+    assert timeline.move("card", (1, 2), (3, 4), 0).position(0) == (3, 4)
+
+
+def test_clear_drops_timers_and_tweens():
+    clock = Clock()
+    timeline = Timeline(clock)
+    fired = []
+    timeline.after(10, lambda: fired.append("x"))
+    timeline.move("card", (0, 0), (1, 1), 100)
+    timeline.clear()
+    clock.now = 200
+    timeline.update()
+    assert fired == [] and timeline.tweens == [] and timeline.next_due() is None
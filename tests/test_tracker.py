@@ -0,0 +1,58 @@
+"""CardTracker bounds never contradict the real cards."""
+import pytest
+
+import engine
+import tracker
+from engine import RANKS
+
+
+def check_bounds(state, t):
+    for p, player in enumerate(state.players):
+        assert t.sizes[p] == len(player.hand)
+        for rank in RANKS:
+            held = player.hand.count(rank)
+            assert t.lower(p, rank) <= held <= t.upper(p, rank)
+            assert 0.0 <= t.hold_chance(p, rank, held) <= 1.0
+            if held:
+                assert t.hold_chance(p, rank, t.upper(p, rank) + 1) == 0.0
+    for i, rank in enumerate(RANKS):
+        assert 0 <= t.pile_known[i] <= state.pile.count(rank)
+        assert t.free[i] >= 0
+    assert t.pile_size == len(state.pile)
+    assert t.free_total == sum(t.free)
+
+
+@pytest.mark.parametrize("players, decks", [(3, 1), (4, 1), (5, 2)])
+def test_bounds_hold_over_seeded_games(players, decks):
+    seats = [(str(i), True) for i in range(players)]
+    for seed in range(30):
+        state = engine.new_game(seats, seed=seed, decks=decks)
+        trackers = [tracker.CardTracker(state, seat) for seat in range(players)]
+        state.listeners.extend(trackers)
+        while not state.game_over and state.turns < 500:
+            engine.play_ai_turn(state)
+            for t in trackers:
+                check_bounds(state, t)
+
+
+def test_counting_policy_attaches_a_tracker():
+    policies = [tracker.CountingPolicy()] + [engine.HeuristicPolicy() for _ in range(2)]
+    state = engine.new_game([(str(i), True) for i in range(3)], seed=3, policies=policies)
+    assert tracker.find_tracker(state, 0) is not None
+    assert tracker.find_tracker(state, 1) is None
+    while not state.game_over and state.turns < 500:
+        engine.play_ai_turn(state)
+    assert state.game_over
+
+
+def test_impossible_play_is_flagged():
+    state = engine.new_game([(str(i), True) for i in range(3)], seed=0)
+    t = tracker.CardTracker(state, 1)
+    state.listeners.append(t)
+    rank = state.current_rank
+    # However many the observer holds, more than the rest of them cannot be honest
+    state.players[state.current_player].hand.add(rank, engine.CARDS_PER_RANK)
+    count = engine.CARDS_PER_RANK - t.own[engine.RANK_INDEX[rank]] + 1
+    engine.apply_play(state, [rank] * count)
+    assert t.last_play_impossible
+    assert t.last_play_hold_chance == 0.0
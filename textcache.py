@@ -0,0 +1,46 @@
+"""Bounded LRU cache of rendered text surfaces for the pygame client.
+
+Rasterizing a string with pygame.font is far more expensive than blitting
+the resulting surface, and the client shows the same few labels over and
+over, so each (font, text, color) is rendered once and reused.
+"""
+from collections import OrderedDict
+
+
+class TextCache:
+    """Rendered text surfaces keyed by (font, text, color), least recently used evicted first."""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._surfaces = OrderedDict()
+
+    def render(self, font, text, color):
+        """Return font.render(text, True, color), reusing an earlier surface when possible."""
+        key = (font, text, color)
+        surf = self._surfaces.get(key)
+        if surf is not None:
+            self._surfaces.move_to_end(key)
+            self.hits += 1
+            return surf
+        self.misses += 1
+        surf = font.render(text, True, color)
+        self._surfaces[key] = surf
+        if len(self._surfaces) > self.max_entries:
+            self._surfaces.popitem(last=False)
+        return surf
+
+    def prerender(self, entries):
+        """Render each (font, text, color) in 'entries' ahead of time."""
+        for font, text, color in entries:
+            self.render(font, text, color)
+
+    def clear(self):
+        self._surfaces.clear()
+
+    def __len__(self):
+        return len(self._surfaces)
+
+    def __repr__(self):
+        return f"TextCache({len(self)}/{self.max_entries} entries, {self.hits} hits, {self.misses} misses)"
@@ -0,0 +1,87 @@
+"""Time-based scheduler for the pygame client: one-shot timers and tweens.
+
+The main loop calls Timeline.update() once per frame; nothing here blocks or
+sleeps, so input keeps being processed while cards move and AIs "think".
+Time comes from the clock function given to the Timeline (milliseconds),
+which is pygame.time.get_ticks in the client.
+"""
+import heapq
+import itertools
+
+
+class Timer:
+    """A callback scheduled to run once at 'due' ms; cancel() stops it from running."""
+    __slots__ = ('due', 'callback', 'cancelled')
+
+    def __init__(self, due, callback):
+        self.due = due
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class Tween:
+    """An item moving in a straight line from start to end between two times."""
+    __slots__ = ('item', 'start', 'end', 'start_time', 'duration')
+
+    def __init__(self, item, start, end, start_time, duration):
+        self.item = item
+        self.start = start
+        self.end = end
+        self.start_time = start_time
+        self.duration = duration
+
+    def position(self, now):
+        t = (now - self.start_time) / self.duration if self.duration > 0 else 1.0
+        t = min(max(t, 0.0), 1.0)
+        return (self.start[0] + (self.end[0] - self.start[0]) * t,
+                self.start[1] + (self.end[1] - self.start[1]) * t)
+
+
+class Timeline:
+    def __init__(self, clock):
+        self.clock = clock
+        self.tweens = []
+        self._timers = []               # heap of (due, sequence, Timer)
+        self._sequence = itertools.count()
+
+    def after(self, delay_ms, callback):
+        """Run callback() once, delay_ms from now. Returns the Timer."""
+        timer = Timer(self.clock() + delay_ms, callback)
+        heapq.heappush(self._timers, (timer.due, next(self._sequence), timer))
+        return timer
+
+    def move(self, item, start, end, duration_ms, delay_ms=0):
+        """Move 'item' from start to end over duration_ms, starting delay_ms from now."""
+        tween = Tween(item, start, end, self.clock() + delay_ms, duration_ms)
+        self.tweens.append(tween)
+        return tween
+
+    def update(self):
+        """Run every timer that is due and drop finished tweens."""
+        now = self.clock()
+        while self._timers and self._timers[0][0] <= now:
+            _, _, timer = heapq.heappop(self._timers)
+            if not timer.cancelled:
+                timer.callback()
+        self.tweens = [t for t in self.tweens if now < t.start_time + t.duration]
+
+    def visible_tweens(self):
+        """Yield (item, position) for every tween that has started."""
+        now = self.clock()
+        for tween in self.tweens:
+            if now >= tween.start_time:
+                yield tween.item, tween.position(now)
+
+    def next_due(self):
+        """Time of the next pending timer, or None if there is none."""
+        while self._timers and self._timers[0][2].cancelled:
+            heapq.heappop(self._timers)
+        return self._timers[0][0] if self._timers else None
+
+    def clear(self):
+        """Forget every timer and tween (e.g. when a new game starts)."""
+        self.tweens.clear()
+        self._timers.clear()
@@ -0,0 +1,136 @@
+"""Play many headless games between AI policies and report win rates.
+
+Games are spread across a ProcessPoolExecutor. Game i is always played with
+seed "<seed>-<i>" and with the entrants rotated i seats round the table, so
+a run is reproducible and gives the same table for any number of workers.
+There is one seat per entrant (2 to 10); --decks deals from several decks.
+
+Usage: python tournament.py heuristic honest random --games 30000 --seed 7 [--decks 2] [--tables FILE]
+"""
+import argparse
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import engine
+import policytable
+from replay import ReplayWriter
+
+engine.load_policies()
+
+
+def wilson_interval(wins, games, z=1.96):
+    """95% Wilson score interval for a win rate of wins/games."""
+    if not games:
+        return 0.0, 1.0
+    p = wins / games
+    denom = 1 + z * z / games
+    centre = (p + z * z / (2 * games)) / denom
+    spread = z * math.sqrt(p * (1 - p) / games + z * z / (4 * games * games)) / denom
+    return max(0.0, centre - spread), min(1.0, centre + spread)
+
+
+def play_chunk(entrants, seed, first_game, n_games, log_dir=None, params=None, decks=1, tables=None):
+    """Worker: play games first_game .. first_game+n_games-1, return per-entrant tallies.
+
+    With a log_dir the games are recorded to <log_dir>/games-<first_game>.bluff.
+    'params' replaces the AI constants (engine.AI_PARAMS order) in the worker,
+    and 'tables' the compiled policy tables file.
+    """
+    if params is not None:
+        engine.set_ai_params(params)
+    if tables is not None:
+        policytable.use_tables(tables)
+    n_seats = len(entrants)
+    policies = [engine.POLICIES[name]() for name in entrants]
+    wins = [0] * n_seats
+    unfinished = 0
+    turns = 0
+    log = ReplayWriter(os.path.join(log_dir, f"games-{first_game:09d}.bluff")) if log_dir else None
+    for game in range(first_game, first_game + n_games):
+        # Entrant e sits in seat (e + game) % n_seats
+        order = [(seat - game) % n_seats for seat in range(n_seats)]
+        seats = [(str(e), True) for e in order]
+        state = engine.simulate_game(seats, seed=f"{seed}-{game}",
+                                     policies=[policies[e] for e in order], log=log, decks=decks)
+        turns += state.turns
+        if state.winner is None:
+            unfinished += 1
+        else:
+            wins[int(state.winner)] += 1
+    if log is not None:
+        log.close()
+    return wins, unfinished, turns
+
+
+def run_tournament(entrants, n_games, seed=0, workers=None, chunk_size=500, log_dir=None, params=None,
+                   decks=1, tables=None):
+    """Play n_games between the named policies; returns (wins, unfinished, turns)."""
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+    wins = [0] * len(entrants)
+    unfinished = turns = 0
+    starts = range(0, n_games, chunk_size)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(play_chunk, entrants, seed, start, min(chunk_size, n_games - start),
+                               log_dir, params, decks, tables)
+                   for start in starts]
+        for future in futures:
+            chunk_wins, chunk_unfinished, chunk_turns = future.result()
+            wins = [a + b for a, b in zip(wins, chunk_wins)]
+            unfinished += chunk_unfinished
+            turns += chunk_turns
+    return wins, unfinished, turns
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pit AI policies against each other.")
+    parser.add_argument("entrants", nargs="*", default=["heuristic"] * engine.PLAYERS_COUNT,
+                        help=f"one policy per seat, from: {', '.join(sorted(engine.POLICIES))}")
+    parser.add_argument("--decks", type=int, default=1, help="decks shuffled together")
+    parser.add_argument("--games", type=int, default=30000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--log-dir", metavar="DIR", default=None,
+                        help="record every game to replay logs in this directory")
+    parser.add_argument("--params", metavar="FILE", default=None,
+                        help="AI constants to use instead of ai_params.json (see tune.py)")
+    parser.add_argument("--tables", metavar="FILE", default=None,
+                        help="compiled policy tables for the \"compiled\" policy (see compiletables.py)")
+    args = parser.parse_args()
+    try:
+        engine.table_rules(len(args.entrants), args.decks)
+    except ValueError as e:
+        parser.error(str(e))
+    for name in args.entrants:
+        if name not in engine.POLICIES:
+            parser.error(f"unknown policy {name!r}")
+    # Check the compiled policy's tables here: in a worker a missing file would only show as a traceback
+    if "compiled" in args.entrants:
+        try:
+            if args.tables:
+                policytable.use_tables(args.tables)
+            policytable.load_tables().get(len(args.entrants), args.decks)
+        except (OSError, ValueError) as e:
+            parser.error(f"cannot load the compiled policy tables: {e}")
+
+    if args.params:
+        engine.load_ai_params(args.params)
+    start = time.perf_counter()
+    wins, unfinished, turns = run_tournament(args.entrants, args.games, args.seed, args.workers,
+                                           log_dir=args.log_dir, params=engine.ai_params(), decks=args.decks,
+                                           tables=args.tables)
+    elapsed = time.perf_counter() - start
+    print(f"{args.games} games on {args.workers} worker(s) in {elapsed:.2f}s "
+          f"({args.games / elapsed:.0f} games/s), mean {turns / args.games:.1f} turns")
+    print(f"{'#':>4}  {'policy':<10} {'wins':>8} {'win rate':>9}  95% CI")
+    for entrant, (name, won) in enumerate(zip(args.entrants, wins)):
+        low, high = wilson_interval(won, args.games)
+        print(f"{entrant:>4}  {name:<10} {won:>8} {won / args.games:>9.2%}  [{low:.2%}, {high:.2%}]")
+    if unfinished:
+        print(f"{unfinished} game(s) hit the turn limit")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""Incremental card accounting: what one player can deduce about the hidden cards.
+
+A CardTracker follows a single game as a GameState listener. It keeps, for
+every opponent and rank, a lower bound on how many of that rank they hold
+(cards seen going into their hand and not necessarily played since). It
+also keeps the cards known to be in the pile: the observer's own plays and
+plays revealed by a call. Each play or call updates these in O(len(RANKS)),
+so nothing is ever recomputed from the move history. Queries are O(1),
+apart from the at most state.cards_per_rank terms of hold_chance():
+
+    lower(p, r)           cards of rank r that p certainly holds
+    upper(p, r)           cards of rank r that p can possibly hold
+    hold_chance(p, r, n)  chance p holds n of rank r, the other unseen cards
+                          being spread at random
+
+The tracker only uses what its observer could see at the table: its own
+hand, hand and pile sizes, and the cards turned over by a call.
+"""
+from array import array
+from math import comb
+
+import engine
+from engine import RANKS, RANK_INDEX, GameListener, HeuristicPolicy
+
+# CountingPolicy calls a play it rates at least this likely to be a bluff.
+# hold_chance() is pessimistic: players keep the ranks they are about to
+# need, so cards are not spread at random. Lower thresholds lost games in
+# tournaments against the heuristic AI.
+CALL_THRESHOLD = 0.95
+
+
+class CardTracker(GameListener):
+    """Bounds on every opponent's holding of every rank, as seen by 'observer'."""
+
+    def __init__(self, state, observer):
+        n_ranks = len(RANKS)
+        self.observer = observer
+        self.own = array('b', state.players[observer].hand.counts)
+        self.sizes = [len(p.hand) for p in state.players]
+        self.low = [array('b', bytes(n_ranks)) for _ in state.players]   # observer's row stays 0
+        self.low_total = [0] * len(state.players)
+        self.pile_known = array('b', bytes(n_ranks))    # pile cards whose rank is known
+        self.pile_size = len(state.pile)
+        # Cards of each rank not in the observer's hand, the known pile or any lower bound
+        self.free = array('b', (state.cards_per_rank - n for n in self.own))
+        self.free_total = sum(self.free)
+        self.last_play_impossible = False    # the latest opponent play could not have been honest
+        self.last_play_hold_chance = 1.0     # hold_chance() of that play, before it was made
+        self._low_before = None              # the player's lower bounds before that play
+
+    # Queries
+
+    def lower(self, player, rank):
+        if player == self.observer:
+            return self.own[RANK_INDEX[rank]]
+        return self.low[player][RANK_INDEX[rank]]
+
+    def upper(self, player, rank):
+        i = RANK_INDEX[rank]
+        if player == self.observer:
+            return self.own[i]
+        unknown = self.sizes[player] - self.low_total[player]
+        return self.low[player][i] + min(self.free[i], unknown)
+
+    def hold_chance(self, player, rank, count):
+        """Chance that 'player' holds at least 'count' cards of 'rank'.
+
+        The cards not pinned down by the bounds are assumed to be spread at
+        random over the unknown part of every hand and the pile
+        (hypergeometric).
+        """
+        i = RANK_INDEX[rank]
+        if player == self.observer:
+            return 1.0 if self.own[i] >= count else 0.0
+        need = count - self.low[player][i]
+        if need <= 0:
+            return 1.0
+        unknown = self.sizes[player] - self.low_total[player]
+        free = self.free[i]
+        most = min(free, unknown)
+        if need > most:
+            return 0.0
+        total = self.free_total
+        ways = sum(comb(free, k) * comb(total - free, unknown - k) for k in range(need, most + 1))
+        return ways / comb(total, unknown)
+
+    # Updates (GameState listener interface)
+
+    def on_play(self, state, player, cards):
+        if player == self.observer:
+            self._sync_own(state)
+            for card in cards:
+                self._add_pile_known(RANK_INDEX[card], 1)
+        else:
+            declared = state.last_play_info['declared']
+            count = len(cards)
+            self.last_play_impossible = self.upper(player, declared) < count
+            self.last_play_hold_chance = self.hold_chance(player, declared, count)
+            # Any 'count' of the cards we knew about may be the ones played
+            low = self.low[player]
+            self._low_before = array('b', low)
+            for i, n in enumerate(low):
+                if n:
+                    self._set_low(player, i, max(0, n - count))
+        self.pile_size += len(cards)
+        self.sizes[player] = len(state.players[player].hand)
+
+    def on_call(self, state, accused, caller):
+        info = state.last_play_info
+        if accused != self.observer:
+            # The call turns the play over: exactly those cards left the accused's hand
+            played = array('b', bytes(len(RANKS)))
+            for card in info['cards']:
+                played[RANK_INDEX[card]] += 1
+            for i, (before, n) in enumerate(zip(self._low_before, played)):
+                if before - n > self.low[accused][i]:
+                    self._set_low(accused, i, before - n)
+            for i, n in enumerate(played):
+                if n:
+                    self._add_pile_known(i, n)
+        # The pile is split between the two; a known pile card ends up in a
+        # hand unless the other share is big enough to have taken it
+        known = array('b', self.pile_known)
+        for i, n in enumerate(known):
+            if n:
+                self._add_pile_known(i, -n)
+        if self.observer in (accused, caller):
+            own_before = array('b', self.own)
+            self._sync_own(state)
+            other = caller if self.observer == accused else accused
+            for i, n in enumerate(known):
+                gained = n - (self.own[i] - own_before[i])
+                if gained > 0:
+                    self._set_low(other, i, self.low[other][i] + gained)
+        else:
+            for player in (accused, caller):
+                other_share = self.pile_size - (len(state.players[player].hand) - self.sizes[player])
+                for i, n in enumerate(known):
+                    if n > other_share:
+                        self._set_low(player, i, self.low[player][i] + n - other_share)
+        self.pile_size = 0
+        self.sizes[accused] = len(state.players[accused].hand)
+        self.sizes[caller] = len(state.players[caller].hand)
+        self._low_before = None
+
+    # Bookkeeping that keeps 'free' and the totals in step
+
+    def _set_low(self, player, i, value):
+        delta = value - self.low[player][i]
+        self.low[player][i] = value
+        self.low_total[player] += delta
+        self.free[i] -= delta
+        self.free_total -= delta
+
+    def _add_pile_known(self, i, n):
+        self.pile_known[i] += n
+        self.free[i] -= n
+        self.free_total -= n
+
+    def _sync_own(self, state):
+        for i, n in enumerate(state.players[self.observer].hand.counts):
+            delta = n - self.own[i]
+            if delta:
+                self.own[i] = n
+                self.free[i] -= delta
+                self.free_total -= delta
+        self.sizes[self.observer] = len(state.players[self.observer].hand)
+
+
+def find_tracker(state, observer):
+    """The CardTracker attached to 'state' for seat 'observer', or None."""
+    for listener in state.listeners:
+        if isinstance(listener, CardTracker) and listener.observer == observer:
+            return listener
+    return None
+
+
+class CountingPolicy(HeuristicPolicy):
+    """The heuristic AI, but calls bluff from a CardTracker instead of its own hand alone.
+
+    It always calls a play the tracker proves impossible. Otherwise it calls
+    when the chance of a bluff reaches CALL_THRESHOLD. That chance assumes
+    the player bluffs by choice BLUFF_CHANCE of the time and is forced to
+    bluff whenever they lack the cards.
+    """
+    name = "counting"
+
+    def start_game(self, state, player_index):
+        state.listeners.append(CardTracker(state, player_index))
+
+    def decide_call(self, state, ai_index, declared_rank, count_played):
+        tracker = find_tracker(state, ai_index)
+        if tracker is None:
+            return super().decide_call(state, ai_index, declared_rank, count_played)
+        if tracker.last_play_impossible:
+            return True
+        bluff_chance = 1.0 - (1.0 - engine.BLUFF_CHANCE) * tracker.last_play_hold_chance
+        return bluff_chance >= CALL_THRESHOLD
+
+
+engine.POLICIES[CountingPolicy.name] = CountingPolicy
@@ -0,0 +1,128 @@
+"""Tune the heuristic AI's behaviour constants by cross-entropy search over self-play.
+
+The six constants of ai_play_turn() and ai_decide_call() (engine.AI_PARAMS)
+form a parameter vector. Each generation draws 'population' vectors from a
+Gaussian around the current mean (clipped to [0, 1]). Every vector then
+plays 'games' games in one seat against the current mean on the other
+seats. The best 'elite' fraction by win rate becomes the new mean and
+spread. Games are played with batch.simulate_batch() on a
+ProcessPoolExecutor. All candidates of a generation see the same deals
+and dice (common random numbers), so their win rates can be compared
+directly.
+
+The search state is checkpointed after every generation. Running the same
+command again resumes from the checkpoint; an interrupted run loses at most
+the generation it was in. The result goes to engine.PARAMS_FILE
+(ai_params.json), which the engine, and with it the game, loads at
+startup. Searches start from the parameters in use, so a second run
+refines the first.
+
+The defaults play 32 x 40000 games per generation, about 10 seconds on
+one core, so 60 generations take minutes on a many-core box. Raise
+--games to tell smaller differences apart in an overnight run.
+
+Usage: python tune.py [--generations 60] [--population 32] [--games 40000] [--workers N]
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import engine
+from engine import AI_PARAMS, PLAYERS_COUNT
+from batch import simulate_batch
+
+INITIAL_STD = 0.15       # starting spread of every parameter
+MIN_STD = 0.01           # spread floor, so the search never stops exploring
+SMOOTHING = 0.7          # weight of the elite in each update of the mean and spread
+CHUNK_GAMES = 10000      # games per worker task
+
+
+def play_chunk(params, opponent, seat, seed, n_games):
+    """Worker: games won by 'params' in 'seat' against 'opponent' on the other seats."""
+    table = np.tile(np.asarray(opponent, dtype=float), (PLAYERS_COUNT, 1))
+    table[seat] = params
+    winners, _ = simulate_batch(n_games, seed, params=table)
+    return int(np.count_nonzero(winners == seat))
+
+
+def evaluate(pool, candidates, opponent, seed, games):
+    """Win rate of each candidate against 'opponent', from the same seeded games for all of them."""
+    chunks = [(i, min(CHUNK_GAMES, games - start)) for i, start in enumerate(range(0, games, CHUNK_GAMES))]
+    futures = [[pool.submit(play_chunk, tuple(params), tuple(opponent), chunk % PLAYERS_COUNT,
+                            list(seed) + [chunk], n)
+                for chunk, n in chunks]
+               for params in candidates]
+    return np.array([sum(f.result() for f in row) / games for row in futures])
+
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_checkpoint(path, search):
+    with open(path + ".tmp", "w") as f:
+        json.dump(search, f, indent=1)
+    os.replace(path + ".tmp", path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune the AI constants by cross-entropy self-play search.")
+    parser.add_argument("--generations", type=int, default=60)
+    parser.add_argument("--population", type=int, default=32)
+    parser.add_argument("--elite", type=float, default=0.25, help="fraction of each generation kept")
+    parser.add_argument("--games", type=int, default=40000, help="games per candidate")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--checkpoint", default="tune-checkpoint.json")
+    parser.add_argument("--out", default=engine.PARAMS_FILE, help="parameter file to write")
+    args = parser.parse_args()
+
+    search = load_checkpoint(args.checkpoint)
+    if search is None:
+        search = {'seed': args.seed, 'population': args.population, 'elite': args.elite,
+                  'games': args.games, 'generation': 0, 'mean': list(engine.ai_params()),
+                  'std': [INITIAL_STD] * len(AI_PARAMS), 'history': []}
+    else:
+        # The settings the search started with win over the command line
+        print(f"resuming {args.checkpoint} at generation {search['generation']}")
+    n_elite = max(2, round(search['population'] * search['elite']))
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        while search['generation'] < args.generations:
+            start = time.perf_counter()
+            generation = search['generation']
+            mean, std = np.array(search['mean']), np.array(search['std'])
+            rng = np.random.default_rng([search['seed'], generation])
+            candidates = np.clip(rng.normal(mean, std, (search['population'], len(AI_PARAMS))), 0.0, 1.0)
+            candidates[0] = mean            # the mean itself, as a yardstick (about 1/PLAYERS_COUNT)
+            scores = evaluate(pool, candidates, mean, (search['seed'], 0, generation), search['games'])
+            elite = candidates[np.argsort(scores)[-n_elite:]]
+            mean = SMOOTHING * elite.mean(axis=0) + (1 - SMOOTHING) * mean
+            std = np.maximum(SMOOTHING * elite.std(axis=0) + (1 - SMOOTHING) * std, MIN_STD)
+            search.update(generation=generation + 1, mean=mean.tolist(), std=std.tolist())
+            search['history'].append({'generation': generation, 'best': float(scores.max()),
+                                      'mean_score': float(scores[0])})
+            save_checkpoint(args.checkpoint, search)
+            print(f"generation {generation}: best {scores.max():.2%} (mean {scores[0]:.2%}) "
+                  f"in {time.perf_counter() - start:.1f}s  "
+                  + " ".join(f"{v:.3f}" for v in mean), flush=True)
+
+        # How the result does against the built-in defaults
+        final = np.array(search['mean'])
+        versus = evaluate(pool, [final], engine.DEFAULT_AI_PARAMS, (search['seed'], 1), search['games'])[0]
+    engine.save_ai_params(args.out, final.tolist(), generations=search['generation'],
+                          win_rate_vs_defaults=float(versus))
+    print(f"wrote {args.out}: {versus:.2%} wins against two default AIs")
+    for name, value in zip(AI_PARAMS, final):
+        print(f"  {name:<27} {value:.3f}")
+
+
+if __name__ == "__main__":
+    main()